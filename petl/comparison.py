@@ -2,6 +2,8 @@ from __future__ import absolute_import, print_function, division
 
 
 import operator
+from datetime import datetime, date, time, timedelta
+from decimal import Decimal
 
 
 from petl.compat import text_type, binary_type, numeric_types
@@ -107,3 +109,130 @@ def comparable_itemgetter(*args):
     f = operator.itemgetter(*args)
     g = lambda x: Comparable(f(x))
     return g
+
+
+class _Lowest(object):
+    """Sentinel used in place of `None` in native keys, which sorts before
+    every other value (as `None` does when wrapped in :class:`Comparable`)."""
+
+    __slots__ = ()
+
+    def __lt__(self, other):
+        return other is not self
+
+    def __le__(self, other):
+        return True
+
+    def __gt__(self, other):
+        return False
+
+    def __ge__(self, other):
+        return other is self
+
+    def __eq__(self, other):
+        return other is self
+
+    def __ne__(self, other):
+        return other is not self
+
+    def __hash__(self):
+        return 0
+
+    def __repr__(self):
+        return 'Lowest'
+
+
+Lowest = _Lowest()
+
+
+class AwareDatetime(object):
+    """Stands in for the type of timezone-aware datetimes in the sets of
+    types returned by :func:`columntypes`, as these cannot be compared with
+    naive ones."""
+
+
+class AwareTime(object):
+    """Stands in for the type of timezone-aware times in the sets of types
+    returned by :func:`columntypes`, as these cannot be compared with naive
+    ones."""
+
+
+_aware_types = {datetime: AwareDatetime, time: AwareTime}
+
+
+# types which can be compared natively with the same outcome as when wrapped
+# in Comparable, provided only types of the same kind are compared
+_native_kinds = dict([(t, 'number') for t in numeric_types])
+_native_kinds.update({
+    text_type: 'text',
+    binary_type: 'binary',
+    datetime: 'datetime',
+    AwareDatetime: 'aware datetime',
+    date: 'date',
+    time: 'time',
+    AwareTime: 'aware time',
+    timedelta: 'timedelta',
+    Decimal: 'decimal',
+})
+_NoneType = type(None)
+
+
+def columntypes(rows, *args):
+    """Return a list holding the set of types of the values found in each of
+    the given columns of `rows`, where timezone-aware datetimes and times are
+    counted as :class:`AwareDatetime` and :class:`AwareTime`."""
+
+    result = []
+    for i in args:
+        types = set(map(type, map(operator.itemgetter(i), rows)))
+        if datetime in types or time in types:
+            types = set(map(_awaretype, map(operator.itemgetter(i), rows)))
+        result.append(types)
+    return result
+
+
+def _awaretype(v):
+    t = type(v)
+    if t in _aware_types and v.utcoffset() is not None:
+        return _aware_types[t]
+    return t
+
+
+def isnative(types):
+    """Return `True` if values of the given types can be compared natively
+    with the same outcome as when wrapped in :class:`Comparable`, i.e., they
+    are all numbers, or all text, or all dates, etc., possibly with `None`."""
+
+    kinds = set()
+    for t in types:
+        if t is _NoneType:
+            continue
+        kind = _native_kinds.get(t)
+        if kind is None:
+            return False
+        kinds.add(kind)
+    return len(kinds) <= 1
+
+
+def sortable_itemgetter(types, *args):
+    """Return a key function for the given indices, which gives the same
+    order as :func:`comparable_itemgetter` over rows where column ``args[i]``
+    only holds values of the types in ``types[i]`` (see :func:`columntypes`).
+    If all columns are :func:`isnative`, keys are the plain values (or a
+    tuple of plain values for multiple indices) with `None` replaced by
+    :data:`Lowest`, which is much faster to sort on, otherwise falls back to
+    :func:`comparable_itemgetter`."""
+
+    if not all(isnative(t) for t in types):
+        return comparable_itemgetter(*args)
+    f = operator.itemgetter(*args)
+    if not any(_NoneType in t for t in types):
+        return f
+    if len(args) == 1:
+        def g(x):
+            v = f(x)
+            return Lowest if v is None else v
+    else:
+        def g(x):
+            return tuple([Lowest if v is None else v for v in f(x)])
+    return g
@@ -31,6 +31,8 @@ if PY2:
     except ImportError:
         import pickle
     maxint = sys.maxint
+    from collections import Mapping, MutableMapping
+    intern = intern
     long = long
     xrange = xrange
     reduce = reduce
@@ -55,6 +57,8 @@ else:
     from io import StringIO, BytesIO
     import pickle
     maxint = sys.maxsize
+    from collections.abc import Mapping, MutableMapping
+    from sys import intern
 
 try:
     advance_iterator = next
@@ -16,6 +16,16 @@ display_limit = 5
 display_index_header = False
 display_vrepr = text_type
 sort_buffersize = 100000
+sort_buffermem = None  # e.g., '512MB'
+sort_workers = None
+sort_merge_fanin = 128
+sort_persist = None  # e.g., '/var/cache/petl'
+sort_persist_maxsize = '10GB'
+sort_spill_format = 'batch'  # alternatives: 'zlib', 'columns', 'pickle'
+hashjoin_buffermem = None  # e.g., '512MB'
+hashjoin_workers = None
+aggregate_workers = None
+hashdedup_buffermem = None  # e.g., '512MB'
 failonerror=False # False, True, 'inline'
 """
 Controls what happens when unhandled exceptions are raised in a
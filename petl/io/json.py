@@ -98,6 +98,12 @@ class JsonView(Table):
         self.args = args
         self.kwargs = kwargs
 
+    def resolveheader(self):
+        # otherwise fields are discovered from the data
+        if self.header is None:
+            return None
+        return tuple(self.header)
+
     def __iter__(self):
         with self.source.open('rb') as f:
             if not PY2:
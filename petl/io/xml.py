@@ -171,6 +171,12 @@ class XmlView(Table):
         self.missing = kwargs.get('missing', None)
         self.user_parser = kwargs.get('parser', None)
 
+    def resolveheader(self):
+        if self.vdict is None:
+            # header is the first matched row, need to parse the document
+            return None
+        return tuple(sorted(map(text_type, self.vdict.keys())))
+
     def __iter__(self):
         vmatch = self.vmatch
         vdict = self.vdict
@@ -6,8 +6,8 @@ from tempfile import NamedTemporaryFile
 import json
 
 
-from petl.test.helpers import ieq
-from petl import fromjson, fromdicts, tojson, tojsonarrays
+from petl.test.helpers import ieq, eq_
+from petl import fromjson, fromdicts, tojson, tojsonarrays, header, cut
 
 
 def test_fromjson_1():
@@ -28,6 +28,16 @@ def test_fromjson_1():
     ieq(expect, actual)  # verify can iterate twice
 
 
+def test_fromjson_header():
+
+    # header is given, so the file doesn't need to be parsed to find it
+    f = NamedTemporaryFile(delete=False, mode='w')
+    f.write('not json')
+    f.close()
+    eq_(('foo', 'bar'), header(fromjson(f.name, header=['foo', 'bar'])))
+    eq_(('bar',), header(cut(fromjson(f.name, header=['foo', 'bar']), 'bar')))
+
+
 def test_fromjson_2():
 
     f = NamedTemporaryFile(delete=False, mode='w')
@@ -1,11 +1,14 @@
 from __future__ import print_function, division, absolute_import
 
 
-from datetime import datetime
+from datetime import datetime, date, time, timedelta, tzinfo
+from decimal import Decimal
 
 
 from petl.test.helpers import eq_
-from petl.comparison import Comparable
+from petl.comparison import Comparable, comparable_itemgetter, \
+    columntypes, isnative, sortable_itemgetter, Lowest, AwareDatetime, \
+    AwareTime
 
 
 def test_comparable():
@@ -177,3 +180,92 @@ def test_comparable_nested():
          (b'aa', -1),
          [b'aa', False]]
     eq_(e, a)
+
+
+def test_isnative():
+
+    assert isnative({int})
+    assert isnative({int, float, bool, type(None)})
+    assert isnative({str, type(None)})
+    assert isnative({datetime})
+    assert isnative({type(None)})
+    assert isnative(set())
+    assert not isnative({int, str})
+    assert not isnative({int, Decimal})
+    assert not isnative({datetime, date})
+    assert not isnative({tuple})
+
+
+def test_sortable_itemgetter():
+
+    rows = [(3, 'b', 1.5), (None, 'a', 2), (1, None, 0.5), (1, 'a', None),
+            (None, None, -1), (3, 'a', 7)]
+    types = columntypes(rows, 0, 1, 2)
+    eq_([{int, type(None)}, {str, type(None)}, {float, int, type(None)}],
+        types)
+
+    # should give the same order as comparable_itemgetter
+    for indices in (0,), (1,), (2,), (0, 1), (1, 0, 2):
+        getkey = sortable_itemgetter([types[i] for i in indices], *indices)
+        for reverse in False, True:
+            expect = sorted(rows, key=comparable_itemgetter(*indices),
+                            reverse=reverse)
+            actual = sorted(rows, key=getkey, reverse=reverse)
+            eq_(expect, actual)
+
+    # plain values when there are no Nones
+    getkey = sortable_itemgetter([{int}, {str}], 0, 1)
+    eq_((3, 'b'), getkey(rows[0]))
+    getkey = sortable_itemgetter([{int, type(None)}], 0)
+    eq_(Lowest, getkey(rows[1]))
+
+    # fall back to Comparable for mixed types
+    rows = [(1,), ('a',), (None,), (2.5,)]
+    getkey = sortable_itemgetter(columntypes(rows, 0), 0)
+    assert isinstance(getkey(rows[0]), Comparable)
+    eq_(sorted(rows, key=comparable_itemgetter(0)), sorted(rows, key=getkey))
+
+
+class _UTC(tzinfo):
+
+    def utcoffset(self, dt):
+        return timedelta(0)
+
+    def dst(self, dt):
+        return timedelta(0)
+
+
+def test_columntypes_aware():
+
+    # aware and naive datetimes and times can't be compared, so they count
+    # as different types
+    utc = _UTC()
+    rows = [(datetime(2000, 1, 1), time(1)),
+            (datetime(2000, 1, 1, tzinfo=utc), time(1, tzinfo=utc)),
+            (None, None)]
+    types = columntypes(rows, 0, 1)
+    eq_([{datetime, AwareDatetime, type(None)},
+         {time, AwareTime, type(None)}], types)
+    assert not isnative(types[0])
+    assert not isnative(types[1])
+    assert isnative(columntypes(rows[1:], 0)[0])
+
+    # so mixed columns fall back to Comparable rather than failing
+    getkey = sortable_itemgetter(types, 0, 1)
+    assert isinstance(getkey(rows[0]), Comparable)
+    sorted(rows, key=getkey)
+
+
+def test_lowest():
+
+    values = [3, Lowest, 'a', Lowest, datetime(2000, 1, 1), None]
+    for v in values:
+        assert Lowest == Lowest
+        assert not Lowest < Lowest
+        assert Lowest <= Lowest
+        if v is not Lowest:
+            assert Lowest < v
+            assert not v < Lowest
+            assert v > Lowest
+            assert Lowest != v
+    eq_([Lowest, Lowest, 1, 2], sorted([2, Lowest, 1, Lowest]))
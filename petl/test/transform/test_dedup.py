@@ -3,7 +3,7 @@ from __future__ import absolute_import, print_function, division
 
 from petl.test.helpers import ieq
 from petl.transform.dedup import duplicates, unique, conflicts, distinct, \
-    isunique
+    isunique, hashduplicates, hashunique, hashdistinct
 
 
 def test_duplicates():
@@ -263,3 +263,59 @@ def test_isunique():
     table = (('foo', 'bar'), ('a', 1), ('b',), ('b', 2), ('c', 3, True))
     assert not isunique(table, 'foo')
     assert isunique(table, 'bar')
+
+
+def test_hashdedup():
+
+    table = (('foo', 'bar'),
+             ('B', 2),
+             ('A', 1),
+             ('C', 3),
+             ('B', 2),
+             ('A', 4),
+             ('B', 5))
+
+    ieq((('foo', 'bar'), ('B', 2), ('B', 2), ('A', 1), ('A', 4), ('B', 5)),
+        hashduplicates(table, 'foo'))
+    ieq((('foo', 'bar'), ('B', 2), ('B', 2)),
+        hashduplicates(table))
+    ieq((('foo', 'bar'), ('C', 3)),
+        hashunique(table, 'foo'))
+    ieq((('foo', 'bar'), ('A', 1), ('C', 3), ('A', 4), ('B', 5)),
+        hashunique(table))
+    ieq((('foo', 'bar'), ('B', 2), ('A', 1), ('C', 3)),
+        hashdistinct(table, 'foo'))
+    ieq((('foo', 'bar', 'n'), ('B', 2, 3), ('A', 1, 2), ('C', 3, 1)),
+        hashdistinct(table, 'foo', count='n'))
+    ieq((('foo', 'bar'), ('B', 2), ('A', 1), ('C', 3), ('A', 4), ('B', 5)),
+        hashdistinct(table))
+
+    for f in hashduplicates, hashunique, hashdistinct:
+        ieq((('foo', 'bar'),), f((('foo', 'bar'),)))
+
+
+def test_hashdedup_buffermem():
+
+    table = [('foo', 'bar')] + [((i * 7) % 300, i % 3) for i in range(1000)]
+
+    # the hash table doesn't fit in buffermem, output should be the same
+    for f, kwargs in ((hashduplicates, {}), (hashunique, {}),
+                      (hashdistinct, {}), (hashdistinct, {'count': 'n'})):
+        expect = f(table, 'foo', **kwargs)
+        actual = f(table, 'foo', buffermem=1000, **kwargs)
+        ieq(expect, actual)
+        ieq(expect, actual)
+
+    import petl.config as config
+    old = config.sort_buffersize, config.hashdedup_buffermem
+    try:
+        # no sort buffer size, rows are spilled in batches of a fixed size
+        config.sort_buffersize = None
+        expect = hashdistinct(table, 'foo')
+        ieq(expect, hashdistinct(table, 'foo', buffermem=1000))
+
+        # buffermem from config
+        config.hashdedup_buffermem = 1000
+        ieq(expect, hashdistinct(table, 'foo'))
+    finally:
+        config.sort_buffersize, config.hashdedup_buffermem = old
@@ -1052,3 +1052,110 @@ else:
                   (1, 8, 'j', 4, 9, 'baz'))
         ieq(expect, actual)
         ieq(expect, actual)
+
+    def test_intervaljoin_presorted_matches_tree():
+
+        left = etl.sort((('fruit', 'begin', 'end', 'quux'),
+                         ('apple', 1, 2, 'a'),
+                         ('apple', 2, 4, 'b'),
+                         ('orange', 2, 5, 'c'),
+                         ('apple', 9, 14, 'd'),
+                         ('apple', 1, 1, 'e'),
+                         ('orange', 1, 8, 'f'),
+                         ('pear', 3, 4, 'g')),
+                        key=('fruit', 'begin'))
+        right = etl.sort((('type', 'start', 'stop', 'value'),
+                          ('apple', 1, 4, 'foo'),
+                          ('apple', 3, 7, 'bar'),
+                          ('orange', 4, 9, 'baz'),
+                          ('orange', 1, 4, 'qux'),
+                          ('banana', 2, 3, 'quz')),
+                         key=('type', 'start'))
+
+        for f in (intervaljoin, intervalleftjoin, intervalantijoin,
+                  intervalsubtract):
+            for include_stop in False, True:
+                kwargs = dict(lstart='begin', lstop='end', rstart='start',
+                              rstop='stop', include_stop=include_stop)
+                lsorted = etl.sort(left, 'begin')
+                rsorted = etl.sort(right, 'start')
+                expect = f(lsorted, rsorted, **kwargs)
+                actual = f(lsorted, rsorted, presorted=True, **kwargs)
+                ieq(expect, actual)
+                expect = f(left, right, lkey='fruit', rkey='type', **kwargs)
+                actual = f(left, right, lkey='fruit', rkey='type',
+                           presorted=True, **kwargs)
+                ieq(expect, actual)
+
+
+def test_intervaljoin_presorted():
+
+    # sweep-line join does not need intervaltree
+
+    left = (('begin', 'end', 'quux'),
+            (1, 1, 'e'),
+            (1, 2, 'a'),
+            (1, 8, 'j'),
+            (2, 4, 'b'),
+            (2, 5, 'c'),
+            (9, 14, 'd'))
+    right = (('start', 'stop', 'value'),
+             (1, 4, 'foo'),
+             (3, 7, 'bar'),
+             (4, 9, 'baz'))
+
+    actual = intervaljoin(left, right, lstart='begin', lstop='end',
+                          rstart='start', rstop='stop', presorted=True)
+    expect = (('begin', 'end', 'quux', 'start', 'stop', 'value'),
+              (1, 2, 'a', 1, 4, 'foo'),
+              (1, 8, 'j', 1, 4, 'foo'),
+              (1, 8, 'j', 3, 7, 'bar'),
+              (1, 8, 'j', 4, 9, 'baz'),
+              (2, 4, 'b', 1, 4, 'foo'),
+              (2, 4, 'b', 3, 7, 'bar'),
+              (2, 5, 'c', 1, 4, 'foo'),
+              (2, 5, 'c', 3, 7, 'bar'),
+              (2, 5, 'c', 4, 9, 'baz'))
+    ieq(expect, actual)
+    ieq(expect, actual)
+
+    actual = intervalantijoin(left, right, lstart='begin', lstop='end',
+                              rstart='start', rstop='stop', presorted=True)
+    expect = (('begin', 'end', 'quux'),
+              (1, 1, 'e'),
+              (9, 14, 'd'))
+    ieq(expect, actual)
+
+    actual = intervalsubtract(left, right, lstart='begin', lstop='end',
+                              rstart='start', rstop='stop',
+                              include_stop=True, presorted=True)
+    expect = (('begin', 'end', 'quux'),
+              (9, 14, 'd'))
+    ieq(expect, actual)
+
+
+def test_intervaljoin_presorted_facet():
+
+    left = (('fruit', 'begin', 'end'),
+            ('apple', 1, 2),
+            ('apple', 2, 5),
+            ('orange', 2, 5),
+            ('orange', 9, 14),
+            ('pear', 1, 3))
+    right = (('type', 'start', 'stop', 'value'),
+             ('apple', 1, 4, 'foo'),
+             ('apple', 3, 7, 'bar'),
+             ('banana', 1, 9, 'quz'),
+             ('orange', 4, 9, 'baz'))
+
+    actual = intervalleftjoin(left, right, lstart='begin', lstop='end',
+                              lkey='fruit', rstart='start', rstop='stop',
+                              rkey='type', presorted=True)
+    expect = (('fruit', 'begin', 'end', 'type', 'start', 'stop', 'value'),
+              ('apple', 1, 2, 'apple', 1, 4, 'foo'),
+              ('apple', 2, 5, 'apple', 1, 4, 'foo'),
+              ('apple', 2, 5, 'apple', 3, 7, 'bar'),
+              ('orange', 2, 5, 'orange', 4, 9, 'baz'),
+              ('orange', 9, 14, None, None, None, None),
+              ('pear', 1, 3, None, None, None, None))
+    ieq(expect, actual)
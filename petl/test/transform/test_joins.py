@@ -1,10 +1,14 @@
 from __future__ import absolute_import, print_function, division
 
 
-from petl.test.helpers import ieq
+from functools import partial
+
+
+from petl.test.helpers import ieq, eq_
 from petl import join, leftjoin, rightjoin, outerjoin, crossjoin, antijoin, \
     lookupjoin, hashjoin, hashleftjoin, hashrightjoin, hashantijoin, \
-    hashlookupjoin, unjoin, sort, cut
+    hashlookupjoin, unjoin, sort, cut, autojoin, DiskLookup
+from petl.transform.joins import _BloomFilter
 
 
 def _test_join_basic(join_impl):
@@ -1211,6 +1215,200 @@ def test_hashlookupjoin():
     _test_lookupjoin(hashlookupjoin)
 
 
+def test_hashlookupjoin_dictionary():
+    with DiskLookup(batchsize=2, cachesize=2) as lkp:
+        _test_lookupjoin(partial(hashlookupjoin, dictionary=lkp))
+
+
+def test_hashjoin_buffermem():
+
+    # right hand table doesn't fit in buffermem, so both tables get split
+    # into partitions on disk, rows come out in a different order
+    left = [('id', 'colour')] + [(i % 150, i) for i in range(500)]
+    right = [('id', 'shape')] + [(i % 200, -i) for i in range(400)]
+
+    for impl in hashjoin, hashleftjoin, hashrightjoin, hashlookupjoin:
+        expect = sort(impl(left, right, key='id'))
+        actual = impl(left, right, key='id', buffermem=1000)
+        ieq(expect, sort(actual))
+        ieq(expect, sort(actual))
+
+    expect = hashantijoin(left, right, key='id')
+    actual = hashantijoin(left, right, key='id', buffermem=1000)
+    ieq(sort(expect), sort(actual))
+
+    # all rows with the same key, partitions can't be split
+    right = [('id', 'shape')] + [(1, -i) for i in range(400)]
+    expect = hashjoin(left, right, key='id')
+    actual = hashjoin(left, right, key='id', buffermem=1000)
+    ieq(sort(expect), sort(actual))
+
+
+def test_hashjoin_workers():
+    import petl.config as config
+
+    left = [('id', 'colour')] + [((i * 7) % 150, i) for i in range(500)]
+    right = [('id', 'shape')] + [(i % 200, -i) for i in range(400)]
+
+    # joining partitions in worker processes should give exactly the same
+    # output as joining in the calling process, unless asked not to keep the
+    # order of the left table
+    expect = hashjoin(left, right, key='id')
+    actual = hashjoin(left, right, key='id', workers=2)
+    ieq(expect, actual)
+    ieq(expect, actual)
+    actual = hashjoin(left, right, key='id', workers=2, ordered=False)
+    ieq(sort(expect), sort(actual))
+
+    # string keys, several chunks per table
+    left = [('id', 'colour')] + [('k%s' % ((i * 7) % 150), i)
+                                 for i in range(500)]
+    right = [('id', 'shape')] + [('k%s' % (i % 200), -i) for i in range(400)]
+    expect = hashjoin(left, right, key='id')
+    buffersize = config.sort_buffersize
+    try:
+        config.sort_buffersize = 60
+        actual = hashjoin(left, right, key='id', workers=3)
+        ieq(expect, actual)
+        # no buffer size set
+        config.sort_buffersize = None
+        actual = hashjoin(left, right, key='id', workers=3)
+        ieq(expect, actual)
+    finally:
+        config.sort_buffersize = buffersize
+
+
+
+def test_hashjoin_workers_spawn():
+    import multiprocessing
+    from petl.compat import PY2
+    if PY2:
+        return
+    from datetime import date, datetime, timedelta, timezone
+
+    # worker processes which aren't forked hash strings and dates
+    # differently from each other, which must not lose any rows
+    days = [date(2020, 1, 1) + timedelta(days=i) for i in range(50)]
+    left = [('day', 'id', 'when')] + [(days[i % 50], 'k%s' % (i % 7),
+                                       datetime(2020, 1, 1, i % 24))
+                                      for i in range(3000)]
+    right = [('day', 'id', 'value')] + [(d, 'k%s' % (i % 7), i)
+                                        for i, d in enumerate(days)]
+    expect = hashjoin(left, right, key='day')
+    startmethod = multiprocessing.get_start_method()
+    try:
+        multiprocessing.set_start_method('spawn', force=True)
+        actual = hashjoin(left, right, key='day', workers=2)
+        ieq(expect, actual)
+        actual = hashjoin(left, right, key='day', workers=3, ordered=False)
+        ieq(sort(expect), sort(actual))
+        expect = hashjoin(left, right, key=('day', 'id'))
+        actual = hashjoin(left, right, key=('day', 'id'), workers=3)
+        ieq(expect, actual)
+        # aware datetimes in different time zones
+        zones = [timezone(timedelta(hours=h)) for h in range(3)]
+        left = [('when', 'i')] + [(datetime(2020, 1, 1, i % 40 // 2,
+                                            tzinfo=timezone.utc), i)
+                                  for i in range(300)]
+        right = [('when', 'j')] + [(datetime(2020, 1, 1, i % 20,
+                                             tzinfo=timezone.utc)
+                                    .astimezone(zones[i % 3]), i)
+                                   for i in range(60)]
+        expect = hashjoin(left, right, key='when')
+        eq_(900, len(expect) - 1)
+        actual = hashjoin(left, right, key='when', workers=3)
+        ieq(expect, actual)
+    finally:
+        multiprocessing.set_start_method(startmethod, force=True)
+
+
+def test_join_prefilter():
+
+    left = [('id', 'colour')] + [((i * 7) % 1000, i) for i in range(500)]
+    right = [('id', 'shape')] + [(i * 3, -i) for i in range(100)]
+
+    # prefiltering should never change the output
+    for impl in join, antijoin, lookupjoin:
+        expect = impl(left, right, key='id')
+        actual = impl(left, right, key='id', prefilter=True)
+        ieq(expect, actual)
+        ieq(expect, actual)
+        actual = impl(sort(left, 'id'), sort(right, 'id'), key='id',
+                      presorted=True, prefilter=True)
+        ieq(expect, actual)
+
+    expect = hashjoin(left, right, key='id')
+    actual = hashjoin(left, right, key='id', buffermem=1000, prefilter=True)
+    ieq(sort(expect), sort(actual))
+
+
+def test_autojoin():
+
+    left = [('id', 'colour')] + [((i * 7) % 150, i) for i in range(500)]
+    right = [('id', 'shape')] + [(i % 200, -i) for i in range(400)]
+    expect = join(left, right, key='id')
+
+    # right table fits in memory
+    actual = autojoin(left, right, key='id')
+    ieq(sort(expect), sort(actual))
+    assert actual.strategy == 'hash', actual.explain()
+
+    # both tables are sorted already
+    actual = autojoin(sort(left, 'id'), sort(right, 'id'), key='id')
+    ieq(expect, actual)
+    assert actual.strategy == 'merge', actual.explain()
+
+    # right table doesn't fit in memory, but left table is sorted
+    actual = autojoin(sort(left, 'id'), right, key='id', buffermem=1000)
+    ieq(expect, actual)
+    assert actual.strategy == 'sort-merge', actual.explain()
+
+    # right table doesn't fit in memory, nor does a single key
+    skewed = [('id', 'shape')] + [(1, -i) for i in range(400)]
+    actual = autojoin(left, skewed, key='id', buffermem=1000)
+    ieq(join(left, skewed, key='id'), actual)
+    assert actual.strategy == 'sort-merge', actual.explain()
+
+    # right table doesn't fit in memory, hash join spills to disk
+    actual = autojoin(left, right, key='id', buffermem=1000)
+    ieq(sort(expect), sort(actual))
+    assert actual.strategy == 'hash', actual.explain()
+
+
+def test_autojoin_file():
+    import os
+    from tempfile import NamedTemporaryFile
+    from petl import fromcsv, tocsv
+
+    # the number of rows of a right table read from a file is estimated from
+    # the size of the file
+    left = [('id', 'colour')] + [(str(i), i) for i in range(500)]
+    right = [('id', 'shape')] + [(i % 200, -i) for i in range(3000)]
+    f = NamedTemporaryFile(delete=False, suffix='.csv')
+    f.close()
+    tocsv(right, f.name)
+    right = fromcsv(f.name)
+    actual = autojoin(sort(left, 'id'), right, key='id', buffermem=100000)
+    ieq(join(left, right, key='id'), actual)
+    assert actual.strategy == 'sort-merge', actual.explain()
+    assert 'an estimated' in actual.explain(), actual.explain()
+    os.remove(f.name)
+
+
+def test_bloomfilter():
+
+    bloom = _BloomFilter(2000)
+    for i in range(1000):
+        bloom.add(i)
+        bloom.add('k%s' % i)
+    for i in range(1000):
+        assert i in bloom
+        assert 'k%s' % i in bloom
+    # about 2% false positives when filled to capacity
+    false = sum(1 for i in range(1000, 11000) if i in bloom)
+    assert false < 400, false
+
+
 def test_unjoin_implicit_key():
 
     # test the case where the join key needs to be reconstructed
@@ -1380,3 +1578,42 @@ def test_unjoin_explicit_key_5():
     ieq(expect_left, left)
     ieq(expect_right, right)
     ieq(expect_right, right)
+
+
+def test_join_sortorder():
+
+    table1 = (('id', 'colour'),
+              (3, 'purple'),
+              (1, 'blue'),
+              (2, 'red'))
+    table2 = (('id', 'shape'),
+              (4, 'ellipse'),
+              (1, 'circle'),
+              (3, 'square'))
+    expect = (('id', 'colour', 'shape'),
+              (1, 'blue', 'circle'),
+              (3, 'purple', 'square'))
+
+    # inputs already sorted by the key are not sorted again
+    left = sort(table1, 'id')
+    right = cut(sort(table2, 'id'), 'id', 'shape')
+    table3 = join(left, right, key='id')
+    assert table3.left is left
+    assert table3.right is right
+    ieq(expect, table3)
+
+    # inputs sorted by something else are
+    table4 = join(sort(table1, 'colour'), right, key='id')
+    assert table4.left is not left
+    assert table4.right is right
+    ieq(expect, table4)
+
+    # the prefilter keeps the sort order of the table it filters
+    table5 = join(left, right, key='id', prefilter=True)
+    assert table5.left.source is left
+    assert table5.right is right
+    ieq(expect, table5)
+    table6 = antijoin(left, right, key='id', prefilter=True)
+    assert table6.left is left
+    assert table6.right.source is right
+    ieq((('id', 'colour'), (2, 'red')), table6)
@@ -5,10 +5,15 @@ import operator
 
 
 from collections import OrderedDict
-from petl.test.helpers import ieq
+from petl.test.helpers import ieq, eq_
+from petl.errors import ArgumentError
 from petl.util import strjoin
+from petl.util.statistics import stats
+from petl.transform.sorts import sort
 from petl.transform.reductions import rowreduce, aggregate, \
     mergeduplicates, Conflict, fold
+from petl.transform.accumulators import Count, Sum, Min, Max, First, Last, \
+    Mean, List, Set, Stats, Quantiles
 
 
 def test_rowreduce():
@@ -494,3 +499,282 @@ def test_fold():
     expect = (('key', 'value'), (1, 8), (2, 12))
     ieq(expect, t2)
     ieq(expect, t2)
+
+
+def test_aggregate_hash():
+
+    table1 = (('foo', 'bar', 'baz'),
+              ('b', 2, True),
+              ('a', 3, True),
+              ('b', 9, False),
+              ('a', 7, False),
+              ('c', 4, True),
+              ('b', 2, False))
+
+    # groups come out in order of first appearance
+    actual = aggregate(table1, 'foo', sum, 'bar', method='hash')
+    expect = (('foo', 'value'), ('b', 13), ('a', 10), ('c', 4))
+    ieq(expect, actual)
+    ieq(expect, actual)
+
+    actual = aggregate(table1, ('foo', 'baz'), len, method='hash')
+    expect = (('foo', 'baz', 'value'),
+              ('b', True, 1),
+              ('a', True, 1),
+              ('b', False, 2),
+              ('a', False, 1),
+              ('c', True, 1))
+    ieq(expect, actual)
+
+    aggregation = OrderedDict()
+    aggregation['count'] = len
+    aggregation['maxbar'] = 'bar', max
+    aggregation['listbarbaz'] = ('bar', 'baz'), list
+    aggregation['firstbar'] = lambda rows: rows[0].bar
+    actual = aggregate(table1, 'foo', aggregation, method='hash')
+    expect = (('foo', 'count', 'maxbar', 'listbarbaz', 'firstbar'),
+              ('b', 3, 9, [(2, True), (9, False), (2, False)], 2),
+              ('a', 2, 7, [(3, True), (7, False)], 3),
+              ('c', 1, 4, [(4, True)], 4))
+    ieq(expect, actual)
+
+    actual = rowreduce(table1, 'foo', lambda k, rows: (k, len(list(rows))),
+                       header=('foo', 'n'), method='hash')
+    expect = (('foo', 'n'), ('b', 3), ('a', 2), ('c', 1))
+    ieq(expect, actual)
+
+    actual = fold(table1, 'foo', operator.sub, 'bar', method='hash')
+    expect = (('key', 'value'), ('b', -9), ('a', -4), ('c', 4))
+    ieq(expect, actual)
+
+
+def test_aggregate_hash_buffermem():
+
+    # hash table doesn't fit in buffermem, so rows get split into partitions
+    # on disk and groups come out in a different order
+    table1 = [('foo', 'bar')] + [(i % 300, i) for i in range(3000)]
+
+    expect = aggregate(table1, 'foo', list, 'bar')
+    actual = aggregate(table1, 'foo', list, 'bar', method='hash',
+                       buffermem=10000)
+    ieq(expect, sort(actual))
+    expect = fold(table1, 'foo', operator.sub, 'bar')
+    actual = fold(table1, 'foo', operator.sub, 'bar', method='hash',
+                  buffermem='1kB')
+    ieq(expect, sort(actual))
+
+    # one big group, can't be split
+    table2 = [('foo', 'bar')] + [(1, i) for i in range(3000)]
+    actual = aggregate(table2, 'foo', sum, 'bar', method='hash',
+                       buffermem=10000)
+    ieq((('foo', 'value'), (1, sum(range(3000)))), actual)
+
+    # with no sort buffer size, partitions are spilled in fixed size batches
+    import petl.config as config
+    old = config.sort_buffersize
+    config.sort_buffersize = None
+    try:
+        expect = aggregate(table1, 'foo', sum, 'bar')
+        actual = aggregate(table1, 'foo', sum, 'bar', method='hash',
+                           buffermem=2000)
+        ieq(expect, sort(actual))
+    finally:
+        config.sort_buffersize = old
+
+
+def test_aggregate_accumulators():
+
+    table1 = (('foo', 'bar', 'baz'),
+              ('a', 3, True),
+              ('a', 7, False),
+              ('b', 2, True),
+              ('b', 9, False),
+              ('b', 1, True),
+              ('c', 4, False))
+
+    aggregation = OrderedDict()
+    aggregation['count'] = Count()
+    aggregation['sum'] = 'bar', Sum()
+    aggregation['min'] = 'bar', Min()
+    aggregation['max'] = 'bar', Max()
+    aggregation['first'] = 'bar', First()
+    aggregation['last'] = 'bar', Last()
+    aggregation['mean'] = 'bar', Mean()
+    aggregation['list'] = 'bar', List()
+    aggregation['set'] = 'baz', Set()
+    expect = (('foo', 'count', 'sum', 'min', 'max', 'first', 'last', 'mean',
+               'list', 'set'),
+              ('a', 2, 10, 3, 7, 3, 7, 5.0, [3, 7], set([True, False])),
+              ('b', 3, 12, 1, 9, 2, 1, 4.0, [2, 9, 1], set([True, False])),
+              ('c', 1, 4, 4, 4, 4, 4, 4.0, [4], set([False])))
+    ieq(expect, aggregate(table1, 'foo', aggregation))
+    ieq(expect, sort(aggregate(table1, 'foo', aggregation, method='hash')))
+
+    # builtins and other callables still work alongside accumulators
+    aggregation = OrderedDict()
+    aggregation['count'] = len
+    aggregation['barsum'] = 'bar', sum
+    aggregation['barmax'] = 'bar', Max()
+    aggregation['bars'] = 'bar', strjoin(', ')
+    aggregation['rows'] = lambda rows: [r['bar'] for r in rows]
+    expect = (('foo', 'count', 'barsum', 'barmax', 'bars', 'rows'),
+              ('a', 2, 10, 7, '3, 7', [3, 7]),
+              ('b', 3, 12, 9, '2, 9, 1', [2, 9, 1]),
+              ('c', 1, 4, 4, '4', [4]))
+    ieq(expect, aggregate(table1, 'foo', aggregation))
+    ieq(expect, sort(aggregate(table1, 'foo', aggregation, method='hash',
+                               buffermem=1000)))
+
+    # simple aggregation
+    ieq((('foo', 'value'), ('a', 5.0), ('b', 4.0), ('c', 4.0)),
+        aggregate(table1, 'foo', Mean(), 'bar'))
+
+
+def test_accumulator_merge():
+
+    values = [3, 'x', 7.5, 2, None, 9, 1, 4]
+    for acc in (Count(), Sum(), Min(), Max(), First(), Last(), List(),
+                Set()):
+        numbers = [v for v in values if isinstance(v, (int, float))]
+        expect = acc(numbers)
+        for i in range(len(numbers) + 1):
+            state = acc.merge(acc.extend(acc.init(), numbers[:i]),
+                              acc.extend(acc.init(), numbers[i:]))
+            eq_(expect, acc.finalize(state))
+
+    acc = Stats()
+    expect = stats([('v',)] + [(v,) for v in values], 'v')
+    for i in range(len(values) + 1):
+        actual = acc.finalize(acc.merge(acc.extend(acc.init(), values[:i]),
+                                        acc.extend(acc.init(), values[i:])))
+        eq_(expect[:5], actual[:5])
+        for e, a in zip(expect[5:], actual[5:]):
+            assert abs(e - a) < 1e-9
+
+
+def test_aggregate_workers():
+
+    table1 = (('foo', 'bar', 'baz'),
+              ('b', 2, True),
+              ('a', 3, True),
+              ('c', 4, False),
+              ('a', 7, False),
+              ('b', 9, False),
+              ('b', 1, True))
+
+    aggregation = OrderedDict()
+    aggregation['count'] = len
+    aggregation['sum'] = 'bar', sum
+    aggregation['first'] = 'bar', First()
+    aggregation['last'] = 'bar', Last()
+    aggregation['mean'] = 'bar', Mean()
+    aggregation['list'] = 'bar', list
+    aggregation['rows'] = List()
+    aggregation['set'] = 'baz', Set()
+    for key in 'foo', ('baz', 'foo'), None:
+        for method in 'sort', 'hash':
+            expect = aggregate(table1, key, aggregation, method=method)
+            actual = aggregate(table1, key, aggregation, method=method,
+                               buffersize=2, workers=2)
+            ieq(expect, actual)
+            ieq(expect, actual)
+
+    # key functions aren't sent to the workers, so needn't be picklable
+    key = lambda r: r.bar % 2
+    expect = aggregate(table1, key, aggregation, method='hash')
+    actual = aggregate(table1, key, aggregation, method='hash', buffersize=2,
+                       workers=2)
+    ieq(expect, actual)
+
+    # simple aggregation
+    expect = aggregate(table1, 'foo', sum, 'bar')
+    actual = aggregate(table1, 'foo', sum, 'bar', buffersize=2, workers=2)
+    ieq(expect, actual)
+
+    # with no sort buffer size, rows are read in chunks of a fixed size
+    import petl.config as config
+    old = config.sort_buffersize
+    config.sort_buffersize = None
+    try:
+        ieq(expect, aggregate(table1, 'foo', sum, 'bar', workers=2))
+    finally:
+        config.sort_buffersize = old
+
+    # aggregation functions which can't be combined
+    actual = aggregate(table1, 'foo', strjoin(', '), 'bar', workers=2)
+    try:
+        actual.nrows()
+    except ArgumentError:
+        pass
+    else:
+        assert False, 'exception not raised'
+
+
+def test_aggregate_quantiles():
+
+    table1 = [('foo', 'bar')] + [(i % 2, i) for i in range(1, 201)] \
+        + [(2, 'xyz'), (2, 1)]
+
+    aggregation = OrderedDict()
+    aggregation['median'] = 'bar', Quantiles()
+    aggregation['range'] = 'bar', Quantiles([0, 1])
+    expect = (('foo', 'median', 'range'),
+              (0, 100.0, [2.0, 200.0]),
+              (1, 99.0, [1.0, 199.0]),
+              (2, 1.0, [1.0, 1.0]))
+    # the groups are small enough for exact results
+    ieq(expect, aggregate(table1, 'foo', aggregation))
+    ieq(expect, aggregate(table1, 'foo', aggregation, buffersize=50,
+                          workers=2))
+
+    # approximate results for larger groups
+    table2 = [('foo', 'bar')] + [(i % 2, i) for i in range(100000)]
+    actual = aggregate(table2, 'foo', Quantiles([.1, .9]), 'bar')
+    for (k, (p10, p90)), (e10, e90) in zip(actual.data(),
+                                           [(10000, 90000), (10001, 90001)]):
+        assert abs(p10 - e10) < 1000
+        assert abs(p90 - e90) < 1000
+
+    # quantiles out of range are refused before any rows are read
+    for qs in 1.5, [.5, -.1]:
+        try:
+            Quantiles(qs)
+        except ValueError:
+            pass
+        else:
+            assert False, 'exception not raised'
+
+
+def test_aggregate_accumulator_value_function():
+
+    table1 = (('foo', 'bar'),
+              ('a', 3),
+              ('b', 2),
+              ('a', 7))
+
+    # accumulators with the value given as a function of the row
+    expect = (('foo', 'value'), ('a', 20), ('b', 4))
+    value = lambda r: r.bar * 2
+    ieq(expect, aggregate(table1, 'foo', sum, value=value))
+    ieq(expect, aggregate(table1, 'foo', Sum(), value=value))
+    ieq(expect, aggregate(table1, 'foo', Sum(), value=value, method='hash'))
+    ieq(expect, aggregate(table1, 'foo', {'value': (value, Sum())}))
+
+
+def test_aggregate_workers_value_function():
+
+    table1 = (('foo', 'bar'),
+              ('a', 3),
+              ('b', 2))
+
+    # functions can't be sent to the workers
+    for aggregation in ({'value': (lambda r: r.bar, sum)},
+                        Sum()):
+        actual = aggregate(table1, 'foo', aggregation,
+                           value=lambda r: r.bar, workers=2)
+        try:
+            actual.nrows()
+        except ArgumentError:
+            pass
+        else:
+            assert False, 'exception not raised'
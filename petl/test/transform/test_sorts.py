@@ -3,16 +3,24 @@ from __future__ import absolute_import, print_function, division
 
 import os
 import gc
+import shutil
+import tempfile
 import logging
 from datetime import datetime
 import sys
 from petl.compat import next
+from petl.comparison import comparable_itemgetter
 
 
 from petl.test.helpers import ieq, eq_
 from petl.util import nrows
-from petl.transform.basics import cat
-from petl.transform.sorts import sort, mergesort, issorted
+from petl.io.csv import fromcsv, tocsv
+from petl.transform.basics import cat, head, cut
+from petl.transform.conversions import convert
+from petl.transform.selects import select, selectgt
+from petl.errors import ArgumentError
+from petl.transform.sorts import sort, mergesort, issorted, topk, \
+    SpillFormat, _parsebytes, _mergesorted
 
 
 logger = logging.getLogger(__name__)
@@ -362,7 +370,239 @@ def test_sort_none():
     ieq(expectation, result)
 
 
-# TODO test sort with native comparison
+def test_mergesorted():
+
+    # equal keys should come out in the order of the inputs they come from,
+    # whichever direction the inputs are sorted in
+    getkey = comparable_itemgetter(0)
+    for reverse in False, True:
+        inputs = [
+            [(1, 'a'), (2, 'a'), (2, 'b'), (5, 'a')],
+            [],
+            [(None, 'c'), (2, 'c'), ('x', 'c')],
+            [(2, 'd')],
+            [(1, 'e'), (5, 'e'), (5, 'f')],
+        ]
+        inputs = [sorted(i, key=getkey, reverse=reverse) for i in inputs]
+        expect = sorted([r for i in inputs for r in i], key=getkey,
+                        reverse=reverse)
+        eq_(expect, list(_mergesorted(getkey, reverse, *inputs)))
+
+    eq_([], list(_mergesorted(getkey, False)))
+    eq_([(1,), (2,)], list(_mergesorted(getkey, False, [(1,), (2,)])))
+    eq_([1, 2, 3, 4], list(_mergesorted(None, False, [1, 4], [2, 3])))
+
+
+def test_sort_merge_fanin():
+
+    import petl.config as config
+    table = [('foo', 'bar')] + [(i % 13, i) for i in range(100)]
+    expect = sort(table, 'foo')
+    old = config.sort_merge_fanin
+    config.sort_merge_fanin = 3
+    try:
+        for reverse in False, True:
+            # 20 chunks are merged down to 7, then 3
+            expect = sort(table, 'foo', reverse=reverse)
+            actual = sort(table, 'foo', reverse=reverse, buffersize=5)
+            ieq(expect, actual)
+            ieq(expect, actual)
+            eq_(3, len(actual._filecache))
+    finally:
+        config.sort_merge_fanin = old
+
+
+def test_sort_buffermem():
+
+    table = [('foo', 'bar')] + [(i % 7, 'x' * (i % 50)) for i in range(1000)]
+    expect = sort(table, 'foo')
+
+    # a small budget should give several chunks
+    actual = sort(table, 'foo', buffermem='16kB')
+    ieq(expect, actual)
+    assert actual._memcache is None
+    assert len(actual._filecache) > 1
+
+    # a big budget should sort in memory, regardless of sort_buffersize
+    actual = sort(table, 'foo', buffermem='1GB')
+    ieq(expect, actual)
+    assert actual._memcache is not None
+
+    # explicit buffersize still caps the number of rows per chunk
+    actual = sort(table, 'foo', buffermem=2**30, buffersize=100)
+    ieq(expect, actual)
+    eq_(10, len(actual._filecache))
+
+    # the config setting flows through to other sorting transforms
+    import petl.config as config
+    old = config.sort_buffermem
+    config.sort_buffermem = '16kB'
+    try:
+        actual = mergesort(table, key='foo')
+        ieq(expect, actual)
+        assert len(actual.tables[0]._filecache) > 1
+    finally:
+        config.sort_buffermem = old
+
+
+def test_parsebytes():
+
+    eq_(None, _parsebytes(None))
+    eq_(1000, _parsebytes(1000))
+    eq_(1000, _parsebytes('1000'))
+    eq_(512 * 1024**2, _parsebytes('512MB'))
+    eq_(2 * 1024**3, _parsebytes('2 GiB'))
+    eq_(1536, _parsebytes('1.5k'))
+    try:
+        _parsebytes('lots')
+    except ArgumentError:
+        pass
+    else:
+        assert False, 'expected ArgumentError'
+
+
+def test_sort_native():
+
+    # keys are compared natively where the types of the key values allow,
+    # which should give the same order as comparing with Comparable
+    dt = datetime(2000, 1, 1).replace
+    table = [('foo', 'bar', 'baz')] + [
+        (i % 5 or None, dt(day=(i * 7) % 28 + 1), 'x%s' % (i % 3))
+        for i in range(40)
+    ]
+    table += [(2, None, 'x1'), (2.5, dt(day=3), None)]
+    mixed = table + [('a', 'b', 3)]
+
+    keys = {'foo': (0,), 'bar': (1,), ('foo', 'baz'): (0, 2),
+            ('baz', 'bar'): (2, 1), None: (0, 1, 2)}
+    for t in table, mixed:
+        for key, indices in keys.items():
+            for reverse in False, True:
+                getkey = comparable_itemgetter(*indices)
+                expect = [t[0]] + sorted(t[1:], key=getkey, reverse=reverse)
+                ieq(expect, sort(t, key, reverse=reverse))
+                # chunks may have different types to each other
+                ieq(expect, sort(t, key, reverse=reverse, buffersize=7))
+
+
+def test_sort_spill_formats():
+
+    table = (('foo', 'bar', 'baz'),
+             ('C', 2, 1.5),
+             ('A', 9, 2.5),
+             ('A', True, None),
+             ('F', 1, 0.5),
+             ('D', 2**70, 1.0),
+             ('B', 3),
+             ('E', 'x', 3.0, 'extra'),
+             ('G', 7, 4.0),
+             ('H', 8, 5.0))
+
+    expect = sort(table, 'foo')
+    for spill_format in ('batch', 'zlib', 'columns', 'pickle',
+                         SpillFormat(batchsize=2, columns=True),
+                         SpillFormat(batchsize=3, compress=9, columns=True)):
+        actual = sort(table, 'foo', buffersize=4, spill_format=spill_format)
+        ieq(expect, actual)
+        ieq(expect, actual)
+        # check values come back with the same types
+        for e, a in zip(expect, actual):
+            eq_([type(v) for v in e], [type(v) for v in a])
+
+    actual = mergesort(table, table, key='foo', buffersize=4,
+                       spill_format='columns')
+    ieq(sort(cat(table, table), 'foo'), actual)
+
+
+def test_sort_spill_format_unknown():
+
+    try:
+        sort((('foo',), (1,)), spill_format='foo')
+    except ArgumentError:
+        pass
+    else:
+        assert False, 'expected ArgumentError'
+
+
+
+def test_sort_aware_naive_datetimes():
+    from petl.test.test_comparison import _UTC
+
+    # a column mixing naive and aware datetimes can't be sorted natively
+    utc = _UTC()
+    table = [('foo', 'bar')] + [(datetime(2000, 1, 1 + i % 28), i)
+                                for i in range(10)] \
+        + [(datetime(2000, 1, 1 + i % 28, tzinfo=utc), i)
+           for i in range(10)]
+    expect = sorted(table[1:], key=comparable_itemgetter(0))
+    actual = sort(table, 'foo')
+    ieq([table[0]] + expect, actual)
+    actual = sort(table, 'foo', buffersize=3)
+    eq_(20, nrows(actual))
+
+
+def test_sort_buffered_workers():
+
+    table = (('foo', 'bar'),
+             ('C', 2),
+             ('A', 9),
+             ('A', None),
+             ('F', 1),
+             ('D', 'x'),
+             ('B', 2),
+             ('E', 9),
+             ('A', 2.0))
+
+    # parallel chunk sorting should give exactly the same output as sorting
+    # the chunks serially, including the order of mixed types and ties
+    for reverse in False, True:
+        for key in 'bar', None:
+            expect = sort(table, key, reverse=reverse, buffersize=2)
+            actual = sort(table, key, reverse=reverse, buffersize=2,
+                          workers=2)
+            ieq(expect, actual)
+            ieq(expect, actual)
+
+    # check files are cleaned up
+    result = sort(table, 'bar', buffersize=2, workers=3)
+    eq_(8, nrows(result))
+    eq_(4, len(result._filecache))
+    filenames = _get_names(result._filecache)
+    for fn in filenames:
+        assert os.path.exists(fn), fn
+    del result
+    gc.collect()
+    for fn in filenames:
+        assert not os.path.exists(fn), fn
+
+
+class _Uncomparable(object):
+
+    def __lt__(self, other):
+        raise ValueError('cannot compare')
+
+
+def test_sort_buffered_workers_error():
+
+    table = [('foo', 'bar')] + [(_Uncomparable(), 0), (_Uncomparable(), 1)] \
+        + [(i, i) for i in range(20)]
+
+    # if sorting a chunk fails, files of the other chunks are not left behind
+    tempdir = tempfile.mkdtemp()
+    try:
+        result = sort(table, 'foo', buffersize=2, workers=2, tempdir=tempdir)
+        try:
+            nrows(result)
+        except ValueError:
+            pass
+        else:
+            assert False, 'expected ValueError'
+        del result
+        gc.collect()
+        eq_([], os.listdir(tempdir))
+    finally:
+        shutil.rmtree(tempdir)
+
 
 
 def test_mergesort_1():
@@ -523,3 +763,190 @@ def test_issorted():
     assert not issorted(table5, key='foo')
     assert issorted(table5, key='foo', reverse=True)
     assert not issorted(table5, key='foo', reverse=True, strict=True)
+
+
+def test_topk():
+
+    table = (('foo', 'bar'),
+             ('C', 2),
+             ('A', 9),
+             ('A', None),
+             ('F', 1),
+             ('D', 'x'),
+             ('B', 2),
+             ('E', 9),
+             ('G', 2.0))
+
+    # should be the same as sort then head, including ties and mixed types
+    for reverse in False, True:
+        for key in 'bar', ('bar', 'foo'), None:
+            for n in 0, 1, 3, 5, 8, 20:
+                expect = head(sort(table, key, reverse=reverse), n)
+                actual = topk(table, key, n, reverse=reverse)
+                ieq(expect, actual)
+                ieq(expect, actual)
+
+
+def test_topk_empty():
+
+    table = (('foo', 'bar'),)
+    ieq(table, topk(table, 'foo', 3))
+
+
+def test_sort_sortorder():
+
+    table = (('foo', 'bar', 'baz'),
+             ('C', 2, True),
+             ('A', 9, False),
+             ('A', 6, True),
+             ('F', 1, False),
+             ('D', 10, True))
+
+    sorted1 = sort(table, key=('foo', 'bar'))
+    eq_((('foo', 'bar'), False), sorted1.sortorder)
+
+    # sorting again by the same key or a prefix of it is a no-op
+    assert sort(sorted1, key=('foo', 'bar')) is sorted1
+    assert sort(sorted1, key='foo') is sorted1
+    ieq(sort(list(sorted1), 'foo'), sort(sorted1, 'foo'))
+    # ... but not by a different key or in a different direction
+    assert sort(sorted1, key='bar') is not sorted1
+    assert sort(sorted1, key=('foo', 'bar'), reverse=True) is not sorted1
+    assert sort(sorted1) is not sorted1
+    assert sort(sort(table)) is not sort(table)
+
+    # lexical sorts
+    sorted2 = sort(table, reverse=True)
+    assert sort(sorted2, reverse=True) is sorted2
+
+    # order preserving transforms pass the sort order through
+    for t in (cut(sorted1, 'bar', 'foo'),
+              select(sorted1, lambda rec: rec.baz),
+              selectgt(sorted1, 'bar', 2),
+              convert(sorted1, 'baz', lambda v: not v)):
+        eq_((('foo', 'bar'), False), t.sortorder)
+        assert sort(t, 'foo') is t
+    for t in (cut(sorted1, 'foo', 'baz'),
+              cut(sorted1, 0, 1),
+              convert(sorted1, 'bar', lambda v: -v),
+              convert(sorted1, 2, lambda v: not v),
+              convert(sorted2, 'baz', lambda v: not v)):
+        eq_(None, t.sortorder)
+        assert sort(t, 'foo') is not t
+
+    # converters can be added after the view is created
+    t = convert(sorted1, 'baz', lambda v: not v)
+    t['foo'] = lambda v: v.lower()
+    eq_(None, t.sortorder)
+
+    # mergesort and topk know their output is sorted
+    eq_((('foo',), True), mergesort(table, table, key='foo',
+                                    reverse=True).sortorder)
+    eq_((('bar',), False), topk(table, 'bar', 2).sortorder)
+
+
+def test_sort_persist():
+
+    import petl.config as config
+    cachedir = tempfile.mkdtemp()
+    try:
+        fn = os.path.join(cachedir, 'data.csv')
+        tocsv([('foo', 'bar')] + [('%02d' % (i % 17), i) for i in range(50)],
+              fn)
+        expect = sort(fromcsv(fn), 'foo', reverse=True)
+        persist = os.path.join(cachedir, 'cache')
+
+        for buffersize in None, 7:
+            # first sort saves the chunks
+            result = sort(fromcsv(fn), 'foo', reverse=True,
+                          buffersize=buffersize, persist=persist)
+            ieq(expect, result)
+            assert result._hdrcache is not None
+            # sorting again reads them back without sorting
+            result = sort(fromcsv(fn), 'foo', reverse=True,
+                          buffersize=buffersize, persist=persist)
+            ieq(expect, result)
+            ieq(expect, result)
+            assert result._hdrcache is None
+            eq_(1, len(os.listdir(persist)))
+            shutil.rmtree(persist)
+
+        # different options, key or direction don't hit the cache
+        sort(fromcsv(fn), 'foo', persist=persist).nrows()
+        for t in (sort(fromcsv(fn), 'foo', reverse=True, persist=persist),
+                  sort(fromcsv(fn), 'bar', persist=persist),
+                  sort(fromcsv(fn, quotechar="'"), 'foo', persist=persist)):
+            t.nrows()
+            assert t._hdrcache is not None
+        eq_(4, len(os.listdir(persist)))
+
+        # changing the file doesn't either
+        tocsv([('foo', 'bar'), ('b', 1), ('a', 2)], fn)
+        os.utime(fn, (0, 0))
+        result = sort(fromcsv(fn), 'foo', persist=persist)
+        ieq([('foo', 'bar'), ('a', '2'), ('b', '1')], result)
+        assert result._hdrcache is not None
+
+        # least recently used entries are evicted
+        old = config.sort_persist_maxsize
+        config.sort_persist_maxsize = 1
+        try:
+            sort(fromcsv(fn), 'bar', persist=persist).nrows()
+            eq_(1, len(os.listdir(persist)))
+            result = sort(fromcsv(fn), 'bar', persist=persist)
+            result.nrows()
+            assert result._hdrcache is None
+        finally:
+            config.sort_persist_maxsize = old
+
+        # tables not read straight from a file are sorted as usual
+        result = sort(cut(fromcsv(fn), 'foo'), 'foo', persist=persist)
+        ieq([('foo',), ('a',), ('b',)], result)
+        eq_(1, len(os.listdir(persist)))
+
+    finally:
+        shutil.rmtree(cachedir)
+
+
+def test_sort_partitioned():
+
+    import random
+    rnd = random.Random(42)
+    keys = {
+        'int': lambda i: rnd.randrange(10000),
+        'text': lambda i: '%04d' % rnd.randrange(500),
+        'none': lambda i: rnd.choice([None, rnd.random()]),
+        # most rows fall into a single key range
+        'skewed': lambda i: 7 if rnd.random() < .6 else rnd.randrange(100),
+        # types which can't be compared natively turn up later on
+        'mixed': lambda i: rnd.randrange(50) if i < 3500
+        else rnd.choice(['x', 3, None]),
+    }
+    for kind in sorted(keys):
+        table = [('foo', 'bar', 'baz')] + [(keys[kind](i), rnd.randrange(5), i)
+                                           for i in range(5000)]
+        for key in 'foo', ('foo', 'bar'):
+            for reverse in False, True:
+                expect = sort(table, key, reverse=reverse, buffersize=None)
+                actual = sort(table, key, reverse=reverse, buffersize=1000)
+                ieq(expect, actual)
+                ieq(expect, actual)
+                if kind != 'mixed':
+                    assert actual._runsizes is not None, kind
+                # sorting without caching gives the same output
+                actual = sort(table, key, reverse=reverse, buffersize=1000,
+                              cache=False)
+                ieq(expect, actual)
+
+    # check files are cleaned up
+    table = [('foo', 'bar')] + [(i % 97, i) for i in range(5000)]
+    result = sort(table, 'foo', buffersize=1000)
+    eq_(5000, nrows(result))
+    filenames = _get_names(result._filecache)
+    eq_(10, len(filenames))
+    for fn in filenames:
+        assert os.path.exists(fn), fn
+    del result
+    gc.collect()
+    for fn in filenames:
+        assert not os.path.exists(fn), fn
@@ -0,0 +1,204 @@
+from __future__ import absolute_import, print_function, division
+
+
+from petl.test.helpers import ieq
+from petl.transform.windows import rolling, cumulative, cumsum, lag, lead, \
+    rownumber, rank, ntile
+
+
+table1 = (('foo', 'day', 'bar'),
+          ('b', 2, 1),
+          ('a', 1, 3),
+          ('a', 3, 4),
+          ('b', 1, 2),
+          ('a', 2, 7),
+          ('b', 3, 9),
+          ('a', 4, 2))
+
+
+def test_rolling():
+
+    actual = rolling(table1, 'total', 'bar', 3, key='foo', order='day')
+    expect = (('foo', 'day', 'bar', 'total'),
+              ('a', 1, 3, 3),
+              ('a', 2, 7, 10),
+              ('a', 3, 4, 14),
+              ('a', 4, 2, 13),
+              ('b', 1, 2, 2),
+              ('b', 2, 1, 3),
+              ('b', 3, 9, 12))
+    ieq(expect, actual)
+    ieq(expect, actual)
+
+    # no key, rows in the order they come
+    actual = rolling(table1, 'frame', 'bar', 2, list)
+    expect = (('foo', 'day', 'bar', 'frame'),
+              ('b', 2, 1, [1]),
+              ('a', 1, 3, [1, 3]),
+              ('a', 3, 4, [3, 4]),
+              ('b', 1, 2, [4, 2]),
+              ('a', 2, 7, [2, 7]),
+              ('b', 3, 9, [7, 9]),
+              ('a', 4, 2, [9, 2]))
+    ieq(expect, actual)
+
+    # function of the row, descending order
+    actual = rolling(table1, 'maxprod', lambda r: r.day * r.bar, 2, max,
+                     key='foo', order='day', reverse=True)
+    expect = (('foo', 'day', 'bar', 'maxprod'),
+              ('b', 3, 9, 27),
+              ('b', 2, 1, 27),
+              ('b', 1, 2, 2),
+              ('a', 4, 2, 8),
+              ('a', 3, 4, 12),
+              ('a', 2, 7, 14),
+              ('a', 1, 3, 14))
+    ieq(expect, actual)
+
+
+def test_cumulative():
+
+    actual = cumsum(table1, 'total', 'bar', key='foo', order='day')
+    expect = (('foo', 'day', 'bar', 'total'),
+              ('a', 1, 3, 3),
+              ('a', 2, 7, 10),
+              ('a', 3, 4, 14),
+              ('a', 4, 2, 16),
+              ('b', 1, 2, 2),
+              ('b', 2, 1, 3),
+              ('b', 3, 9, 12))
+    ieq(expect, actual)
+    ieq(expect, actual)
+
+    # each row gets its own list
+    actual = cumulative(table1, 'bars', 'bar', list, order='day', key='foo',
+                        presorted=False)
+    expect = (('foo', 'day', 'bar', 'bars'),
+              ('a', 1, 3, [3]),
+              ('a', 2, 7, [3, 7]),
+              ('a', 3, 4, [3, 7, 4]),
+              ('a', 4, 2, [3, 7, 4, 2]),
+              ('b', 1, 2, [2]),
+              ('b', 2, 1, [2, 1]),
+              ('b', 3, 9, [2, 1, 9]))
+    ieq(expect, actual)
+
+    # any other function
+    actual = cumulative(table1, 'spread', 'bar',
+                        lambda vals: max(vals) - min(vals), order='day',
+                        key='foo')
+    expect = (('foo', 'day', 'bar', 'spread'),
+              ('a', 1, 3, 0),
+              ('a', 2, 7, 4),
+              ('a', 3, 4, 4),
+              ('a', 4, 2, 5),
+              ('b', 1, 2, 0),
+              ('b', 2, 1, 1),
+              ('b', 3, 9, 8))
+    ieq(expect, actual)
+
+
+def test_lag_lead():
+
+    actual = lag(table1, 'prev', 'bar', key='foo', order='day')
+    expect = (('foo', 'day', 'bar', 'prev'),
+              ('a', 1, 3, None),
+              ('a', 2, 7, 3),
+              ('a', 3, 4, 7),
+              ('a', 4, 2, 4),
+              ('b', 1, 2, None),
+              ('b', 2, 1, 2),
+              ('b', 3, 9, 1))
+    ieq(expect, actual)
+    ieq(expect, actual)
+
+    actual = lead(table1, 'next', 'bar', 2, default=0, key='foo',
+                  order='day')
+    expect = (('foo', 'day', 'bar', 'next'),
+              ('a', 1, 3, 4),
+              ('a', 2, 7, 2),
+              ('a', 3, 4, 0),
+              ('a', 4, 2, 0),
+              ('b', 1, 2, 9),
+              ('b', 2, 1, 0),
+              ('b', 3, 9, 0))
+    ieq(expect, actual)
+    ieq(expect, actual)
+
+    # presorted, a new partition each time the key changes
+    actual = lag(table1, 'prev', 'day', key='foo', presorted=True)
+    expect = (('foo', 'day', 'bar', 'prev'),
+              ('b', 2, 1, None),
+              ('a', 1, 3, None),
+              ('a', 3, 4, 1),
+              ('b', 1, 2, None),
+              ('a', 2, 7, None),
+              ('b', 3, 9, None),
+              ('a', 4, 2, None))
+    ieq(expect, actual)
+
+
+def test_rownumber_rank():
+
+    table = (('foo', 'bar'),
+             ('a', 3),
+             ('b', 2),
+             ('a', 7),
+             ('a', 3),
+             ('a', 1),
+             ('b', 2))
+
+    actual = rownumber(table, key='foo', order='bar')
+    expect = (('foo', 'bar', 'rownumber'),
+              ('a', 1, 1),
+              ('a', 3, 2),
+              ('a', 3, 3),
+              ('a', 7, 4),
+              ('b', 2, 1),
+              ('b', 2, 2))
+    ieq(expect, actual)
+
+    actual = rank(table, order='bar', key='foo', reverse=True)
+    expect = (('foo', 'bar', 'rank'),
+              ('b', 2, 1),
+              ('b', 2, 1),
+              ('a', 7, 1),
+              ('a', 3, 2),
+              ('a', 3, 2),
+              ('a', 1, 4))
+    ieq(expect, actual)
+
+    actual = rank(table, 'r', order='bar', dense=True)
+    expect = (('foo', 'bar', 'r'),
+              ('a', 1, 1),
+              ('b', 2, 2),
+              ('b', 2, 2),
+              ('a', 3, 3),
+              ('a', 3, 3),
+              ('a', 7, 4))
+    ieq(expect, actual)
+
+
+def test_ntile():
+
+    table = [('foo', 'bar')] + [('a', i) for i in range(7)] + [('b', 0)]
+    actual = ntile(table, 'q', 3, key='foo', order='bar')
+    expect = (('foo', 'bar', 'q'),
+              ('a', 0, 1),
+              ('a', 1, 1),
+              ('a', 2, 1),
+              ('a', 3, 2),
+              ('a', 4, 2),
+              ('a', 5, 3),
+              ('a', 6, 3),
+              ('b', 0, 1))
+    ieq(expect, actual)
+    ieq(expect, actual)
+
+    # more buckets than rows
+    actual = ntile(table, 'q', 10, order='bar', reverse=True)
+    expect = [('foo', 'bar', 'q')] + \
+        [(f, b, i + 1)
+         for i, (f, b) in enumerate(sorted(table[1:], key=lambda r: r[1],
+                                           reverse=True))]
+    ieq(expect, actual)
@@ -5,7 +5,7 @@ from petl.errors import ArgumentError
 from petl.test.helpers import ieq, eq_
 from petl.compat import next
 from petl.util.base import header, fieldnames, data, dicts, records, \
-    namedtuples, itervalues, values, rowgroupby
+    namedtuples, itervalues, values, rowgroupby, Table
 
 
 def test_header():
@@ -45,6 +45,67 @@ def test_fieldnames():
     eq_(expect, actual)
 
 
+class _DataRowsNotRead(Table):
+
+    def __init__(self, table):
+        self.table = table
+
+    def __iter__(self):
+        it = iter(self.table)
+        yield next(it)
+        raise AssertionError('data rows should not be read')
+
+
+def test_header_resolved():
+    import petl as etl
+    left = [('foo', 'bar', 'baz'), ('a', 1, {'x': 1}), ('b', 2, {'y': 2})]
+    right = [('foo', 'quux'), ('a', True)]
+    transforms = [
+        lambda t: etl.sort(t, 'bar'),
+        lambda t: etl.cut(t, 'baz', 'foo'),
+        lambda t: etl.cutout(t, 'bar'),
+        lambda t: etl.cat(t, right),
+        lambda t: etl.addfield(t, 'spong', 42, index=1),
+        lambda t: etl.addfields(t, [('a', 1), ('b', 2, 0)]),
+        lambda t: etl.addrownumbers(t),
+        lambda t: etl.addcolumn(t, 'spong', [1, 2]),
+        lambda t: etl.movefield(t, 'foo', 2),
+        lambda t: etl.head(t, 1),
+        lambda t: etl.tail(t, 1),
+        lambda t: etl.rename(t, 'foo', 'spong'),
+        lambda t: etl.setheader(t, ['x', 'y', 'z']),
+        lambda t: etl.extendheader(t, ['spong']),
+        lambda t: etl.prefixheader(t, 'x_'),
+        lambda t: etl.suffixheader(t, '_x'),
+        lambda t: etl.sortheader(t),
+        lambda t: etl.select(t, 'bar', lambda v: v > 1),
+        lambda t: etl.selectgt(t, 'bar', 1),
+        lambda t: etl.convert(t, 'bar', str),
+        lambda t: etl.distinct(t, 'foo', count='n'),
+        lambda t: etl.duplicates(t, 'foo'),
+        lambda t: etl.unique(t, 'foo'),
+        lambda t: etl.filldown(t),
+        lambda t: etl.join(t, right, key='foo', rprefix='r_'),
+        lambda t: etl.leftjoin(t, right, key='foo'),
+        lambda t: etl.lookupjoin(t, right, key='foo', lprefix='l_'),
+        lambda t: etl.antijoin(t, right, key='foo'),
+        lambda t: etl.hashjoin(t, right, key='foo'),
+        lambda t: etl.hashrightjoin(t, right, key='foo'),
+        lambda t: etl.crossjoin(t, right, prefix=True),
+        lambda t: etl.mergesort(t, right, key='foo'),
+        lambda t: etl.unpackdict(t, 'baz', keys=['x', 'y']),
+        lambda t: etl.wrap(t).cache(),
+        lambda t: etl.wrap(t),
+    ]
+    for f in transforms:
+        expect = next(iter(f(left)))
+        actual = header(f(_DataRowsNotRead(left)))
+        eq_(tuple(expect), actual)
+        # composes through several views
+        actual = header(etl.cut(etl.sort(f(_DataRowsNotRead(left)), 0), 0))
+        eq_(tuple(expect[:1]), actual)
+
+
 def test_data():
     table = (('foo', 'bar'), ('a', 1), ('b', 2))
     actual = data(table)
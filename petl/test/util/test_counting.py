@@ -3,8 +3,10 @@ from __future__ import absolute_import, print_function, division
 
 from petl.compat import PY2
 from petl.test.helpers import ieq, eq_
+from petl.errors import ArgumentError
 from petl.util.counting import valuecount, valuecounter, valuecounts, \
-    rowlengths, typecounts, parsecounts, stringpatterns, nrows
+    rowlengths, typecounts, parsecounts, stringpatterns, nrows, \
+    HyperLogLog, approxdistinct, approxcountdistinct, approxvaluecounts
 
 
 def test_nrows():
@@ -178,3 +180,62 @@ def test_stringpatterns():
               ('999 9999', 2, 2./6),
               ('999-9999-AA', 1, 1./6))
     ieq(expect, actual)
+
+
+def test_approxdistinct():
+
+    table = [('foo', 'bar', 'baz')] + [('x%s' % (i % 7), i, i % 2)
+                                       for i in range(20000)]
+    eq_(7, approxdistinct(table, 'foo'))
+    eq_(14, approxdistinct(table, 'foo', 'baz'))
+    n = approxdistinct(table, 'bar')
+    assert abs(n - 20000) < 20000 * 0.03, n
+    n = approxdistinct(table, 'bar', error=0.05)
+    assert abs(n - 20000) < 20000 * 0.15, n
+    eq_(0, approxdistinct([('foo',)], 'foo'))
+
+
+def test_hyperloglog_merge():
+
+    # sketches over parts of the values should merge into exactly the sketch
+    # over all of them
+    expect = HyperLogLog(range(30000))
+    actual = HyperLogLog(range(10000))
+    actual.merge(HyperLogLog(range(5000, 20000)))
+    actual.merge(HyperLogLog(range(20000, 30000)))
+    eq_(expect.registers, actual.registers)
+    eq_(expect.estimate(), actual.estimate())
+    eq_(3, approxcountdistinct(['a', 'b', 'a', u'c']))
+
+
+def test_approxvaluecounts():
+
+    # all values fit, counts are exact
+    table = (('foo', 'bar'), ('a', 1), ('b', 2), ('b', 7), ('a',), ('b', 1))
+    expect = (('foo', 'count', 'frequency', 'error'),
+              ('b', 3, 0.6, 0),
+              ('a', 2, 0.4, 0))
+    ieq(expect, approxvaluecounts(table, 'foo'))
+    expect = (('foo', 'bar', 'count', 'frequency', 'error'),
+              ('b', 1, 3, 0.6, 2),
+              ('a', None, 2, 0.4, 1))
+    ieq(expect, approxvaluecounts(table, 'foo', 'bar', k=2))
+
+    # skewed values, more than fit
+    vals = [i % 10 if i % 2 else i for i in range(10000)]
+    table = [('foo',)] + [(v,) for v in vals]
+    exact = valuecounter(table, 'foo')
+    actual = list(approxvaluecounts(table, 'foo', k=50))[1:]
+    eq_(50, len(actual))
+    for v, n, _, e in actual:
+        assert n - e <= exact[v] <= n, (v, n, e, exact[v])
+    # values occurring in more than 1/k of the rows are all there
+    eq_(set(range(1, 10, 2)), set(v for v, n, _, _ in actual[:5]))
+
+    # must count at least one value
+    try:
+        approxvaluecounts(table, 'foo', k=0)
+    except ArgumentError:
+        pass
+    else:
+        assert False, 'expected ArgumentError'
@@ -1,10 +1,14 @@
 from __future__ import absolute_import, print_function, division
 
 
+import os
+from tempfile import NamedTemporaryFile
+
+
 from petl.errors import DuplicateKeyError
 from petl.test.helpers import eq_
 from petl import cut, lookup, lookupone, dictlookup, dictlookupone, \
-    recordlookup, recordlookupone
+    recordlookup, recordlookupone, DiskLookup
 
 
 def test_lookup():
@@ -188,3 +192,106 @@ def test_recordlookupone():
     lkp = recordlookupone(cut(t1, 'foo'), 'foo', strict=False)
     eq_('a', lkp['a'].foo)
     eq_('b', lkp['b'].foo)
+
+
+def test_disklookup():
+
+    t1 = (('foo', 'bar'), ('a', 1), ('b', 2), ('b', 3), (('c', 1), 4))
+
+    # small batch and cache sizes to exercise the database
+    lkp = DiskLookup(cachesize=1, batchsize=2)
+    actual = lookup(t1, 'foo', 'bar', lkp)
+    eq_([1], actual['a'])
+    eq_([2, 3], actual['b'])
+    eq_([4], actual[('c', 1)])
+    assert 'x' not in actual
+    assert 'x' not in actual
+    eq_(3, len(actual))
+    eq_({'a', 'b', ('c', 1)}, set(actual))
+    del actual['a']
+    assert 'a' not in actual
+    eq_(2, len(actual))
+    path = lkp.path
+    lkp.close()
+    assert not os.path.exists(path)
+
+    # records can be stored too
+    with DiskLookup(cachesize=0, batchsize=1) as lkp:
+        actual = recordlookupone(t1, 'foo', dictionary=lkp)
+        eq_(2, actual['b'].bar)
+
+
+def test_disklookup_compound_keys():
+
+    # equal keys made of equal but not identical objects
+    ab = 'ab'
+    with DiskLookup(cachesize=0, batchsize=1) as lkp:
+        lkp[(ab, ab)] = 1
+        eq_(1, lkp[('ab', ''.join(['a', 'b']))])
+        assert (''.join(['a', 'b']), 'ab') in lkp
+
+    t1 = (('k1', 'k2', 'x'), (ab, ab, 1), ('cd', 'c' + 'd', 2))
+    t2 = (('k1', 'k2', 'y'),
+          (''.join(['a', 'b']), 'ab', 1),
+          ('cd', 'cd', 2))
+    with DiskLookup(cachesize=0, batchsize=1) as lkp:
+        actual = lookupone(t2, ('k1', 'k2'), 'y', lkp)
+        for row in t1[1:]:
+            eq_(row[2], actual[row[:2]])
+
+
+def test_disklookup_persistent():
+
+    t1 = (('foo', 'bar'), ('a', 1), ('b', 2), ('b', 3))
+
+    f = NamedTemporaryFile(delete=False)
+    f.close()
+    with DiskLookup(f.name) as lkp:
+        lookupone(t1, 'foo', 'bar', lkp)
+    with DiskLookup(f.name) as lkp:
+        eq_(1, lkp['a'])
+        eq_(2, lkp['b'])
+        eq_(2, len(lkp))
+    os.remove(f.name)
+
+
+def test_lookup_compact():
+
+    t1 = (('foo', 'bar', 'baz'),
+          ('a', 1, True),
+          ('b', 2, False),
+          ('b', 3, True),
+          ('b', 3, False))
+
+    for key in 'foo', ('foo', 'bar'):
+        for value in None, 'bar', ('bar', 'baz'):
+            expect = lookup(t1, key, value)
+            actual = lookup(t1, key, value, compact=True)
+            eq_(expect, actual)
+            eq_(list(expect), list(actual))
+            expect = lookupone(t1, key, value)
+            actual = lookupone(t1, key, value, compact=True)
+            eq_(expect, actual)
+            eq_(list(expect), list(actual))
+
+    try:
+        lookupone(t1, 'foo', compact=True, strict=True)
+    except DuplicateKeyError:
+        pass  # expected
+    else:
+        assert False, 'expected error'
+
+    # enough rows to resize the index, ints too big for an array, and
+    # columns switching from arrays to lists part way through
+    t2 = [('foo', 'bar')] + [(i * 7, i) for i in range(1000)]
+    t2 += [(2 ** 70, 'x'), ('a', 2.5), (7, None), (True, 1.5)]
+    expect = lookup(t2, 'foo')
+    actual = lookup(t2, 'foo', compact=True)
+    eq_(expect, actual)
+    eq_(len(expect), len(actual))
+    eq_([(7, 1), (7, None)], actual[7])
+    assert 3 not in actual
+    expect = lookupone(t2, 'foo', 'bar')
+    actual = lookupone(t2, 'foo', 'bar', compact=True)
+    eq_(expect, actual)
+    eq_(1.5, actual[True])
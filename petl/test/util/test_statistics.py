@@ -2,7 +2,11 @@ from __future__ import absolute_import, print_function, division
 
 
 from petl.test.helpers import eq_
-from petl.util.statistics import stats
+import bisect
+import random
+
+
+from petl.util.statistics import stats, quantiles, QuantileSketch
 
 
 def test_stats():
@@ -23,3 +27,47 @@ def test_stats():
     eq_(2.0, result.mean)
     eq_(2/3, result.pvariance)
     eq_((2/3)**.5, result.pstdev)
+
+
+def test_quantiles():
+
+    table = (('foo', 'bar'),
+             ('A', 3),
+             ('B', '1'),
+             ('C', 'xyz'),
+             ('D', 4.0),
+             ('E', None),
+             ('F', 2))
+
+    # exact when there are few values
+    eq_([1.0, 2.0, 4.0, 4.0], quantiles(table, 'bar', qs=[0, .5, .9, 1]))
+    eq_([None], quantiles(table[:1], 'bar', qs=[.5]))
+
+
+def test_quantilesketch():
+
+    rnd = random.Random(42)
+    data = [rnd.random() for _ in range(100000)]
+    ordered = sorted(data)
+    qs = [.01, .25, .5, .75, .99]
+
+    def check(sketch):
+        eq_(len(data), sketch.count)
+        # memory is bounded
+        assert sum(len(c) for c in sketch.compactors) < 1000
+        for q, v in zip(qs, sketch.quantiles(qs)):
+            rank = bisect.bisect_left(ordered, v) / len(data)
+            assert abs(rank - q) < .02, (q, rank)
+
+    sketch = QuantileSketch()
+    for v in data:
+        sketch.update(v)
+    check(sketch)
+
+    # merging sketches of parts of the data
+    sketch = QuantileSketch()
+    for i in range(0, len(data), 7000):
+        part = QuantileSketch()
+        part.extend(data[i:i + 7000])
+        sketch.merge(part)
+    check(sketch)
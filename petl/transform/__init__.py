@@ -11,7 +11,7 @@ from petl.transform.conversions import convert, convertall, replace, \
     replaceall, update, convertnumbers, format, formatall, interpolate, \
     interpolateall
 
-from petl.transform.sorts import sort, mergesort, issorted
+from petl.transform.sorts import sort, mergesort, issorted, topk
 
 from petl.transform.selects import select, selectop, selectcontains, \
     selecteq, selectfalse, selectge, selectgt, selectin, selectis, \
@@ -24,7 +24,7 @@ from petl.transform.joins import join, leftjoin, rightjoin, outerjoin, \
     crossjoin, antijoin, lookupjoin, unjoin
 
 from petl.transform.hashjoins import hashjoin, hashleftjoin, hashrightjoin, \
-    hashantijoin, hashlookupjoin
+    hashantijoin, hashlookupjoin, autojoin
 
 from petl.transform.reductions import rowreduce, mergeduplicates,\
     aggregate, groupcountdistinctvalues, groupselectfirst, groupselectmax, \
@@ -43,7 +43,7 @@ from petl.transform.maps import fieldmap, rowmap, rowmapmany, rowgroupmap
 from petl.transform.unpacks import unpack, unpackdict
 
 from petl.transform.dedup import duplicates, unique, distinct, conflicts, \
-    isunique
+    isunique, hashduplicates, hashunique, hashdistinct
 
 from petl.transform.setops import complement, intersection, \
     recordcomplement, diff, recorddiff, hashintersection, hashcomplement
@@ -55,3 +55,6 @@ from petl.transform.intervals import intervaljoin, intervalleftjoin, \
     facetintervalrecordlookupone, collapsedintervals
 
 from petl.transform.validation import validate
+
+from petl.transform.windows import rolling, cumulative, cumsum, lag, lead, \
+    rownumber, rank, ntile
@@ -0,0 +1,386 @@
+from __future__ import absolute_import, print_function, division
+
+
+from petl.util.statistics import _stats, onlinestats, QuantileSketch
+
+
+class Accumulator(object):
+    """
+    Base class for aggregations which can be computed a value at a time, for
+    use with :func:`petl.transform.reductions.aggregate`. E.g.::
+
+        >>> import petl as etl
+        >>> from petl.transform.accumulators import Mean, Count
+        >>> table1 = [['foo', 'bar'],
+        ...           ['a', 3],
+        ...           ['a', 7],
+        ...           ['b', 2],
+        ...           ['b', 1],
+        ...           ['b', 9]]
+        >>> aggregation = {'n': Count(), 'meanbar': ('bar', Mean())}
+        >>> table2 = etl.aggregate(table1, 'foo', aggregation)
+        >>> table2.cut('foo', 'n', 'meanbar')
+        +-----+---+---------+
+        | foo | n | meanbar |
+        +=====+===+=========+
+        | 'a' | 2 |     5.0 |
+        +-----+---+---------+
+        | 'b' | 3 |     4.0 |
+        +-----+---+---------+
+
+    The state of an aggregation for a group of rows starts out as
+    :meth:`init`, and is updated with each value in turn by :meth:`update`,
+    which returns the new state. States for two parts of the same group can
+    be combined by :meth:`merge`, and :meth:`finalize` turns a state into
+    the result. Subclasses need to implement :meth:`init`, :meth:`update` and
+    :meth:`merge`, and may override :meth:`extend` to add a batch of values
+    in one go, and :meth:`finalize` if the state isn't the result.
+
+    Accumulators are also callable with an iterable of values, so can be
+    used anywhere an aggregation function can.
+
+    """
+
+    def init(self):
+        """Return the state for no values."""
+        raise NotImplementedError
+
+    def update(self, state, value):
+        """Return the state with `value` added."""
+        raise NotImplementedError
+
+    def extend(self, state, values):
+        """Return the state with a list of `values` added."""
+        update = self.update
+        for value in values:
+            state = update(state, value)
+        return state
+
+    def merge(self, state, other):
+        """Return the state for the values of `state` followed by those of
+        `other`."""
+        raise NotImplementedError
+
+    def finalize(self, state):
+        """Return the result for the given state."""
+        return state
+
+    def __call__(self, values):
+        return self.finalize(self.extend(self.init(), list(values)))
+
+    def __repr__(self):
+        return '%s()' % self.__class__.__name__
+
+
+class Count(Accumulator):
+    """Count the values."""
+
+    def init(self):
+        return 0
+
+    def update(self, state, value):
+        return state + 1
+
+    def extend(self, state, values):
+        return state + len(values)
+
+    def merge(self, state, other):
+        return state + other
+
+
+class Sum(Accumulator):
+    """Sum the values, as the builtin :func:`sum`."""
+
+    def init(self):
+        return 0
+
+    def update(self, state, value):
+        return state + value
+
+    def extend(self, state, values):
+        return sum(values, state)
+
+    def merge(self, state, other):
+        return state + other
+
+
+# N.B., states holding at most one value are kept as a tuple of zero or one
+# items, as None may be a value
+
+
+class Min(Accumulator):
+    """Find the smallest value, the first one if there are ties."""
+
+    def init(self):
+        return ()
+
+    def update(self, state, value):
+        if not state or value < state[0]:
+            return value,
+        return state
+
+    def extend(self, state, values):
+        if values:
+            return self.update(state, min(values))
+        return state
+
+    def merge(self, state, other):
+        if other:
+            return self.update(state, other[0])
+        return state
+
+    def finalize(self, state):
+        return state[0] if state else None
+
+
+class Max(Min):
+    """Find the largest value, the first one if there are ties."""
+
+    def update(self, state, value):
+        if not state or value > state[0]:
+            return value,
+        return state
+
+    def extend(self, state, values):
+        if values:
+            return self.update(state, max(values))
+        return state
+
+
+class First(Min):
+    """Find the first value."""
+
+    def update(self, state, value):
+        return state or (value,)
+
+    def extend(self, state, values):
+        if values:
+            return state or (values[0],)
+        return state
+
+
+class Last(Min):
+    """Find the last value."""
+
+    def update(self, state, value):
+        return value,
+
+    def extend(self, state, values):
+        if values:
+            return values[-1],
+        return state
+
+    def merge(self, state, other):
+        return other or state
+
+
+class Mean(Accumulator):
+    """Find the arithmetic mean of the values."""
+
+    def init(self):
+        return 0, 0
+
+    def update(self, state, value):
+        return state[0] + 1, state[1] + value
+
+    def extend(self, state, values):
+        return state[0] + len(values), sum(values, state[1])
+
+    def merge(self, state, other):
+        return state[0] + other[0], state[1] + other[1]
+
+    def finalize(self, state):
+        n, total = state
+        return total / n if n else None
+
+
+class List(Accumulator):
+    """Collect the values in a list, as the builtin :func:`list`."""
+
+    def init(self):
+        return []
+
+    def update(self, state, value):
+        state.append(value)
+        return state
+
+    def extend(self, state, values):
+        state.extend(values)
+        return state
+
+    def merge(self, state, other):
+        return state + other
+
+
+class Set(Accumulator):
+    """Collect the values in a set, as the builtin :func:`set`."""
+
+    def init(self):
+        return set()
+
+    def update(self, state, value):
+        state.add(value)
+        return state
+
+    def extend(self, state, values):
+        state.update(values)
+        return state
+
+    def merge(self, state, other):
+        return state | other
+
+
+class Stats(Accumulator):
+    """Calculate the same basic descriptive statistics of the values as
+    :func:`petl.util.statistics.stats`."""
+
+    def init(self):
+        # count, errors, sum, min, max, mean, variance
+        return 0, 0, 0, None, None, 0, 0
+
+    def update(self, state, value):
+        count, errors, total, lo, hi, mean, var = state
+        try:
+            value = float(value)
+        except (ValueError, TypeError):
+            return count, errors + 1, total, lo, hi, mean, var
+        count += 1
+        if lo is None or value < lo:
+            lo = value
+        if hi is None or value > hi:
+            hi = value
+        mean, var = onlinestats(value, count, mean=mean, variance=var)
+        return count, errors, total + value, lo, hi, mean, var
+
+    def merge(self, state, other):
+        n1, e1, s1, lo1, hi1, m1, v1 = state
+        n2, e2, s2, lo2, hi2, m2, v2 = other
+        if not n2:
+            return (n1, e1 + e2) + state[2:]
+        if not n1:
+            return (n2, e1 + e2) + other[2:]
+        n = n1 + n2
+        # combine population variances of the two parts
+        delta = m2 - m1
+        mean = m1 + delta * n2 / n
+        var = (n1 * v1 + n2 * v2 + delta * delta * n1 * n2 / n) / n
+        return (n, e1 + e2, s1 + s2, min(lo1, lo2), max(hi1, hi2), mean,
+                var)
+
+    def finalize(self, state):
+        count, errors, total, lo, hi, mean, var = state
+        return _stats(count, errors, total, lo, hi, mean, var, var**.5)
+
+
+class Quantiles(Accumulator):
+    """Estimate quantiles of the values in bounded memory, as
+    :func:`petl.util.statistics.quantiles`. E.g.::
+
+        >>> import petl as etl
+        >>> from petl.transform.accumulators import Quantiles
+        >>> table1 = [['foo', 'bar']] + [['a', i] for i in range(1, 101)] \\
+        ...     + [['b', i * 10] for i in range(1, 11)]
+        >>> table2 = etl.aggregate(table1, 'foo', {
+        ...     'median': ('bar', Quantiles(.5)),
+        ...     'tail': ('bar', Quantiles([.9, .99]))
+        ... })
+        >>> table2.cut('foo', 'median', 'tail')
+        +-----+--------+---------------+
+        | foo | median | tail          |
+        +=====+========+===============+
+        | 'a' |   50.0 | [90.0, 99.0]  |
+        +-----+--------+---------------+
+        | 'b' |   50.0 | [90.0, 100.0] |
+        +-----+--------+---------------+
+
+    If `qs` is a single number the result is a single estimate, otherwise a
+    list. The state for each group is a
+    :class:`petl.util.statistics.QuantileSketch`, so memory doesn't grow
+    with the size of the group, and states can be merged, e.g., when
+    aggregating with `workers`."""
+
+    def __init__(self, qs=0.5, k=200):
+        for q in qs if isinstance(qs, (list, tuple)) else [qs]:
+            if not 0 <= q <= 1:
+                raise ValueError('quantiles must be between 0 and 1, found %r'
+                                 % q)
+        self.qs = qs
+        self.k = k
+
+    def init(self):
+        return QuantileSketch(self.k)
+
+    def update(self, state, value):
+        try:
+            value = float(value)
+        except (ValueError, TypeError):
+            pass
+        else:
+            state.update(value)
+        return state
+
+    def extend(self, state, values):
+        try:
+            values = list(map(float, values))
+        except (ValueError, TypeError):
+            # skip values which can't be converted, one at a time
+            return Accumulator.extend(self, state, values)
+        state.extend(values)
+        return state
+
+    def merge(self, state, other):
+        state.merge(other)
+        return state
+
+    def finalize(self, state):
+        if isinstance(self.qs, (list, tuple)):
+            return state.quantiles(self.qs)
+        return state.quantile(self.qs)
+
+    def __repr__(self):
+        return 'Quantiles(%r, k=%r)' % (self.qs, self.k)
+
+
+# accumulators standing in for builtin aggregation functions, which give the
+# same results without needing all the values of a group at once
+_builtins = {
+    len: Count(),
+    sum: Sum(),
+    min: Min(),
+    max: Max(),
+    list: List(),
+    set: Set(),
+}
+
+
+class _CallableAccumulator(Accumulator):
+    # adapts any other aggregation function by collecting the values
+
+    def __init__(self, f):
+        self.f = f
+
+    def init(self):
+        return []
+
+    def update(self, state, value):
+        state.append(value)
+        return state
+
+    def extend(self, state, values):
+        state.extend(values)
+        return state
+
+    def merge(self, state, other):
+        return state + other
+
+    def finalize(self, state):
+        return self.f(state)
+
+
+def _asaccumulator(f):
+    if isinstance(f, Accumulator):
+        return f
+    try:
+        return _builtins[f]
+    except (KeyError, TypeError):  # TypeError if unhashable
+        return _CallableAccumulator(f)
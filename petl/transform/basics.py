@@ -9,7 +9,8 @@ from petl.compat import izip, izip_longest, next, string_types, text_type
 
 
 # internal dependencies
-from petl.util.base import asindices, rowgetter, Record, Table
+from petl.util.base import asindices, rowgetter, Record, Table, header, \
+    derivedheader
 
 
 import logging
@@ -121,9 +122,24 @@ class CutView(Table):
         self.spec = spec
         self.missing = missing
 
+    @property
+    def sortorder(self):
+        # rows stay in the same order, so the source sort order still holds
+        # as long as all the key fields are selected by name
+        order = getattr(self.source, 'sortorder', None)
+        if order is None or order.key is None:
+            return None
+        if all(isinstance(f, string_types) and f in self.spec
+               for f in order.key):
+            return order
+        return None
+
     def __iter__(self):
         return itercut(self.source, self.spec, self.missing)
 
+    def resolveheader(self):
+        return derivedheader(itercut, self.source, self.spec, self.missing)
+
 
 def itercut(source, spec, missing=None):
     it = iter(source)
@@ -196,6 +212,9 @@ class CutOutView(Table):
     def __iter__(self):
         return itercutout(self.source, self.spec, self.missing)
 
+    def resolveheader(self):
+        return derivedheader(itercutout, self.source, self.spec, self.missing)
+
 
 def itercutout(source, spec, missing=None):
     it = iter(source)
@@ -337,6 +356,10 @@ class CatView(Table):
     def __iter__(self):
         return itercat(self.sources, self.missing, self.header)
 
+    def resolveheader(self):
+        return next(itercat([[header(t)] for t in self.sources],
+                            self.missing, self.header))
+
 
 def itercat(sources, missing, header):
     its = [iter(t) for t in sources]
@@ -448,6 +471,9 @@ class StackView(Table):
     def __iter__(self):
         return iterstack(self.sources, self.missing, self.trim, self.pad)
 
+    def resolveheader(self):
+        return header(self.sources[0])
+
 
 def iterstack(sources, missing, trim, pad):
     its = [iter(t) for t in sources]
@@ -523,6 +549,10 @@ class AddFieldView(Table):
     def __iter__(self):
         return iteraddfield(self.source, self.field, self.value, self.index)
 
+    def resolveheader(self):
+        return derivedheader(iteraddfield, self.source, self.field,
+                             self.value, self.index)
+
 
 def iteraddfield(source, field, value, index):
     it = iter(source)
@@ -612,6 +642,9 @@ class AddFieldsView(Table):
     def __iter__(self):
         return iteraddfields(self.source, self.field_defs)
 
+    def resolveheader(self):
+        return derivedheader(iteraddfields, self.source, self.field_defs)
+
 
 def iteraddfields(source, field_defs):
     it = iter(source)
@@ -724,6 +757,9 @@ class RowSliceView(Table):
     def __iter__(self):
         return iterrowslice(self.source, self.sliceargs)
 
+    def resolveheader(self):
+        return header(self.source)
+
 
 def iterrowslice(source, sliceargs):
     it = iter(source)
@@ -820,6 +856,9 @@ class TailView(Table):
     def __iter__(self):
         return itertail(self.source, self.n)
 
+    def resolveheader(self):
+        return header(self.source)
+
 
 def itertail(source, n):
     it = iter(source)
@@ -903,6 +942,11 @@ class MoveFieldView(Table):
         self.index = index
         self.missing = missing
 
+    def resolveheader(self):
+        outhdr = [f for f in header(self.table) if f != self.field]
+        outhdr.insert(self.index, self.field)
+        return tuple(outhdr)
+
     def __iter__(self):
         it = iter(self.table)
 
@@ -1036,6 +1080,10 @@ class AddRowNumbersView(Table):
     def __iter__(self):
         return iteraddrownumbers(self.table, self.start, self.step, self.field)
 
+    def resolveheader(self):
+        return derivedheader(iteraddrownumbers, self.table, self.start,
+                             self.step, self.field)
+
 
 def iteraddrownumbers(table, start, step, field):
     it = iter(table)
@@ -1091,6 +1139,10 @@ class AddColumnView(Table):
         return iteraddcolumn(self._table, self._field, self._col,
                              self._index, self._missing)
 
+    def resolveheader(self):
+        return derivedheader(iteraddcolumn, self._table, self._field,
+                             self._col, self._index, self._missing)
+
 
 def iteraddcolumn(table, field, col, index, missing):
     it = iter(table)
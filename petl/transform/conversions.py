@@ -341,6 +341,23 @@ class FieldConvertView(Table):
         self.where = where
         self.pass_row = pass_row
 
+    @property
+    def sortorder(self):
+        # rows stay in the same order, so the source sort order still holds
+        # as long as none of the key fields are converted
+        order = getattr(self.source, 'sortorder', None)
+        if order is None or order.key is None:
+            return None
+        if all(isinstance(f, string_types) for f in order.key) \
+                and all(isinstance(f, string_types) and f not in order.key
+                        for f in self.converters):
+            return order
+        return None
+
+    def resolveheader(self):
+        # fields are not modified
+        return header(self.source)
+
     def __iter__(self):
         return iterfieldconvert(self.source, self.converters, self.failonerror,
                                 self.errorvalue, self.where, self.pass_row)
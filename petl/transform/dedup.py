@@ -1,12 +1,22 @@
 from __future__ import absolute_import, print_function, division
 
 
+import itertools
+import logging
 import operator
+from tempfile import NamedTemporaryFile
 from petl.compat import text_type
 
 
-from petl.util.base import Table, asindices, itervalues
-from petl.transform.sorts import sort
+from petl.util.base import Table, asindices, itervalues, header
+from petl.transform.sorts import sort, _NamedTempFileDeleteOnGC, \
+    _iterchunk, _getspillformat, _parsebytes, _rowsize, _mergesorted, \
+    _hashpartition, _spillbatchsize
+import petl.config as config
+
+
+logger = logging.getLogger(__name__)
+debug = logger.debug
 
 
 def duplicates(table, key=None, presorted=False, buffersize=None, tempdir=None, 
@@ -83,6 +93,9 @@ class DuplicatesView(Table):
     def __iter__(self):
         return iterduplicates(self.source, self.key)
 
+    def resolveheader(self):
+        return header(self.source)
+
 
 def iterduplicates(source, key):
     # assume source is sorted
@@ -183,6 +196,9 @@ class UniqueView(Table):
     def __iter__(self):
         return iterunique(self.source, self.key)
 
+    def resolveheader(self):
+        return header(self.source)
+
 
 def iterunique(source, key):
     # assume source is sorted
@@ -311,6 +327,9 @@ class ConflictsView(Table):
     def __iter__(self):
         return iterconflicts(self.source, self.key, self.missing, self.exclude, 
                              self.include)
+
+    def resolveheader(self):
+        return header(self.source)
     
     
 def iterconflicts(source, key, missing, exclude, include):
@@ -405,6 +424,12 @@ class DistinctView(Table):
         self.key = key
         self.count = count
 
+    def resolveheader(self):
+        hdr = header(self.table)
+        if self.count:
+            hdr += (self.count,)
+        return hdr
+
     def __iter__(self):
         it = iter(self.table)
         hdr = next(it)
@@ -481,3 +506,428 @@ def isunique(table, field):
 
 
 Table.isunique = isunique
+
+
+def hashduplicates(table, key=None, buffermem=None, tempdir=None):
+    """
+    Alternative implementation of :func:`petl.transform.dedup.duplicates`,
+    which keeps track of the rows seen so far in a hash table rather than
+    sorting the table. The output rows are in the order of the input, except
+    that the first row with each duplicated key comes out just before the
+    second. E.g.::
+
+        >>> import petl as etl
+        >>> table1 = [['foo', 'bar', 'baz'],
+        ...           ['A', 1, 2.0],
+        ...           ['B', 2, 3.4],
+        ...           ['D', 6, 9.3],
+        ...           ['B', 3, 7.8],
+        ...           ['C', 5, 1.2],
+        ...           ['B', 2, 12.3],
+        ...           ['D', 6, 12.3]]
+        >>> table2 = etl.hashduplicates(table1, 'foo')
+        >>> table2
+        +-----+-----+------+
+        | foo | bar | baz  |
+        +=====+=====+======+
+        | 'B' |   2 |  3.4 |
+        +-----+-----+------+
+        | 'B' |   3 |  7.8 |
+        +-----+-----+------+
+        | 'B' |   2 | 12.3 |
+        +-----+-----+------+
+        | 'D' |   6 |  9.3 |
+        +-----+-----+------+
+        | 'D' |   6 | 12.3 |
+        +-----+-----+------+
+
+    Memory use grows with the number of distinct keys, and can be limited
+    via the `buffermem` argument, which can be a number of bytes or a string
+    like ``'512MB'``. Once the hash table is estimated to have grown past
+    this limit, it and the rest of the table are split into partitions by a
+    hash of the key, which are written to temporary files (in `tempdir`, if
+    given) and dealt with one at a time, and the output is put back in the
+    same order as if all rows had fitted in memory. If `buffermem` is `None`,
+    the value of `petl.config.hashdedup_buffermem` will be used, which is
+    `None` by default, meaning no limit.
+
+    """
+
+    return HashDuplicatesView(table, key=key, buffermem=buffermem,
+                              tempdir=tempdir)
+
+
+Table.hashduplicates = hashduplicates
+
+
+class HashDuplicatesView(Table):
+
+    def __init__(self, source, key=None, buffermem=None, tempdir=None):
+        self.source = source
+        self.key = key
+        self.buffermem = _parsebytes(buffermem)
+        self.tempdir = tempdir
+
+    def __iter__(self):
+        return iterhashdedup(self.source, self.key, _DuplicatesTable(),
+                             self.buffermem, self.tempdir)
+
+    def resolveheader(self):
+        return header(self.source)
+
+
+def hashunique(table, key=None, buffermem=None, tempdir=None):
+    """
+    Alternative implementation of :func:`petl.transform.dedup.unique`, which
+    keeps track of the rows seen so far in a hash table rather than sorting
+    the table. The output rows are in the order of the input, but nothing can
+    be output until the whole table has been read. E.g.::
+
+        >>> import petl as etl
+        >>> table1 = [['foo', 'bar', 'baz'],
+        ...           ['A', 1, 2],
+        ...           ['B', '2', '3.4'],
+        ...           ['D', 'xyz', 9.0],
+        ...           ['B', u'3', u'7.8'],
+        ...           ['F', 7, 2.3],
+        ...           ['B', '2', 42],
+        ...           ['E', None, None],
+        ...           ['D', 4, 12.3]]
+        >>> table2 = etl.hashunique(table1, 'foo')
+        >>> table2
+        +-----+------+------+
+        | foo | bar  | baz  |
+        +=====+======+======+
+        | 'A' |    1 |    2 |
+        +-----+------+------+
+        | 'F' |    7 |  2.3 |
+        +-----+------+------+
+        | 'E' | None | None |
+        +-----+------+------+
+
+    See :func:`petl.transform.dedup.hashduplicates` for the `buffermem` and
+    `tempdir` arguments.
+
+    """
+
+    return HashUniqueView(table, key=key, buffermem=buffermem,
+                          tempdir=tempdir)
+
+
+Table.hashunique = hashunique
+
+
+class HashUniqueView(Table):
+
+    def __init__(self, source, key=None, buffermem=None, tempdir=None):
+        self.source = source
+        self.key = key
+        self.buffermem = _parsebytes(buffermem)
+        self.tempdir = tempdir
+
+    def __iter__(self):
+        return iterhashdedup(self.source, self.key, _UniqueTable(),
+                             self.buffermem, self.tempdir)
+
+    def resolveheader(self):
+        return header(self.source)
+
+
+def hashdistinct(table, key=None, count=None, buffermem=None, tempdir=None):
+    """
+    Alternative implementation of :func:`petl.transform.dedup.distinct`,
+    which keeps track of the keys seen so far in a hash table rather than
+    sorting the table. The first row with each key is output as soon as it
+    is read, so the output is in the order of the input, and only the keys
+    are kept in memory. E.g.::
+
+        >>> import petl as etl
+        >>> table1 = [['foo', 'bar', 'baz'],
+        ...           ['B', 2, 3.4],
+        ...           ['A', 1, 2.0],
+        ...           ['B', 3, 7.8],
+        ...           ['A', 1, 5.6]]
+        >>> table2 = etl.hashdistinct(table1, key='foo', count='n')
+        >>> table2
+        +-----+-----+-----+---+
+        | foo | bar | baz | n |
+        +=====+=====+=====+===+
+        | 'B' |   2 | 3.4 | 2 |
+        +-----+-----+-----+---+
+        | 'A' |   1 | 2.0 | 2 |
+        +-----+-----+-----+---+
+
+    If `count` is given, the number of rows with each key is added in a field
+    of that name, in which case the first row with each key has to be kept in
+    memory and nothing can be output until the whole table has been read.
+
+    See :func:`petl.transform.dedup.hashduplicates` for the `buffermem` and
+    `tempdir` arguments.
+
+    """
+
+    return HashDistinctView(table, key=key, count=count, buffermem=buffermem,
+                            tempdir=tempdir)
+
+
+Table.hashdistinct = hashdistinct
+
+
+class HashDistinctView(Table):
+
+    def __init__(self, source, key=None, count=None, buffermem=None,
+                 tempdir=None):
+        self.source = source
+        self.key = key
+        self.count = count
+        self.buffermem = _parsebytes(buffermem)
+        self.tempdir = tempdir
+
+    def __iter__(self):
+        return iterhashdedup(self.source, self.key,
+                             _DistinctTable(bool(self.count)), self.buffermem,
+                             self.tempdir, addfield=self.count)
+
+    def resolveheader(self):
+        hdr = header(self.source)
+        if self.count:
+            hdr += (self.count,)
+        return hdr
+
+
+# The hash dedup functions share one driver, iterhashdedup(), which feeds
+# numbered rows to a hash table object with the following methods:
+#
+# * new() - return an empty table of the same kind
+# * run(rows, getkey) - take (number, row) pairs, generate (number, row)
+#   pairs to be output so far
+# * finish() - generate the remaining (number, row) pairs to be output, in
+#   order
+# * entries() - return (key, value) pairs describing the state of the table
+# * len() - the number of entries
+# * load(key, value) - restore an entry
+#
+# The row numbers are used to put the output back in input order when the
+# table gets split into partitions.
+
+class _DistinctTable(object):
+
+    def __init__(self, count):
+        self.count = count
+        self.seen = dict()
+
+    def new(self):
+        return _DistinctTable(self.count)
+
+    def run(self, rows, getkey):
+        seen = self.seen
+        if self.count:
+            # first row and number of rows with each key
+            for i, row in rows:
+                k = getkey(row)
+                entry = seen.get(k)
+                if entry is None:
+                    seen[k] = [i, row, 1]
+                else:
+                    entry[2] += 1
+        else:
+            for i, row in rows:
+                k = getkey(row)
+                if k not in seen:
+                    seen[k] = None
+                    yield i, row
+
+    def finish(self):
+        if self.count:
+            entries = sorted(self.seen.values(), key=operator.itemgetter(0))
+            for i, row, n in entries:
+                yield i, tuple(row) + (n,)
+
+    def __len__(self):
+        return len(self.seen)
+
+    def entries(self):
+        return self.seen.items()
+
+    def load(self, key, value):
+        self.seen[key] = value
+
+
+class _UniqueTable(object):
+
+    # N.B., keys seen more than once are kept, mapping to None
+
+    def __init__(self):
+        self.seen = dict()
+
+    def new(self):
+        return _UniqueTable()
+
+    def run(self, rows, getkey):
+        seen = self.seen
+        for i, row in rows:
+            k = getkey(row)
+            if k not in seen:
+                seen[k] = (i, row)
+            elif seen[k] is not None:
+                seen[k] = None
+        return iter(())
+
+    def finish(self):
+        entries = sorted((entry for entry in self.seen.values()
+                          if entry is not None), key=operator.itemgetter(0))
+        for i, row in entries:
+            yield i, row
+
+    def __len__(self):
+        return len(self.seen)
+
+    def entries(self):
+        return self.seen.items()
+
+    def load(self, key, value):
+        self.seen[key] = value
+
+
+class _DuplicatesTable(object):
+
+    # N.B., keys whose first row has been output are kept, mapping to None
+
+    def __init__(self):
+        self.first = dict()
+
+    def new(self):
+        return _DuplicatesTable()
+
+    def run(self, rows, getkey):
+        first = self.first
+        for i, row in rows:
+            k = getkey(row)
+            if k not in first:
+                first[k] = row
+            else:
+                if first[k] is not None:
+                    # output the first row with the number of this one, to
+                    # keep it just before this one
+                    yield i, first[k]
+                    first[k] = None
+                yield i, row
+
+    def finish(self):
+        return iter(())
+
+    def __len__(self):
+        return len(self.first)
+
+    def entries(self):
+        return self.first.items()
+
+    def load(self, key, value):
+        self.first[key] = value
+
+
+# number of partitions the hash table and the rest of the table are split
+# into when the hash table doesn't fit in buffermem
+_dedup_partitions = 32
+
+
+def iterhashdedup(source, key, table, buffermem=None, tempdir=None,
+                  addfield=None):
+    it = iter(source)
+    hdr = next(it)
+    if addfield:
+        yield tuple(hdr) + (addfield,)
+    else:
+        yield tuple(hdr)
+
+    # convert field selection into field indices
+    if key is None:
+        indices = range(len(hdr))
+    else:
+        indices = asindices(hdr, key)
+
+    # now use field indices to construct a _getkey function
+    # N.B., this may raise an exception on short rows, depending on
+    # the field selection
+    getkey = operator.itemgetter(*indices)
+
+    rows = enumerate(it)
+    if buffermem is None:
+        buffermem = _parsebytes(config.hashdedup_buffermem)
+    if buffermem is None:
+        for _, row in table.run(rows, getkey):
+            yield tuple(row)
+        for _, row in table.finish():
+            yield tuple(row)
+        return
+
+    # feed rows to the hash table until it looks to have outgrown buffermem,
+    # estimating its size from the size of a sample of rows
+    full = []
+
+    def feed():
+        nsampled = sampled = 0
+        for i, row in rows:
+            yield i, row
+            if i < 100 or i % 100 == 0:
+                nsampled += 1
+                sampled += _rowsize(row)
+                if len(table) * sampled // nsampled >= buffermem:
+                    full.append(True)
+                    return
+
+    for _, row in table.run(feed(), getkey):
+        yield tuple(row)
+    if not full:
+        for _, row in table.finish():
+            yield tuple(row)
+        return
+
+    debug('hash table does not fit in buffermem, partitioning')
+    spillformat = _getspillformat(None)
+    # records are (None, key, value) for hash table entries, followed by
+    # (number, row) for the rest of the rows
+    records = itertools.chain(
+        ((None, k, v) for k, v in table.entries()),
+        ((i, row) for i, row in rows)
+    )
+    table = table.new()
+
+    def getreckey(rec):
+        if rec[0] is None:
+            return rec[1]
+        return getkey(rec[1])
+
+    parts = _hashpartition(records, getreckey, _dedup_partitions, 0,
+                           config.sort_buffersize, tempdir, spillformat)
+
+    # deal with each partition, writing output rows to temporary files
+    outparts = []
+    for part in parts:
+        ptable = table.new()
+
+        def prows(_part=part, _ptable=ptable):
+            for rec in _iterchunk(_part.name, spillformat):
+                if rec[0] is None:
+                    _ptable.load(rec[1], rec[2])
+                else:
+                    yield rec
+
+        with NamedTemporaryFile(dir=tempdir, delete=False, mode='wb') as f:
+            outparts.append(_NamedTempFileDeleteOnGC(f.name))
+            outrows = itertools.chain(ptable.run(prows(), getkey),
+                                      ptable.finish())
+            while True:
+                batch = list(itertools.islice(
+                    outrows, _spillbatchsize(config.sort_buffersize)
+                ))
+                if not batch:
+                    break
+                spillformat.dump(batch, f)
+
+    # merge the output of all partitions back into input order
+    outrows = _mergesorted(operator.itemgetter(0), False,
+                           *[_iterchunk(f.name, spillformat)
+                             for f in outparts])
+    for _, row in outrows:
+        yield tuple(row)
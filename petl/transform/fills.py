@@ -4,7 +4,7 @@ from __future__ import absolute_import, print_function, division
 from petl.compat import next
 
 
-from petl.util.base import Table, asindices
+from petl.util.base import Table, asindices, header
 
 
 def filldown(table, *fields, **kwargs):
@@ -101,6 +101,9 @@ class FillDownView(Table):
     def __iter__(self):
         return iterfilldown(self.table, self.fields, self.missing)
 
+    def resolveheader(self):
+        return header(self.table)
+
 
 def iterfilldown(table, fillfields, missing):
     it = iter(table)
@@ -174,6 +177,9 @@ class FillRightView(Table):
     def __iter__(self):
         return iterfillright(self.table, self.missing)
 
+    def resolveheader(self):
+        return header(self.table)
+
 
 def iterfillright(table, missing):
     it = iter(table)
@@ -240,6 +246,9 @@ class FillLeftView(Table):
     def __iter__(self):
         return iterfillleft(self.table, self.missing)
 
+    def resolveheader(self):
+        return header(self.table)
+
 
 def iterfillleft(table, missing):
     it = iter(table)
@@ -1,17 +1,39 @@
 from __future__ import absolute_import, print_function, division
 
 
+import datetime
+import itertools
+import logging
+import multiprocessing
+import numbers
 import operator
+import os
+import zlib
+from collections import deque
+from tempfile import NamedTemporaryFile
 from petl.compat import next, text_type
 
 
-from petl.util.base import Table, asindices, rowgetter, iterpeek
+import petl.config as config
+from petl.errors import ArgumentError
+from petl.io.sources import FileSource
+from petl.util.base import Table, asindices, rowgetter, iterpeek, header, \
+    issortedby, TableWrapper
 from petl.util.lookups import lookup, lookupone
-from petl.transform.joins import keys_from_args
+from petl.transform.joins import keys_from_args, joinheader, \
+    _resolvejoinheader, PrefilterView, join
+from petl.transform.sorts import _NamedTempFileDeleteOnGC, _iterchunk, \
+    _getspillformat, _parsebytes, _rowsize, _hashpartition, _spillbatchsize
+
+
+logger = logging.getLogger(__name__)
+warning = logger.warning
+debug = logger.debug
 
 
 def hashjoin(left, right, key=None, lkey=None, rkey=None, cache=True,
-             lprefix=None, rprefix=None):
+             lprefix=None, rprefix=None, buffermem=None, tempdir=None,
+             workers=None, ordered=True, prefilter=False):
     """Alternative implementation of :func:`petl.transform.joins.join`, where
     the join is executed by constructing an in-memory lookup for the right
     hand table, then iterating over rows from the left hand table.
@@ -25,11 +47,50 @@ def hashjoin(left, right, key=None, lkey=None, rkey=None, cache=True,
     Left and right tables with different key fields can be handled via the
     `lkey` and `rkey` arguments.
 
+    The memory used by the lookup can be limited via the `buffermem`
+    argument, which can be a number of bytes or a string like ``'512MB'``.
+    If the estimated size of the rows of the right hand table goes over this
+    limit, both tables are instead split into partitions by a hash of the
+    key, which are written to temporary files (in `tempdir`, if given), and
+    then joined partition by partition (a so called grace hash join). In this
+    case output rows come out grouped by partition rather than in the order
+    of the left hand table, and nothing is cached. If `buffermem` is `None`,
+    the value of `petl.config.hashjoin_buffermem` will be used, which is
+    `None` by default, meaning no limit.
+
+    The join can be spread over a pool of worker processes by setting the
+    `workers` argument to the number of processes to use. Both tables are then
+    read in chunks (of `petl.config.sort_buffersize` rows, or 10000 if that is
+    `None`), which the workers split into that many partitions by a hash of the
+    key and write to temporary files, and then each worker builds the lookup
+    for one partition of the right hand table and joins the matching partition
+    of the left hand table. If `ordered` is `True` (the default) the output
+    rows are put back into the order of the left hand table, which means no
+    rows come out until all partitions have been joined. If `ordered` is
+    `False` the rows of each partition come out as soon as it has been joined.
+    Each worker holds its share of the right hand table in memory, `buffermem`
+    is not applied, and rows need to be picklable. Unless worker processes are
+    started by forking, key values are hashed in a way which is the same in
+    every process: numbers as they are, strings as their encoded text, and
+    other values by their repr, and key values without a repr which is the same
+    in every process are refused with an error. If `workers` is `None`, the
+    value of `petl.config.hashjoin_workers` will be used, which is `None` by
+    default, meaning the join runs in the calling process.
+
+    If `prefilter` is True and the tables are split into partitions on disk,
+    because of `buffermem` or `workers`, a filter is first built over the
+    key values of the right table (see :func:`petl.transform.joins.join`),
+    and rows of the left table whose key certainly isn't in the right table
+    are dropped before they are written out. When the lookup is held in memory it
+    already is an exact filter, and `prefilter` has no effect.
+
     """
     
     lkey, rkey = keys_from_args(left, right, key, lkey, rkey)
     return HashJoinView(left, right, lkey=lkey, rkey=rkey, cache=cache,
-                        lprefix=lprefix, rprefix=rprefix)
+                        lprefix=lprefix, rprefix=rprefix,
+                        buffermem=buffermem, tempdir=tempdir,
+                        workers=workers, ordered=ordered, prefilter=prefilter)
 
 
 Table.hashjoin = hashjoin
@@ -38,7 +99,8 @@ Table.hashjoin = hashjoin
 class HashJoinView(Table):
     
     def __init__(self, left, right, lkey, rkey, cache=True, lprefix=None,
-                 rprefix=None):
+                 rprefix=None, buffermem=None, tempdir=None, workers=None,
+                 ordered=True, prefilter=False):
         self.left = left
         self.right = right
         self.lkey = lkey
@@ -47,15 +109,45 @@ class HashJoinView(Table):
         self.rlookup = None
         self.lprefix = lprefix
         self.rprefix = rprefix
+        self.buffermem = _getbuffermem(buffermem)
+        self.tempdir = tempdir
+        if workers is None:
+            self.workers = config.hashjoin_workers
+        else:
+            self.workers = workers
+        self.ordered = ordered
+        self.prefilter = prefilter
         
+    def resolveheader(self):
+        return _resolvejoinheader(self.left, self.right, self.rkey,
+                                  self.lprefix, self.rprefix)
+
     def __iter__(self):
+        parallel = self.workers is not None and self.workers > 1
+        if parallel or self.buffermem is not None:
+            # tables may be split into partitions on disk, where dropping
+            # left rows whose key certainly isn't in the right table pays off
+            left = self.left
+            if self.prefilter:
+                left = PrefilterView(left, self.lkey, self.right, self.rkey)
+            if parallel:
+                return iterhashjoin(left, self.right, self.lkey, self.rkey,
+                                    None, self.lprefix, self.rprefix,
+                                    tempdir=self.tempdir,
+                                    workers=self.workers,
+                                    ordered=self.ordered)
+            # lookup is built as the table is iterated
+            return iterhashjoin(left, self.right, self.lkey, self.rkey,
+                                None, self.lprefix, self.rprefix,
+                                self.buffermem, self.tempdir)
         if not self.cache or self.rlookup is None:
             self.rlookup = lookup(self.right, self.rkey)
         return iterhashjoin(self.left, self.right, self.lkey, self.rkey,
                             self.rlookup, self.lprefix, self.rprefix)
     
 
-def iterhashjoin(left, right, lkey, rkey, rlookup, lprefix, rprefix):
+def iterhashjoin(left, right, lkey, rkey, rlookup, lprefix, rprefix,
+                 buffermem=None, tempdir=None, workers=None, ordered=True):
     lit = iter(left)
     rit = iter(right)
 
@@ -66,8 +158,9 @@ def iterhashjoin(left, right, lkey, rkey, rlookup, lprefix, rprefix):
     lkind = asindices(lhdr, lkey)
     rkind = asindices(rhdr, rkey)
     
-    # construct functions to extract key values from left table
+    # construct functions to extract key values from both tables
     lgetk = operator.itemgetter(*lkind)
+    rgetk = operator.itemgetter(*rkind)
     
     # determine indices of non-key fields in the right table
     # (in the output, we only include key fields from the left table - we
@@ -76,16 +169,13 @@ def iterhashjoin(left, right, lkey, rkey, rlookup, lprefix, rprefix):
     rgetv = rowgetter(*rvind)
     
     # determine the output fields
-    if lprefix is None:
-        outhdr = list(lhdr)
-    else:
-        outhdr = [(text_type(lprefix) + text_type(f))
-                  for f in lhdr]
-    if rprefix is None:
-        outhdr.extend(rgetv(rhdr))
-    else:
-        outhdr.extend([(text_type(rprefix) + text_type(f)) for f in rgetv(rhdr)])
-    yield tuple(outhdr)
+    yield joinheader(lhdr, rhdr, rvind, lprefix, rprefix)
+
+    if workers is not None and workers > 1:
+        for outrow in _iterparallel(lit, rit, lkind, rhdr, rkey, rvind,
+                                    workers, ordered, tempdir):
+            yield outrow
+        return
 
     # define a function to join rows
     def joinrows(_lrow, _rrows):
@@ -96,16 +186,24 @@ def iterhashjoin(left, right, lkey, rkey, rlookup, lprefix, rprefix):
             _outrow.extend(rgetv(rrow))
             yield tuple(_outrow)
 
-    for lrow in lit:
-        k = lgetk(lrow)
-        if k in rlookup:
-            rrows = rlookup[k]
-            for outrow in joinrows(lrow, rrows):
-                yield outrow
+    if rlookup is None:
+        parts = _iterlookups(rit, lit, rhdr, rkey, rgetk, lgetk, lookup,
+                             buffermem, tempdir)
+    else:
+        parts = [(rlookup, lit)]
+
+    for rlookup, lit in parts:
+        for lrow in lit:
+            k = lgetk(lrow)
+            if k in rlookup:
+                rrows = rlookup[k]
+                for outrow in joinrows(lrow, rrows):
+                    yield outrow
         
         
 def hashleftjoin(left, right, key=None, lkey=None, rkey=None, missing=None,
-                 cache=True, lprefix=None, rprefix=None):
+                 cache=True, lprefix=None, rprefix=None, buffermem=None,
+                 tempdir=None):
     """Alternative implementation of :func:`petl.transform.joins.leftjoin`,
     where the join is executed by constructing an in-memory lookup for the
     right hand table, then iterating over rows from the left hand table.
@@ -119,11 +217,16 @@ def hashleftjoin(left, right, key=None, lkey=None, rkey=None, missing=None,
     Left and right tables with different key fields can be handled via the
     `lkey` and `rkey` arguments.
 
+    See :func:`petl.transform.hashjoins.hashjoin` for the `buffermem` and
+    `tempdir` arguments, which allow joining a right hand table which doesn't
+    fit in memory.
+
     """
 
     lkey, rkey = keys_from_args(left, right, key, lkey, rkey)
     return HashLeftJoinView(left, right, lkey, rkey, missing=missing,
-                            cache=cache, lprefix=lprefix, rprefix=rprefix)
+                            cache=cache, lprefix=lprefix, rprefix=rprefix,
+                            buffermem=buffermem, tempdir=tempdir)
 
 
 Table.hashleftjoin = hashleftjoin
@@ -132,7 +235,7 @@ Table.hashleftjoin = hashleftjoin
 class HashLeftJoinView(Table):
     
     def __init__(self, left, right, lkey, rkey, missing=None, cache=True,
-                 lprefix=None, rprefix=None):
+                 lprefix=None, rprefix=None, buffermem=None, tempdir=None):
         self.left = left
         self.right = right
         self.lkey = lkey
@@ -142,8 +245,20 @@ class HashLeftJoinView(Table):
         self.rlookup = None
         self.lprefix = lprefix
         self.rprefix = rprefix
+        self.buffermem = _getbuffermem(buffermem)
+        self.tempdir = tempdir
+
+    def resolveheader(self):
+        return _resolvejoinheader(self.left, self.right, self.rkey,
+                                  self.lprefix, self.rprefix)
 
     def __iter__(self):
+        if self.buffermem is not None:
+            # lookup is built as the table is iterated
+            return iterhashleftjoin(self.left, self.right, self.lkey,
+                                    self.rkey, self.missing, None,
+                                    self.lprefix, self.rprefix,
+                                    self.buffermem, self.tempdir)
         if not self.cache or self.rlookup is None:
             self.rlookup = lookup(self.right, self.rkey)
         return iterhashleftjoin(self.left, self.right, self.lkey, self.rkey,
@@ -152,7 +267,7 @@ class HashLeftJoinView(Table):
     
 
 def iterhashleftjoin(left, right, lkey, rkey, missing, rlookup, lprefix,
-                     rprefix):
+                     rprefix, buffermem=None, tempdir=None):
     lit = iter(left)
     rit = iter(right)
 
@@ -163,8 +278,9 @@ def iterhashleftjoin(left, right, lkey, rkey, missing, rlookup, lprefix,
     lkind = asindices(lhdr, lkey)
     rkind = asindices(rhdr, rkey)
     
-    # construct functions to extract key values from left table
+    # construct functions to extract key values from both tables
     lgetk = operator.itemgetter(*lkind)
+    rgetk = operator.itemgetter(*rkind)
     
     # determine indices of non-key fields in the right table
     # (in the output, we only include key fields from the left table - we
@@ -173,16 +289,7 @@ def iterhashleftjoin(left, right, lkey, rkey, missing, rlookup, lprefix,
     rgetv = rowgetter(*rvind)
     
     # determine the output fields
-    if lprefix is None:
-        outhdr = list(lhdr)
-    else:
-        outhdr = [(text_type(lprefix) + text_type(f))
-                  for f in lhdr]
-    if rprefix is None:
-        outhdr.extend(rgetv(rhdr))
-    else:
-        outhdr.extend([(text_type(rprefix) + text_type(f)) for f in rgetv(rhdr)])
-    yield tuple(outhdr)
+    yield joinheader(lhdr, rhdr, rvind, lprefix, rprefix)
 
     # define a function to join rows
     def joinrows(_lrow, _rrows):
@@ -193,21 +300,29 @@ def iterhashleftjoin(left, right, lkey, rkey, missing, rlookup, lprefix,
             _outrow.extend(rgetv(rrow))
             yield tuple(_outrow)
 
-    for lrow in lit:
-        k = lgetk(lrow)
-        if k in rlookup:
-            rrows = rlookup[k]
-            for outrow in joinrows(lrow, rrows):
-                yield outrow
-        else:
-            outrow = list(lrow)  # start with the left row
-            # extend with missing values in place of the right row
-            outrow.extend([missing] * len(rvind))
-            yield tuple(outrow)
+    if rlookup is None:
+        parts = _iterlookups(rit, lit, rhdr, rkey, rgetk, lgetk, lookup,
+                             buffermem, tempdir)
+    else:
+        parts = [(rlookup, lit)]
+
+    for rlookup, lit in parts:
+        for lrow in lit:
+            k = lgetk(lrow)
+            if k in rlookup:
+                rrows = rlookup[k]
+                for outrow in joinrows(lrow, rrows):
+                    yield outrow
+            else:
+                outrow = list(lrow)  # start with the left row
+                # extend with missing values in place of the right row
+                outrow.extend([missing] * len(rvind))
+                yield tuple(outrow)
         
         
 def hashrightjoin(left, right, key=None, lkey=None, rkey=None, missing=None,
-                  cache=True, lprefix=None, rprefix=None):
+                  cache=True, lprefix=None, rprefix=None, buffermem=None,
+                  tempdir=None):
     """Alternative implementation of :func:`petl.transform.joins.rightjoin`,
     where the join is executed by constructing an in-memory lookup for the
     left hand table, then iterating over rows from the right hand table.
@@ -221,11 +336,16 @@ def hashrightjoin(left, right, key=None, lkey=None, rkey=None, missing=None,
     Left and right tables with different key fields can be handled via the
     `lkey` and `rkey` arguments.
 
+    See :func:`petl.transform.hashjoins.hashjoin` for the `buffermem` and
+    `tempdir` arguments, which here limit the memory used by the lookup of
+    the left hand table.
+
     """
 
     lkey, rkey = keys_from_args(left, right, key, lkey, rkey)
     return HashRightJoinView(left, right, lkey, rkey, missing=missing,
-                             cache=cache, lprefix=lprefix, rprefix=rprefix)
+                             cache=cache, lprefix=lprefix, rprefix=rprefix,
+                             buffermem=buffermem, tempdir=tempdir)
 
 
 Table.hashrightjoin = hashrightjoin
@@ -234,7 +354,7 @@ Table.hashrightjoin = hashrightjoin
 class HashRightJoinView(Table):
     
     def __init__(self, left, right, lkey, rkey, missing=None, cache=True,
-                 lprefix=None, rprefix=None):
+                 lprefix=None, rprefix=None, buffermem=None, tempdir=None):
         self.left = left
         self.right = right
         self.lkey = lkey
@@ -244,8 +364,20 @@ class HashRightJoinView(Table):
         self.llookup = None
         self.lprefix = lprefix
         self.rprefix = rprefix
+        self.buffermem = _getbuffermem(buffermem)
+        self.tempdir = tempdir
+
+    def resolveheader(self):
+        return _resolvejoinheader(self.left, self.right, self.rkey,
+                                  self.lprefix, self.rprefix)
 
     def __iter__(self):
+        if self.buffermem is not None:
+            # lookup is built as the table is iterated
+            return iterhashrightjoin(self.left, self.right, self.lkey,
+                                     self.rkey, self.missing, None,
+                                     self.lprefix, self.rprefix,
+                                     self.buffermem, self.tempdir)
         if not self.cache or self.llookup is None:
             self.llookup = lookup(self.left, self.lkey)
         return iterhashrightjoin(self.left, self.right, self.lkey, self.rkey,
@@ -254,7 +386,7 @@ class HashRightJoinView(Table):
     
 
 def iterhashrightjoin(left, right, lkey, rkey, missing, llookup, lprefix,
-                      rprefix):
+                      rprefix, buffermem=None, tempdir=None):
     lit = iter(left)
     rit = iter(right)
 
@@ -265,7 +397,8 @@ def iterhashrightjoin(left, right, lkey, rkey, missing, llookup, lprefix,
     lkind = asindices(lhdr, lkey)
     rkind = asindices(rhdr, rkey)
     
-    # construct functions to extract key values from left table
+    # construct functions to extract key values from both tables
+    lgetk = operator.itemgetter(*lkind)
     rgetk = operator.itemgetter(*rkind)
     
     # determine indices of non-key fields in the right table
@@ -275,17 +408,7 @@ def iterhashrightjoin(left, right, lkey, rkey, missing, llookup, lprefix,
     rgetv = rowgetter(*rvind)
     
     # determine the output fields
-    if lprefix is None:
-        outhdr = list(lhdr)
-    else:
-        outhdr = [(text_type(lprefix) + text_type(f))
-                  for f in lhdr]
-    if rprefix is None:
-        outhdr.extend(rgetv(rhdr))
-    else:
-        outhdr.extend([(text_type(rprefix) + text_type(f))
-                       for f in rgetv(rhdr)])
-    yield tuple(outhdr)
+    yield joinheader(lhdr, rhdr, rvind, lprefix, rprefix)
 
     # define a function to join rows
     def joinrows(_rrow, _lrows):
@@ -296,24 +419,32 @@ def iterhashrightjoin(left, right, lkey, rkey, missing, llookup, lprefix,
             _outrow.extend(rgetv(_rrow))
             yield tuple(_outrow)
 
-    for rrow in rit:
-        k = rgetk(rrow)
-        if k in llookup:
-            lrows = llookup[k]
-            for outrow in joinrows(rrow, lrows):
-                yield outrow
-        else:
-            # start with missing values in place of the left row
-            outrow = [missing] * len(lhdr)
-            # set key values
-            for li, ri in zip(lkind, rkind):
-                outrow[li] = rrow[ri]
-            # extend with non-key values from the right row  
-            outrow.extend(rgetv(rrow))
-            yield tuple(outrow)
+    if llookup is None:
+        parts = _iterlookups(lit, rit, lhdr, lkey, lgetk, rgetk, lookup,
+                             buffermem, tempdir)
+    else:
+        parts = [(llookup, rit)]
+
+    for llookup, rit in parts:
+        for rrow in rit:
+            k = rgetk(rrow)
+            if k in llookup:
+                lrows = llookup[k]
+                for outrow in joinrows(rrow, lrows):
+                    yield outrow
+            else:
+                # start with missing values in place of the left row
+                outrow = [missing] * len(lhdr)
+                # set key values
+                for li, ri in zip(lkind, rkind):
+                    outrow[li] = rrow[ri]
+                # extend with non-key values from the right row  
+                outrow.extend(rgetv(rrow))
+                yield tuple(outrow)
         
         
-def hashantijoin(left, right, key=None, lkey=None, rkey=None):
+def hashantijoin(left, right, key=None, lkey=None, rkey=None,
+                 buffermem=None, tempdir=None):
     """Alternative implementation of :func:`petl.transform.joins.antijoin`,
     where the join is executed by constructing an in-memory set for all keys
     found in the right hand table, then iterating over rows from the left
@@ -325,10 +456,14 @@ def hashantijoin(left, right, key=None, lkey=None, rkey=None):
     Left and right tables with different key fields can be handled via the
     `lkey` and `rkey` arguments.
 
+    See :func:`petl.transform.hashjoins.hashjoin` for the `buffermem` and
+    `tempdir` arguments, which here limit the memory used by the set of keys.
+
     """
     
     lkey, rkey = keys_from_args(left, right, key, lkey, rkey)
-    return HashAntiJoinView(left, right, lkey, rkey)
+    return HashAntiJoinView(left, right, lkey, rkey, buffermem=buffermem,
+                            tempdir=tempdir)
 
 
 Table.hashantijoin = hashantijoin
@@ -336,17 +471,24 @@ Table.hashantijoin = hashantijoin
 
 class HashAntiJoinView(Table):
     
-    def __init__(self, left, right, lkey, rkey):
+    def __init__(self, left, right, lkey, rkey, buffermem=None,
+                 tempdir=None):
         self.left = left
         self.right = right
         self.lkey = lkey
         self.rkey = rkey
+        self.buffermem = _getbuffermem(buffermem)
+        self.tempdir = tempdir
 
     def __iter__(self):
-        return iterhashantijoin(self.left, self.right, self.lkey, self.rkey)
+        return iterhashantijoin(self.left, self.right, self.lkey, self.rkey,
+                                self.buffermem, self.tempdir)
+
+    def resolveheader(self):
+        return header(self.left)
     
     
-def iterhashantijoin(left, right, lkey, rkey):
+def iterhashantijoin(left, right, lkey, rkey, buffermem=None, tempdir=None):
     lit = iter(left)
     rit = iter(right)
 
@@ -362,19 +504,28 @@ def iterhashantijoin(left, right, lkey, rkey):
     lgetk = operator.itemgetter(*lkind)
     rgetk = operator.itemgetter(*rkind)
     
-    rkeys = set()
-    for rrow in rit:
-        rk = rgetk(rrow)
-        rkeys.add(rk)
-        
-    for lrow in lit:
-        lk = lgetk(lrow)
-        if lk not in rkeys:
-            yield tuple(lrow)
+    if buffermem is None:
+        rkeys = set()
+        for rrow in rit:
+            rk = rgetk(rrow)
+            rkeys.add(rk)
+        parts = [(rkeys, lit)]
+    else:
+        # only the keys of the right table are needed
+        rit = ((rgetk(rrow),) for rrow in rit)
+        parts = _iterlookups(rit, lit, ('key',), 0, operator.itemgetter(0),
+                             lgetk, _keyset, buffermem, tempdir)
+
+    for rkeys, lit in parts:
+        for lrow in lit:
+            lk = lgetk(lrow)
+            if lk not in rkeys:
+                yield tuple(lrow)
 
 
 def hashlookupjoin(left, right, key=None, lkey=None, rkey=None, missing=None,
-                   lprefix=None, rprefix=None):
+                   lprefix=None, rprefix=None, buffermem=None, tempdir=None,
+                   dictionary=None):
     """Alternative implementation of :func:`petl.transform.joins.lookupjoin`,
     where the join is executed by constructing an in-memory lookup for the
     right hand table, then iterating over rows from the left hand table.
@@ -385,11 +536,46 @@ def hashlookupjoin(left, right, key=None, lkey=None, rkey=None, missing=None,
     Left and right tables with different key fields can be handled via the
     `lkey` and `rkey` arguments.
 
+    See :func:`petl.transform.hashjoins.hashjoin` for the `buffermem` and
+    `tempdir` arguments, which allow joining a right hand table which doesn't
+    fit in memory.
+
+    Alternatively, the lookup can be loaded into a dictionary-like object
+    given as `dictionary`, e.g., a :class:`petl.util.lookups.DiskLookup`,
+    which keeps it on disk. Anything already in `dictionary` is removed each
+    time the join is iterated, and `buffermem` is ignored. E.g.::
+
+        >>> import petl as etl
+        >>> left = [['id', 'colour'],
+        ...         [1, 'blue'],
+        ...         [2, 'red'],
+        ...         [3, 'purple']]
+        >>> right = [['id', 'shape'],
+        ...          [1, 'circle'],
+        ...          [3, 'square'],
+        ...          [4, 'ellipse']]
+        >>> with etl.DiskLookup() as lkp:
+        ...     table = etl.hashlookupjoin(left, right, key='id',
+        ...                                dictionary=lkp)
+        ...     table.lookall()
+        ...
+        +----+----------+----------+
+        | id | colour   | shape    |
+        +====+==========+==========+
+        |  1 | 'blue'   | 'circle' |
+        +----+----------+----------+
+        |  2 | 'red'    | None     |
+        +----+----------+----------+
+        |  3 | 'purple' | 'square' |
+        +----+----------+----------+
+
     """
 
     lkey, rkey = keys_from_args(left, right, key, lkey, rkey)
     return HashLookupJoinView(left, right, lkey, rkey, missing=missing,
-                              lprefix=lprefix, rprefix=rprefix)
+                              lprefix=lprefix, rprefix=rprefix,
+                              buffermem=buffermem, tempdir=tempdir,
+                              dictionary=dictionary)
 
 
 Table.hashlookupjoin = hashlookupjoin
@@ -398,7 +584,7 @@ Table.hashlookupjoin = hashlookupjoin
 class HashLookupJoinView(Table):
 
     def __init__(self, left, right, lkey, rkey, missing=None, lprefix=None,
-                 rprefix=None):
+                 rprefix=None, buffermem=None, tempdir=None, dictionary=None):
         self.left = left
         self.right = right
         self.lkey = lkey
@@ -406,25 +592,43 @@ class HashLookupJoinView(Table):
         self.missing = missing
         self.lprefix = lprefix
         self.rprefix = rprefix
+        self.buffermem = _getbuffermem(buffermem)
+        self.tempdir = tempdir
+        self.dictionary = dictionary
+
+    def resolveheader(self):
+        return _resolvejoinheader(self.left, self.right, self.rkey,
+                                  self.lprefix, self.rprefix)
 
     def __iter__(self):
         return iterhashlookupjoin(self.left, self.right, self.lkey, self.rkey,
-                                  self.missing, self.lprefix, self.rprefix)
+                                  self.missing, self.lprefix, self.rprefix,
+                                  self.buffermem, self.tempdir,
+                                  self.dictionary)
 
 
-def iterhashlookupjoin(left, right, lkey, rkey, missing, lprefix, rprefix):
+def iterhashlookupjoin(left, right, lkey, rkey, missing, lprefix, rprefix,
+                       buffermem=None, tempdir=None, dictionary=None):
     lit = iter(left)
     lhdr = next(lit)
 
-    rhdr, rit = iterpeek(right)  # need the whole lot to pass to lookup
-    rlookup = lookupone(rit, rkey, strict=False)
+    if dictionary is not None:
+        dictionary.clear()
+        buffermem = None
+    if buffermem is None:
+        rhdr, rit = iterpeek(right)  # need the whole lot to pass to lookup
+        rlookup = lookupone(rit, rkey, dictionary=dictionary, strict=False)
+    else:
+        rit = iter(right)
+        rhdr = next(rit)
 
     # determine indices of the key fields in left and right tables
     lkind = asindices(lhdr, lkey)
     rkind = asindices(rhdr, rkey)
 
-    # construct functions to extract key values from left table
+    # construct functions to extract key values from both tables
     lgetk = operator.itemgetter(*lkind)
+    rgetk = operator.itemgetter(*rkind)
 
     # determine indices of non-key fields in the right table
     # (in the output, we only include key fields from the left table - we
@@ -433,17 +637,7 @@ def iterhashlookupjoin(left, right, lkey, rkey, missing, lprefix, rprefix):
     rgetv = rowgetter(*rvind)
 
     # determine the output fields
-    if lprefix is None:
-        outhdr = list(lhdr)
-    else:
-        outhdr = [(text_type(lprefix) + text_type(f))
-                  for f in lhdr]
-    if rprefix is None:
-        outhdr.extend(rgetv(rhdr))
-    else:
-        outhdr.extend([(text_type(rprefix) + text_type(f))
-                       for f in rgetv(rhdr)])
-    yield tuple(outhdr)
+    yield joinheader(lhdr, rhdr, rvind, lprefix, rprefix)
 
     # define a function to join rows
     def joinrows(_lrow, _rrow):
@@ -453,13 +647,490 @@ def iterhashlookupjoin(left, right, lkey, rkey, missing, lprefix, rprefix):
         _outrow.extend(rgetv(_rrow))
         return tuple(_outrow)
 
-    for lrow in lit:
-        k = lgetk(lrow)
-        if k in rlookup:
-            rrow = rlookup[k]
-            yield joinrows(lrow, rrow)
+    if buffermem is None:
+        parts = [(rlookup, lit)]
+    else:
+        parts = _iterlookups(rit, lit, rhdr, rkey, rgetk, lgetk, lookupone,
+                             buffermem, tempdir)
+
+    for rlookup, lit in parts:
+        for lrow in lit:
+            k = lgetk(lrow)
+            if k in rlookup:
+                rrow = rlookup[k]
+                yield joinrows(lrow, rrow)
+            else:
+                outrow = list(lrow)  # start with the left row
+                # extend with missing values in place of the right row
+                outrow.extend([missing] * len(rvind))
+                yield tuple(outrow)
+
+
+def autojoin(left, right, key=None, lkey=None, rkey=None, buffermem=None,
+             tempdir=None, lprefix=None, rprefix=None):
+    """Perform an equi-join, as :func:`petl.transform.joins.join`, but leave
+    the choice of how to execute the join to petl. The first time the table
+    is iterated one of the following strategies is chosen, based on what can
+    be found out cheaply about the two tables:
+
+    * ``'merge'`` - both tables are already known to be sorted by the key
+      (e.g., they are the output of :func:`petl.transform.sorts.sort`), so
+      they are merged as they are, as by `join` with `presorted=True`
+    * ``'sort-merge'`` - the right table looks too big to hold in memory and
+      either one of the tables is already sorted by the key, so only the
+      other one needs sorting, or a single key value looks to account for
+      more rows than fit in memory, so the right table couldn't be split up
+      into partitions which fit; the join is done by `join`
+    * ``'hash'`` - otherwise, the join is done by
+      :func:`petl.transform.hashjoins.hashjoin`, which spills to disk if the
+      right table turns out not to fit in memory after all
+
+    To find out how big the right table is, its first 1000 rows are read. The
+    number of rows is taken from the length of the underlying list or tuple if
+    there is one, or estimated from the size of the file if the table is read
+    straight from a local uncompressed file (e.g., by
+    :func:`petl.io.csv.fromcsv`). Otherwise the size of a right table with more
+    than 1000 rows is unknown, and a hash join is chosen, which spills to disk
+    if need be. Memory is limited by `buffermem`, which can be a number of
+    bytes or a string like ``'512MB'``. If it is `None`, the value of
+    `petl.config.hashjoin_buffermem` is used if set, otherwise ``'512MB'``.
+
+    The strategy is kept for later iterations, and the reasons it was chosen
+    are logged at debug level and are returned by the `explain()` method of
+    the returned table, e.g.::
+
+        >>> import petl as etl
+        >>> table1 = [['id', 'colour'],
+        ...           [1, 'blue'],
+        ...           [2, 'red'],
+        ...           [3, 'purple']]
+        >>> table2 = [['id', 'shape'],
+        ...           [1, 'circle'],
+        ...           [3, 'square'],
+        ...           [4, 'ellipse']]
+        >>> table3 = etl.autojoin(table1, table2, key='id')
+        >>> table3
+        +----+----------+----------+
+        | id | colour   | shape    |
+        +====+==========+==========+
+        |  1 | 'blue'   | 'circle' |
+        +----+----------+----------+
+        |  3 | 'purple' | 'square' |
+        +----+----------+----------+
+
+        >>> table3.explain()
+        'hash: right table has 3 rows, estimated at 0.0MB, within buffermem of 512.0MB'
+
+    N.B., as the strategy depends on the data, so does the order of the output
+    rows: sorted by key for a merge or sort-merge join, in the order of the
+    left table for a hash join which fits in memory.
+
+    """
+
+    lkey, rkey = keys_from_args(left, right, key, lkey, rkey)
+    return AutoJoinView(left, right, lkey, rkey, buffermem=buffermem,
+                        tempdir=tempdir, lprefix=lprefix, rprefix=rprefix)
+
+
+Table.autojoin = autojoin
+
+
+class AutoJoinView(Table):
+
+    def __init__(self, left, right, lkey, rkey, buffermem=None, tempdir=None,
+                 lprefix=None, rprefix=None):
+        self.left = left
+        self.right = right
+        self.lkey = lkey
+        self.rkey = rkey
+        if buffermem is None:
+            buffermem = config.hashjoin_buffermem
+        if buffermem is None:
+            buffermem = _autojoin_buffermem
+        self.buffermem = _parsebytes(buffermem)
+        self.tempdir = tempdir
+        self.lprefix = lprefix
+        self.rprefix = rprefix
+        self.strategy = None
+        self.reason = None
+        self._view = None
+
+    def resolveheader(self):
+        return _resolvejoinheader(self.left, self.right, self.rkey,
+                                  self.lprefix, self.rprefix)
+
+    def plan(self):
+        if self._view is None:
+            self.strategy, self.reason = _planjoin(
+                self.left, self.right, self.lkey, self.rkey, self.buffermem
+            )
+            debug('autojoin strategy %s: %s', self.strategy, self.reason)
+            if self.strategy == 'merge':
+                self._view = join(self.left, self.right, lkey=self.lkey,
+                                  rkey=self.rkey, presorted=True,
+                                  lprefix=self.lprefix, rprefix=self.rprefix)
+            elif self.strategy == 'sort-merge':
+                self._view = join(self.left, self.right, lkey=self.lkey,
+                                  rkey=self.rkey, tempdir=self.tempdir,
+                                  lprefix=self.lprefix, rprefix=self.rprefix)
+            else:
+                self._view = hashjoin(self.left, self.right, lkey=self.lkey,
+                                      rkey=self.rkey, lprefix=self.lprefix,
+                                      rprefix=self.rprefix,
+                                      buffermem=self.buffermem,
+                                      tempdir=self.tempdir)
+        return self._view
+
+    def explain(self):
+        """Return the chosen strategy and why it was chosen."""
+
+        self.plan()
+        return '%s: %s' % (self.strategy, self.reason)
+
+    def __iter__(self):
+        return iter(self.plan())
+
+
+# memory budget for autojoin if none is configured, and the number of rows of
+# the right table read to estimate its size
+_autojoin_buffermem = '512MB'
+_autojoin_sample = 1000
+
+
+def _planjoin(left, right, lkey, rkey, buffermem):
+    # choose a join strategy, returns the strategy and the reason for it
+    lsorted = issortedby(left, lkey)
+    rsorted = issortedby(right, rkey)
+    if lsorted and rsorted:
+        return 'merge', 'both tables are sorted by the key'
+
+    # sample the right table
+    it = iter(right)
+    hdr = next(it)
+    getkey = operator.itemgetter(*asindices(hdr, rkey))
+    counts = dict()
+    nsampled = size = textsize = 0
+    for row in itertools.islice(it, _autojoin_sample):
+        nsampled += 1
+        size += _rowsize(row)
+        textsize += _textsize(row)
+        k = getkey(row)
+        counts[k] = counts.get(k, 0) + 1
+    nrowstext = '%s rows' % nsampled
+    if nsampled < _autojoin_sample:
+        nrows = nsampled
+    else:
+        nrows = _cheapnrows(right)
+        if nrows is None:
+            nrows = _filenrows(right, nsampled, textsize)
+            if nrows is not None:
+                nrowstext = 'an estimated %s rows' % nrows
         else:
-            outrow = list(lrow)  # start with the left row
-            # extend with missing values in place of the right row
-            outrow.extend([missing] * len(rvind))
-            yield tuple(outrow)
+            nrowstext = '%s rows' % nrows
+    if nsampled == 0:
+        return 'hash', 'right table is empty'
+
+    mb = 1024. ** 2
+    rowsize = size / nsampled
+    if nrows is None:
+        # as the size can't be told the hash join may need to spill
+        return 'hash', (
+            'right table has more than %s rows, unknown how many, a hash join '
+            'will spill to disk if it goes over buffermem of %.1fMB'
+            % (nsampled, buffermem / mb)
+        )
+    estimate = nrows * rowsize
+    if estimate > buffermem:
+        if lsorted or rsorted:
+            return 'sort-merge', (
+                'right table has %s, estimated at %.1fMB, over buffermem '
+                'of %.1fMB, and the %s table is already sorted by the key'
+                % (nrowstext, estimate / mb, buffermem / mb,
+                   'left' if lsorted else 'right')
+            )
+        maxgroup = estimate * max(counts.values()) / nsampled
+        if maxgroup > buffermem:
+            return 'sort-merge', (
+                'right table has %s, estimated at %.1fMB, and the most '
+                'common key in a sample accounts for %.1fMB, over buffermem '
+                'of %.1fMB' % (nrowstext, estimate / mb, maxgroup / mb,
+                               buffermem / mb)
+            )
+        return 'hash', (
+            'right table has %s, estimated at %.1fMB, over buffermem of '
+            '%.1fMB, %s distinct keys in a sample of %s rows, a hash join will '
+            'spill to disk' % (nrowstext, estimate / mb, buffermem / mb,
+                               len(counts), nsampled)
+        )
+    return 'hash', (
+        'right table has %s, estimated at %.1fMB, within buffermem of '
+        '%.1fMB' % (nrowstext, estimate / mb, buffermem / mb)
+    )
+
+
+def _cheapnrows(table):
+    # number of data rows in the table if known without reading it
+    while isinstance(table, TableWrapper):
+        table = table.inner
+    if isinstance(table, (list, tuple)):
+        return len(table) - 1
+    return None
+
+
+def _filenrows(table, nsampled, textsize):
+    # rough number of data rows in a table read straight from a local
+    # uncompressed file (e.g., by fromcsv()), from the size of the file and
+    # the length of the first rows as text
+    while isinstance(table, TableWrapper):
+        table = table.inner
+    source = getattr(table, 'source', None)
+    if not isinstance(source, FileSource) or textsize == 0:
+        return None
+    try:
+        filesize = os.path.getsize(source.filename)
+    except (OSError, IOError, TypeError):
+        return None
+    return max(nsampled, int(filesize * nsampled / textsize))
+
+
+def _textsize(row):
+    # length of a row written out as delimited text, near enough
+    return sum(len(text_type(v)) + 1 for v in row)
+
+
+def _getbuffermem(buffermem):
+    if buffermem is None:
+        buffermem = config.hashjoin_buffermem
+    return _parsebytes(buffermem)
+
+
+def _keyset(table, key):
+    return set(row[0] for row in itertools.islice(table, 1, None))
+
+
+# number of partitions each side of a join is split into when the lookup
+# doesn't fit in memory, and how many times a partition which still doesn't
+# fit is split again, each time using a different hash
+_grace_partitions = 32
+_grace_maxdepth = 3
+
+
+def _iterlookups(build, probe, hdr, key, bgetk, pgetk, makelookup, buffermem,
+                 tempdir, depth=0):
+    # Yield pairs of a lookup built by makelookup() from rows of the build
+    # side and an iterator over rows of the probe side, where rows with equal
+    # keys always end up in the same pair. If the build side fits within
+    # buffermem that's just one pair, otherwise both sides are split into
+    # partitions by a hash of the key and written to temporary files, and
+    # each pair of partitions is dealt with in turn.
+    rows = []
+    nsampled = sampled = 0
+    full = False
+    for row in build:
+        rows.append(row)
+        n = len(rows)
+        if n <= 100 or n % 100 == 0:
+            nsampled += 1
+            sampled += _rowsize(row)
+            if sampled * n // nsampled >= buffermem:
+                full = True
+                break
+
+    if full and depth >= _grace_maxdepth:
+        # most likely lots of rows with the same key, no way to split these
+        warning('hash join partition does not fit in buffermem')
+        rows.extend(build)
+        full = False
+
+    if not full:
+        yield makelookup(itertools.chain([hdr], rows), key), probe
+        return
+
+    debug('hash join lookup does not fit in buffermem, partitioning')
+    spillformat = _getspillformat(None)
+    # keep roughly as many rows in the write buffers as fit in buffermem
+    limit = len(rows)
+    bparts = _hashpartition(itertools.chain(rows, build), bgetk,
+                            _grace_partitions, depth, limit, tempdir,
+                            spillformat)
+    rows = None
+    pparts = _hashpartition(probe, pgetk, _grace_partitions, depth, limit,
+                            tempdir, spillformat)
+    for bpart, ppart in zip(bparts, pparts):
+        for pair in _iterlookups(_iterchunk(bpart.name, spillformat),
+                                 _iterchunk(ppart.name, spillformat),
+                                 hdr, key, bgetk, pgetk, makelookup,
+                                 buffermem, tempdir, depth + 1):
+            yield pair
+
+
+def _iterparallel(lit, rit, lkind, rhdr, rkey, rvind, workers, ordered,
+                  tempdir):
+    # The calling process only reads both tables in chunks and hands them
+    # over, the workers do the hashing and write each chunk out split into
+    # partitions, then each worker joins one partition of the left table
+    # with the same partition of the right table, keeping the output of
+    # each chunk of the left table apart, and if the output has to be
+    # ordered the workers then put each of those chunks back in order. All
+    # temporary files are named here before a worker writes them, so they
+    # get deleted even if a worker fails or the output isn't read to the end.
+    spillformat = _getspillformat(None)
+    limit = config.sort_buffersize
+    chunksize = _spillbatchsize(limit)
+    rkind = asindices(rhdr, rkey)
+    rparts = [[] for _ in range(workers)]
+    lparts = [[] for _ in range(workers)]
+    forked = _forked()
+
+    debug('joining partitions with %s worker processes', workers)
+    pool = multiprocessing.Pool(processes=workers)
+    try:
+
+        for it, kind, parts, number in ((rit, rkind, rparts, False),
+                                        (lit, lkind, lparts, ordered)):
+            pending = deque()
+            while True:
+                rows = list(itertools.islice(it, chunksize))
+                if not rows:
+                    break
+                # don't let more chunks pile up in memory than there are
+                # workers to partition them
+                if len(pending) >= workers:
+                    pending.popleft().get()
+                files = [_newtempfile(tempdir) for _ in range(workers)]
+                for part, f in zip(parts, files):
+                    part.append(f)
+                pending.append(pool.apply_async(
+                    _partitionchunk,
+                    (rows, kind, number, forked, [f.name for f in files],
+                     spillformat)
+                ))
+            while pending:
+                pending.popleft().get()
+
+        if ordered:
+            lkind = [i + 1 for i in lkind]
+        outparts = [[_newtempfile(tempdir) for _ in lpart]
+                    for lpart in lparts]
+        tasks = [([f.name for f in rpart], [f.name for f in lpart], rhdr,
+                  rkey, lkind, rvind, limit, [f.name for f in outpart],
+                  spillformat)
+                 for rpart, lpart, outpart in zip(rparts, lparts, outparts)]
+        if ordered:
+            pool.map(_joinpartition, tasks)
+            rparts = lparts = None
+            outchunks = [_newtempfile(tempdir) for _ in outparts[0]]
+            tasks = [([outpart[i].name for outpart in outparts], f.name,
+                      spillformat)
+                     for i, f in enumerate(outchunks)]
+            for fn in pool.imap(_orderchunk, tasks):
+                for outrow in _iterchunk(fn, spillformat):
+                    yield outrow
+        else:
+            for fns in pool.imap_unordered(_joinpartition, tasks):
+                for fn in fns:
+                    for outrow in _iterchunk(fn, spillformat):
+                        yield outrow
+        pool.close()
+
+    except BaseException:
+        pool.terminate()
+        raise
+
+    finally:
+        pool.join()
+
+
+def _newtempfile(tempdir):
+    # create an empty temporary file for a worker process to write to
+    with NamedTemporaryFile(dir=tempdir, delete=False) as f:
+        return _NamedTempFileDeleteOnGC(f.name)
+
+
+def _forked():
+    # whether worker processes are forked from this one, in which case they
+    # hash values the same way as this process does
+    getstartmethod = getattr(multiprocessing, 'get_start_method', None)
+    return getstartmethod is None or getstartmethod() == 'fork'
+
+
+def _partitionhash(key):
+    # like hash(), but the same in every process, where hash() of strings,
+    # dates and most other things is salted differently per process unless
+    # PYTHONHASHSEED is set, so only numbers are hashed as they are
+    if key is None or isinstance(key, numbers.Number):
+        return hash(key)
+    if isinstance(key, tuple):
+        return hash(tuple(_partitionhash(k) for k in key))
+    if isinstance(key, frozenset):
+        return sum(_partitionhash(k) for k in key)
+    if isinstance(key, datetime.datetime) and key.utcoffset() is not None:
+        # aware datetimes are equal if they are the same point in time
+        key = (key - key.utcoffset()).replace(tzinfo=None)
+    if isinstance(key, text_type):
+        key = key.encode('utf-8', 'surrogatepass')
+    elif not isinstance(key, bytes):
+        text = repr(key)
+        if ' at 0x' in text:
+            raise ArgumentError(
+                'cannot partition by key %s, as it has no repr which is the '
+                'same in every process; join in the calling process, or '
+                'with worker processes started by forking' % text
+            )
+        key = ('%s:%s' % (type(key).__name__, text)).encode('utf-8')
+    return zlib.crc32(key)
+
+
+def _partitionchunk(rows, kind, number, forked, filenames, spillformat):
+    # N.B., this is called in a worker process, writes rows to the given
+    # files by a hash of their keys, first numbering them if asked to
+    n = len(filenames)
+    getkey = operator.itemgetter(*kind)
+    hashkey = hash if forked else _partitionhash
+    if number:
+        rows = [(i,) + tuple(row) for i, row in enumerate(rows)]
+        getkey = operator.itemgetter(*[i + 1 for i in kind])
+    buckets = [[] for _ in filenames]
+    for row in rows:
+        buckets[hashkey(getkey(row)) % n].append(row)
+    for fn, bucket in zip(filenames, buckets):
+        with open(fn, 'wb') as f:
+            spillformat.dump(bucket, f)
+
+
+def _joinpartition(task):
+    # N.B., this is called in a worker process, joins one partition of the
+    # left table with the same partition of the right table and writes the
+    # output rows for each chunk of the left table to the matching file,
+    # returns the names of those files
+    rfns, lfns, rhdr, rkey, lkind, rvind, limit, outfns, spillformat = task
+    rrows = itertools.chain.from_iterable(_iterchunk(fn, spillformat)
+                                          for fn in rfns)
+    rlookup = lookup(itertools.chain([rhdr], rrows), rkey)
+    lgetk = operator.itemgetter(*lkind)
+    rgetv = rowgetter(*rvind)
+    for lfn, outfn in zip(lfns, outfns):
+        with open(outfn, 'wb') as f:
+            outrows = []
+            for lrow in _iterchunk(lfn, spillformat):
+                k = lgetk(lrow)
+                if k in rlookup:
+                    for rrow in rlookup[k]:
+                        outrows.append(tuple(lrow) + tuple(rgetv(rrow)))
+                    if limit is not None and len(outrows) >= limit:
+                        spillformat.dump(outrows, f)
+                        outrows = []
+            spillformat.dump(outrows, f)
+    return outfns
+
+
+def _orderchunk(task):
+    # N.B., this is called in a worker process, puts the output rows of one
+    # chunk of the left table, which are spread over one file per partition,
+    # back in the order of the left table and drops the row numbers
+    fns, outfn, spillformat = task
+    outrows = [outrow for fn in fns for outrow in _iterchunk(fn, spillformat)]
+    outrows.sort(key=operator.itemgetter(0))
+    with open(outfn, 'wb') as f:
+        spillformat.dump([outrow[1:] for outrow in outrows], f)
+    return outfn
@@ -6,7 +6,8 @@ from petl.compat import next, text_type
 from petl.errors import FieldSelectionError
 
 
-from petl.util.base import Table, asindices, rowgetter
+from petl.util.base import Table, asindices, rowgetter, header, \
+    derivedheader
 
 
 def rename(table, *args, **kwargs):
@@ -73,6 +74,9 @@ class RenameView(Table):
     def __iter__(self):
         return iterrename(self.source, self.spec, self.strict)
 
+    def resolveheader(self):
+        return derivedheader(iterrename, self.source, self.spec, self.strict)
+
     def __setitem__(self, key, value):
         self.spec[key] = value
 
@@ -135,6 +139,9 @@ class SetHeaderView(Table):
     def __iter__(self):
         return itersetheader(self.source, self.header)
 
+    def resolveheader(self):
+        return tuple(self.header)
+
 
 def itersetheader(source, header):
     it = iter(source)
@@ -182,6 +189,9 @@ class ExtendHeaderView(Table):
     def __iter__(self):
         return iterextendheader(self.source, self.fields)
 
+    def resolveheader(self):
+        return derivedheader(iterextendheader, self.source, self.fields)
+
 
 def iterextendheader(source, fields):
     it = iter(source)
@@ -239,6 +249,9 @@ class PushHeaderView(Table):
     def __iter__(self):
         return iterpushheader(self.source, self.header)
 
+    def resolveheader(self):
+        return tuple(self.header)
+
 
 def iterpushheader(source, header):
     it = iter(source)
@@ -306,6 +319,10 @@ class PrefixHeaderView(Table):
         self.table = table
         self.prefix = prefix
 
+    def resolveheader(self):
+        return tuple((text_type(self.prefix) + text_type(f))
+                     for f in header(self.table))
+
     def __iter__(self):
         it = iter(self.table)
         hdr = next(it)
@@ -330,6 +347,10 @@ class SuffixHeaderView(Table):
         self.table = table
         self.suffix = suffix
 
+    def resolveheader(self):
+        return tuple((text_type(f) + text_type(self.suffix))
+                     for f in header(self.table))
+
     def __iter__(self):
         it = iter(self.table)
         hdr = next(it)
@@ -359,6 +380,9 @@ class SortHeaderView(Table):
         self.reverse = reverse
         self.missing = missing
 
+    def resolveheader(self):
+        return tuple(sorted(header(self.table)))
+
     def __iter__(self):
         it = iter(self.table)
         hdr = next(it)
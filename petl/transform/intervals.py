@@ -9,6 +9,7 @@ from petl.util.base import asindices, records, Table, values, rowgroupby
 from petl.errors import DuplicateKeyError
 from petl.transform.basics import addfield
 from petl.transform.sorts import sort
+from petl.transform.joins import _comparablegroupby
 
 
 def tupletree(table, start='start', stop='stop', value=None):
@@ -424,7 +425,7 @@ Table.facetintervalrecordlookupone = facetintervalrecordlookupone
 
 def intervaljoin(left, right, lstart='start', lstop='stop', rstart='start',
                  rstop='stop', lkey=None, rkey=None, include_stop=False,
-                 lprefix=None, rprefix=None):
+                 lprefix=None, rprefix=None, presorted=False):
     """
     Join two tables by overlapping intervals. E.g.::
 
@@ -527,6 +528,22 @@ def intervaljoin(left, right, lstart='start', lstop='stop', rstart='start',
         | 'orange' |     2 |   5 | 'orange' |     4 |    9 | 'baz' |
         +----------+-------+-----+----------+-------+------+-------+
 
+    By default the whole of the right table is loaded into an interval tree.
+    If both tables are already sorted by start coordinate (or by facet key
+    then start coordinate, if `lkey` and `rkey` are given) use
+    ``presorted=True`` to stream them through a sweep-line join instead,
+    which holds in memory only the right intervals overlapping the current
+    position and does not need the intervaltree package. Output rows are the
+    same either way. E.g.::
+
+        >>> table4 = etl.intervaljoin(etl.sort(left, ('fruit', 'begin')),
+        ...                           etl.sort(right, ('type', 'start')),
+        ...                           lstart='begin', lstop='end', lkey='fruit',
+        ...                           rstart='start', rstop='stop', rkey='type',
+        ...                           presorted=True)
+        >>> table4.nrows()
+        6
+
     """
     
     assert (lkey is None) == (rkey is None), \
@@ -534,7 +551,8 @@ def intervaljoin(left, right, lstart='start', lstop='stop', rstart='start',
     return IntervalJoinView(left, right, lstart=lstart, lstop=lstop,
                             rstart=rstart, rstop=rstop, lkey=lkey,
                             rkey=rkey, include_stop=include_stop,
-                            lprefix=lprefix, rprefix=rprefix)
+                            lprefix=lprefix, rprefix=rprefix,
+                            presorted=presorted)
 
 
 Table.intervaljoin = intervaljoin
@@ -544,7 +562,8 @@ class IntervalJoinView(Table):
     
     def __init__(self, left, right, lstart='start', lstop='stop', 
                  rstart='start', rstop='stop', lkey=None, rkey=None,
-                 include_stop=False, lprefix=None, rprefix=None):
+                 include_stop=False, lprefix=None, rprefix=None,
+                 presorted=False):
         self.left = left
         self.lstart = lstart
         self.lstop = lstop
@@ -556,6 +575,7 @@ class IntervalJoinView(Table):
         self.include_stop = include_stop
         self.lprefix = lprefix
         self.rprefix = rprefix
+        self.presorted = presorted
 
     def __iter__(self):
         return iterintervaljoin(
@@ -571,13 +591,15 @@ class IntervalJoinView(Table):
             missing=None,
             lprefix=self.lprefix,
             rprefix=self.rprefix,
-            leftouter=False
+            leftouter=False,
+            presorted=self.presorted
         )
         
 
 def intervalleftjoin(left, right, lstart='start', lstop='stop', rstart='start',
                      rstop='stop', lkey=None, rkey=None, include_stop=False,
-                     missing=None, lprefix=None, rprefix=None):
+                     missing=None, lprefix=None, rprefix=None,
+                     presorted=False):
     """
     Like :func:`petl.transform.intervals.intervaljoin` but rows from the left 
     table without a match in the right table are also included. E.g.::
@@ -622,7 +644,9 @@ def intervalleftjoin(left, right, lstart='start', lstop='stop', rstart='start',
 
     Note start coordinates are included and stop coordinates are excluded
     from the interval. Use the `include_stop` keyword argument to include the
-    upper bound of the interval when finding overlaps.
+    upper bound of the interval when finding overlaps. Use `presorted` if
+    both tables are sorted by start coordinate, see
+    :func:`petl.transform.intervals.intervaljoin`.
 
     """
     
@@ -632,7 +656,7 @@ def intervalleftjoin(left, right, lstart='start', lstop='stop', rstart='start',
                                 rstart=rstart, rstop=rstop, lkey=lkey,
                                 rkey=rkey, include_stop=include_stop,
                                 missing=missing, lprefix=lprefix,
-                                rprefix=rprefix)
+                                rprefix=rprefix, presorted=presorted)
 
 
 Table.intervalleftjoin = intervalleftjoin
@@ -642,7 +666,8 @@ class IntervalLeftJoinView(Table):
     
     def __init__(self, left, right, lstart='start', lstop='stop', 
                  rstart='start', rstop='stop', lkey=None, rkey=None,
-                 missing=None, include_stop=False, lprefix=None, rprefix=None):
+                 missing=None, include_stop=False, lprefix=None, rprefix=None,
+                 presorted=False):
         self.left = left
         self.lstart = lstart
         self.lstop = lstop
@@ -655,6 +680,7 @@ class IntervalLeftJoinView(Table):
         self.include_stop = include_stop
         self.lprefix = lprefix
         self.rprefix = rprefix
+        self.presorted = presorted
 
     def __iter__(self):
         return iterintervaljoin(
@@ -670,20 +696,22 @@ class IntervalLeftJoinView(Table):
             missing=self.missing,
             lprefix=self.lprefix,
             rprefix=self.rprefix,
-            leftouter=True
+            leftouter=True,
+            presorted=self.presorted
         )
         
 
 def intervalantijoin(left, right, lstart='start', lstop='stop', rstart='start',
                      rstop='stop', lkey=None, rkey=None, include_stop=False,
-                     missing=None):
+                     missing=None, presorted=False):
     """
     Return rows from the `left` table with no overlapping rows from the `right`
     table.
 
     Note start coordinates are included and stop coordinates are excluded
     from the interval. Use the `include_stop` keyword argument to include the
-    upper bound of the interval when finding overlaps.
+    upper bound of the interval when finding overlaps. If both tables are
+    sorted by start coordinate, `presorted` avoids building an interval tree.
 
     """
 
@@ -692,7 +720,7 @@ def intervalantijoin(left, right, lstart='start', lstop='stop', rstart='start',
     return IntervalAntiJoinView(left, right, lstart=lstart, lstop=lstop,
                                 rstart=rstart, rstop=rstop, lkey=lkey,
                                 rkey=rkey, include_stop=include_stop,
-                                missing=missing)
+                                missing=missing, presorted=presorted)
 
 
 Table.intervalantijoin = intervalantijoin
@@ -702,7 +730,7 @@ class IntervalAntiJoinView(Table):
 
     def __init__(self, left, right, lstart='start', lstop='stop',
                  rstart='start', rstop='stop', lkey=None, rkey=None,
-                 missing=None, include_stop=False):
+                 missing=None, include_stop=False, presorted=False):
         self.left = left
         self.lstart = lstart
         self.lstop = lstop
@@ -713,6 +741,7 @@ class IntervalAntiJoinView(Table):
         self.rkey = rkey
         self.missing = missing
         self.include_stop = include_stop
+        self.presorted = presorted
 
     def __iter__(self):
         return iterintervaljoin(
@@ -729,13 +758,14 @@ class IntervalAntiJoinView(Table):
             lprefix=None,
             rprefix=None,
             leftouter=True,
-            anti=True
+            anti=True,
+            presorted=self.presorted
         )
 
 
 def iterintervaljoin(left, right, lstart, lstop, rstart, rstop, lkey,
                      rkey, include_stop, missing, lprefix, rprefix, leftouter,
-                     anti=False):
+                     anti=False, presorted=False):
 
     # create iterators and obtain fields
     lit = iter(left)
@@ -768,63 +798,117 @@ def iterintervaljoin(left, right, lstart, lstop, rstart, rstop, lkey,
     yield tuple(outhdr)
     
     # create getters for start and stop positions
-    getlstart = itemgetter(lflds.index(lstart))
-    getlstop = itemgetter(lflds.index(lstop))
+    getlcoords = itemgetter(*asindices(lhdr, (lstart, lstop)))
+
+    if presorted:
+        # stream both tables, no interval tree needed
+        getrcoords = itemgetter(*asindices(rhdr, (rstart, rstop)))
+        if rkey is None:
+            matches = _itersweep(lit, _sweepitems(rit, getrcoords),
+                                 getlcoords, include_stop)
+        else:
+            getlkey = itemgetter(*asindices(lhdr, lkey))
+            getrkey = itemgetter(*asindices(rhdr, rkey))
+            matches = _iterfacetsweep(lit, rit, getlkey, getrkey, getlcoords,
+                                      getrcoords, include_stop)
 
-    if rkey is None:
+    elif rkey is None:
         # build interval lookup for right table
         lookup = intervallookup(right, rstart, rstop, include_stop=include_stop)
-        search = lookup.search
-        # main loop
-        for lrow in lit:
-            start = getlstart(lrow)
-            stop = getlstop(lrow)
-            rrows = search(start, stop)
-            if rrows:
-                if not anti:
-                    for rrow in rrows:
-                        outrow = list(lrow)
-                        outrow.extend(rrow)
-                        yield tuple(outrow)
-            elif leftouter:
-                outrow = list(lrow)
-                if not anti:
-                    outrow.extend([missing] * len(rflds))
-                yield tuple(outrow)
+        matches = _itersearch(lit, lookup.search, getlcoords)
 
     else:
         # build interval lookup for right table
         lookup = facetintervallookup(right, key=rkey, start=rstart,
                                      stop=rstop, include_stop=include_stop)
-        search = dict()
-        for f in lookup:
-            search[f] = lookup[f].search
         # getter for facet key values in left table
         getlkey = itemgetter(*asindices(lflds, lkey))
-        # main loop
-        for lrow in lit:
-            lkey = getlkey(lrow)
-            start = getlstart(lrow)
-            stop = getlstop(lrow)
-            
-            try:
-                rrows = search[lkey](start, stop)
-            except KeyError:
-                rrows = None
-            except AttributeError:
-                rrows = None
-                
-            if rrows:
-                if not anti:
-                    for rrow in rrows:
-                        outrow = list(lrow)
-                        outrow.extend(rrow)
-                        yield tuple(outrow)
-            elif leftouter:
-                outrow = list(lrow)
-                if not anti:
-                    outrow.extend([missing] * len(rflds))
-                yield tuple(outrow)
+        matches = _iterfacetsearch(lit, lookup, getlkey, getlcoords)
+
+    # main loop
+    for lrow, rrows in matches:
+        if rrows:
+            if not anti:
+                for rrow in rrows:
+                    outrow = list(lrow)
+                    outrow.extend(rrow)
+                    yield tuple(outrow)
+        elif leftouter:
+            outrow = list(lrow)
+            if not anti:
+                outrow.extend([missing] * len(rflds))
+            yield tuple(outrow)
+
+
+def _itersearch(lit, search, getlcoords):
+    for lrow in lit:
+        start, stop = getlcoords(lrow)
+        yield lrow, search(start, stop)
+
+
+def _iterfacetsearch(lit, lookup, getlkey, getlcoords):
+    for lrow in lit:
+        start, stop = getlcoords(lrow)
+        try:
+            rrows = lookup[getlkey(lrow)].search(start, stop)
+        except KeyError:
+            rrows = None
+        except AttributeError:
+            rrows = None
+        yield lrow, rrows
+
+
+def _sweepitems(rit, getrcoords):
+    for rrow in rit:
+        rrow = tuple(rrow)
+        start, stop = getrcoords(rrow)
+        # null intervals never overlap anything (and cannot be added to an
+        # interval tree either)
+        if start < stop:
+            yield start, stop, rrow
+
+
+def _itersweep(lit, ritems, getlcoords, include_stop):
+    # sweep over left rows and right (start, stop, row) items, both ordered by
+    # start coordinate, holding only the right intervals that may still
+    # overlap the current or a later left row
+    active = []
+    nxt = next(ritems, None)
+    for lrow in lit:
+        start, stop = getlcoords(lrow)
+        if include_stop:
+            start -= 1
+            stop += 1
+        if start >= stop:
+            # same as an interval tree query with a null interval
+            yield lrow, []
+            continue
+        while nxt is not None and nxt[0] < stop:
+            active.append(nxt)
+            nxt = next(ritems, None)
+        # left start coordinates never decrease, so anything stopping at or
+        # before this one can be discarded for good
+        active = [item for item in active if item[1] > start]
+        # sort the same way interval tree search results are sorted
+        rrows = [item[2] for item in sorted(item for item in active
+                                            if item[0] < stop)]
+        yield lrow, rrows
+
+
+def _iterfacetsweep(lit, rit, getlkey, getrkey, getlcoords, getrcoords,
+                    include_stop):
+    # walk the facets of both tables in step, sweeping within each facet
+    rgit = _comparablegroupby(rit, getrkey)
+    rkval, rgrp = next(rgit, (None, None))
+    for lkval, lgrp in _comparablegroupby(lit, getlkey):
+        while rgrp is not None and rkval < lkval:
+            rkval, rgrp = next(rgit, (None, None))
+        if rgrp is not None and rkval == lkval:
+            ritems = _sweepitems(rgrp, getrcoords)
+        else:
+            ritems = iter([])
+        for lrow, rrows in _itersweep(lgrp, ritems, getlcoords, include_stop):
+            yield lrow, rrows
 
 
 def intervaljoinvalues(left, right, value, lstart='start', lstop='stop',
@@ -857,10 +941,14 @@ Table.intervaljoinvalues = intervaljoinvalues
 
 
 def intervalsubtract(left, right, lstart='start', lstop='stop', rstart='start',
-                     rstop='stop', lkey=None, rkey=None, include_stop=False):
+                     rstop='stop', lkey=None, rkey=None, include_stop=False,
+                     presorted=False):
     """
     Subtract intervals in the right hand table from intervals in the left hand 
     table.
+
+    If both tables are sorted by start coordinate (within facet key, if given)
+    pass ``presorted=True`` to subtract in a single streaming pass.
     
     """
 
@@ -868,7 +956,8 @@ def intervalsubtract(left, right, lstart='start', lstop='stop', rstart='start',
         'facet key field must be provided for both or neither table'
     return IntervalSubtractView(left, right, lstart=lstart, lstop=lstop,
                                 rstart=rstart, rstop=rstop, lkey=lkey,
-                                rkey=rkey, include_stop=include_stop)
+                                rkey=rkey, include_stop=include_stop,
+                                presorted=presorted)
 
 
 Table.intervalsubtract = intervalsubtract
@@ -878,7 +967,7 @@ class IntervalSubtractView(Table):
     
     def __init__(self, left, right, lstart='start', lstop='stop', 
                  rstart='start', rstop='stop', lkey=None, rkey=None,
-                 include_stop=False):
+                 include_stop=False, presorted=False):
         self.left = left
         self.lstart = lstart
         self.lstop = lstop
@@ -888,15 +977,17 @@ class IntervalSubtractView(Table):
         self.rstop = rstop
         self.rkey = rkey
         self.include_stop = include_stop
+        self.presorted = presorted
 
     def __iter__(self):
         return iterintervalsubtract(self.left, self.right, self.lstart,
                                     self.lstop, self.rstart, self.rstop,
-                                    self.lkey, self.rkey, self.include_stop)
+                                    self.lkey, self.rkey, self.include_stop,
+                                    self.presorted)
         
 
 def iterintervalsubtract(left, right, lstart, lstop, rstart, rstop, lkey, rkey,
-                         include_stop):
+                         include_stop, presorted=False):
 
     # create iterators and obtain fields
     lit = iter(left)
@@ -925,51 +1016,43 @@ def iterintervalsubtract(left, right, lstart, lstop, rstart, rstop, lkey, rkey,
     getlcoords = itemgetter(lstartidx, lstopidx)
     getrcoords = itemgetter(*asindices(rhdr, (rstart, rstop)))
 
-    if rkey is None:
+    if presorted:
+        # stream both tables, no interval tree needed
+        if rkey is None:
+            matches = _itersweep(lit, _sweepitems(rit, getrcoords),
+                                 getlcoords, include_stop)
+        else:
+            getlkey = itemgetter(*asindices(lhdr, lkey))
+            getrkey = itemgetter(*asindices(rhdr, rkey))
+            matches = _iterfacetsweep(lit, rit, getlkey, getrkey, getlcoords,
+                                      getrcoords, include_stop)
+
+    elif rkey is None:
         # build interval lookup for right table
         lookup = intervallookup(right, rstart, rstop, include_stop=include_stop)
-        search = lookup.search
-        # main loop
-        for lrow in lit:
-            start, stop = getlcoords(lrow)
-            rrows = search(start, stop)
-            if not rrows:
-                yield tuple(lrow)
-            else:
-                rivs = sorted([getrcoords(rrow) for rrow in rrows],
-                              key=itemgetter(0))  # sort by start
-                for x, y in _subtract(start, stop, rivs):
-                    out = list(lrow)
-                    out[lstartidx] = x
-                    out[lstopidx] = y
-                    yield tuple(out)
-                
+        matches = _itersearch(lit, lookup.search, getlcoords)
+
     else:
         # build interval lookup for right table
         lookup = facetintervallookup(right, key=rkey, start=rstart, stop=rstop,
                                      include_stop=include_stop)
         # getter for facet key values in left table
         getlkey = itemgetter(*asindices(lhdr, lkey))
-        # main loop
-        for lrow in lit:
-            lkey = getlkey(lrow)
+        matches = _iterfacetsearch(lit, lookup, getlkey, getlcoords)
+
+    # main loop
+    for lrow, rrows in matches:
+        if not rrows:
+            yield tuple(lrow)
+        else:
             start, stop = getlcoords(lrow)
-            try:
-                rrows = lookup[lkey].search(start, stop)
-            except KeyError:
-                rrows = None
-            except AttributeError:
-                rrows = None
-            if not rrows:
-                yield tuple(lrow)
-            else:
-                rivs = sorted([getrcoords(rrow) for rrow in rrows],
-                              key=itemgetter(0))  # sort by start
-                for x, y in _subtract(start, stop, rivs):
-                    out = list(lrow)
-                    out[lstartidx] = x
-                    out[lstopidx] = y
-                    yield tuple(out)
+            rivs = sorted([getrcoords(rrow) for rrow in rrows],
+                          key=itemgetter(0))  # sort by start
+            for x, y in _subtract(start, stop, rivs):
+                out = list(lrow)
+                out[lstartidx] = x
+                out[lstopidx] = y
+                yield tuple(out)
 
 
 from collections import namedtuple
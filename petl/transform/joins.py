@@ -3,11 +3,12 @@ from __future__ import absolute_import, print_function, division
 
 import itertools
 import operator
+from array import array
 from petl.compat import next, text_type
 
 
 from petl.errors import ArgumentError
-from petl.comparison import comparable_itemgetter, Comparable
+from petl.comparison import Comparable
 from petl.util.base import Table, asindices, rowgetter, rowgroupby, \
     header, data
 from petl.transform.sorts import sort
@@ -47,8 +48,31 @@ def keys_from_args(left, right, key, lkey, rkey):
     return lkey, rkey
 
 
+def joinheader(lhdr, rhdr, rvind, lprefix=None, rprefix=None):
+    # the output fields of a join are the fields of the left table, followed
+    # by the non-key fields of the right table, at indices `rvind`
+    if lprefix is None:
+        outhdr = list(lhdr)
+    else:
+        outhdr = [(text_type(lprefix) + text_type(f)) for f in lhdr]
+    rflds = [rhdr[i] for i in rvind]
+    if rprefix is None:
+        outhdr.extend(rflds)
+    else:
+        outhdr.extend([(text_type(rprefix) + text_type(f)) for f in rflds])
+    return tuple(outhdr)
+
+
+def _resolvejoinheader(left, right, rkey, lprefix=None, rprefix=None):
+    rhdr = header(right)
+    rkind = asindices(rhdr, rkey)
+    rvind = [i for i in range(len(rhdr)) if i not in rkind]
+    return joinheader(header(left), rhdr, rvind, lprefix, rprefix)
+
+
 def join(left, right, key=None, lkey=None, rkey=None, presorted=False,
-         buffersize=None, tempdir=None, cache=True, lprefix=None, rprefix=None):
+         buffersize=None, tempdir=None, cache=True, lprefix=None, rprefix=None,
+         prefilter=False):
     """
     Perform an equi-join on the given tables. E.g.::
 
@@ -135,13 +159,23 @@ def join(left, right, key=None, lkey=None, rkey=None, presorted=False,
     Left and right tables with different key fields can be handled via the
     `lkey` and `rkey` arguments.
 
+    If `prefilter` is True, a filter is built over the key values of the
+    right table, and rows of the left table whose key is certainly not in the
+    right table are dropped before the left table is sorted. This costs two
+    extra passes over the sorted right table, and pays off when the left table
+    is large and most of its rows have no match. The filter is a set of the
+    key values if the right table has up to 100000 rows, otherwise it is a
+    Bloom filter taking up 12 bits per row, which lets through 1-2% of the
+    rows it should drop.
+
     """
 
     # TODO don't read data twice (occurs if using natural key)
     lkey, rkey = keys_from_args(left, right, key, lkey, rkey)
     return JoinView(left, right, lkey=lkey, rkey=rkey,
                     presorted=presorted, buffersize=buffersize, tempdir=tempdir,
-                    cache=cache, lprefix=lprefix, rprefix=rprefix)
+                    cache=cache, lprefix=lprefix, rprefix=rprefix,
+                    prefilter=prefilter)
 
 
 Table.join = join
@@ -152,23 +186,29 @@ class JoinView(Table):
     def __init__(self, left, right, lkey, rkey,
                  presorted=False, leftouter=False, rightouter=False,
                  missing=None, buffersize=None, tempdir=None, cache=True,
-                 lprefix=None, rprefix=None):
+                 lprefix=None, rprefix=None, prefilter=False):
         self.lkey = lkey
         self.rkey = rkey
-        if presorted:
-            self.left = left
-            self.right = right
-        else:
-            self.left = sort(left, lkey, buffersize=buffersize,
-                             tempdir=tempdir, cache=cache)
-            self.right = sort(right, rkey, buffersize=buffersize,
-                              tempdir=tempdir, cache=cache)
+        if not presorted:
+            right = sort(right, rkey, buffersize=buffersize, tempdir=tempdir,
+                         cache=cache)
+        if prefilter and not leftouter:
+            left = PrefilterView(left, lkey, right, rkey)
+        if not presorted:
+            left = sort(left, lkey, buffersize=buffersize, tempdir=tempdir,
+                        cache=cache)
+        self.left = left
+        self.right = right
         self.leftouter = leftouter
         self.rightouter = rightouter
         self.missing = missing
         self.lprefix = lprefix
         self.rprefix = rprefix
 
+    def resolveheader(self):
+        return _resolvejoinheader(self.left, self.right, self.rkey,
+                                  self.lprefix, self.rprefix)
+
     def __iter__(self):
         return iterjoin(self.left, self.right, self.lkey, self.rkey,
                         leftouter=self.leftouter, rightouter=self.rightouter,
@@ -326,6 +366,13 @@ def outerjoin(left, right, key=None, lkey=None, rkey=None, missing=None,
 Table.outerjoin = outerjoin
 
 
+def _comparablegroupby(it, getkey):
+    # group rows by their plain key values, then wrap just the key of each
+    # group, which is much cheaper than wrapping the key of every row
+    for k, grp in itertools.groupby(it, key=getkey):
+        yield Comparable(k), grp
+
+
 def iterjoin(left, right, lkey, rkey, leftouter=False, rightouter=False,
              missing=None, lprefix=None, rprefix=None):
     lit = iter(left)
@@ -339,8 +386,8 @@ def iterjoin(left, right, lkey, rkey, leftouter=False, rightouter=False,
     rkind = asindices(rhdr, rkey)
 
     # construct functions to extract key values from both tables
-    lgetk = comparable_itemgetter(*lkind)
-    rgetk = comparable_itemgetter(*rkind)
+    lgetk = operator.itemgetter(*lkind)
+    rgetk = operator.itemgetter(*rkind)
 
     # determine indices of non-key fields in the right table
     # (in the output, we only include key fields from the left table - we
@@ -349,15 +396,7 @@ def iterjoin(left, right, lkey, rkey, leftouter=False, rightouter=False,
     rgetv = rowgetter(*rvind)
 
     # determine the output fields
-    if lprefix is None:
-        outhdr = list(lhdr)
-    else:
-        outhdr = [(text_type(lprefix) + text_type(f)) for f in lhdr]
-    if rprefix is None:
-        outhdr.extend(rgetv(rhdr))
-    else:
-        outhdr.extend([(text_type(rprefix) + text_type(f)) for f in rgetv(rhdr)])
-    yield tuple(outhdr)
+    yield joinheader(lhdr, rhdr, rvind, lprefix, rprefix)
 
     # define a function to join two groups of rows
     def joinrows(_lrowgrp, _rrowgrp):
@@ -388,8 +427,8 @@ def iterjoin(left, right, lkey, rkey, leftouter=False, rightouter=False,
                     yield tuple(outrow)
 
     # construct group iterators for both tables
-    lgit = itertools.groupby(lit, key=lgetk)
-    rgit = itertools.groupby(rit, key=rgetk)
+    lgit = _comparablegroupby(lit, lgetk)
+    rgit = _comparablegroupby(rit, rgetk)
     lrowgrp = []
     rrowgrp = []
 
@@ -493,6 +532,9 @@ class CrossJoinView(Table):
     def __iter__(self):
         return itercrossjoin(self.sources, self.prefix)
 
+    def resolveheader(self):
+        return next(itercrossjoin(self.sources, self.prefix))
+
 
 def itercrossjoin(sources, prefix):
 
@@ -515,7 +557,7 @@ def itercrossjoin(sources, prefix):
 
 
 def antijoin(left, right, key=None, lkey=None, rkey=None, presorted=False,
-             buffersize=None, tempdir=None, cache=True):
+             buffersize=None, tempdir=None, cache=True, prefilter=False):
     """
     Return rows from the `left` table where the key value does not occur in
     the `right` table. E.g.::
@@ -553,12 +595,20 @@ def antijoin(left, right, key=None, lkey=None, rkey=None, presorted=False,
     Left and right tables with different key fields can be handled via the
     `lkey` and `rkey` arguments.
 
+    If `prefilter` is True, a filter is built over the key values of the
+    left table (see :func:`petl.transform.joins.join`), and rows of the right
+    table whose key is certainly not in the left table are dropped before the
+    right table is sorted. (Every row of the left table either is or isn't
+    output, so the left table itself can't be filtered.) This costs two extra
+    passes over the sorted left table, and pays off when the right table is
+    large and mostly has keys which don't occur in the left table.
+
     """
 
     lkey, rkey = keys_from_args(left, right, key, lkey, rkey)
     return AntiJoinView(left=left, right=right, lkey=lkey, rkey=rkey,
                         presorted=presorted, buffersize=buffersize,
-                        tempdir=tempdir, cache=cache)
+                        tempdir=tempdir, cache=cache, prefilter=prefilter)
 
 
 Table.antijoin = antijoin
@@ -567,21 +617,19 @@ Table.antijoin = antijoin
 class AntiJoinView(Table):
 
     def __init__(self, left, right, lkey, rkey, presorted=False,
-                 buffersize=None, tempdir=None, cache=True):
-        if presorted:
-            self.left = left
-            self.right = right
-        else:
-            self.left = sort(left, lkey, buffersize=buffersize,
-                             tempdir=tempdir, cache=cache)
-            self.right = sort(right, rkey, buffersize=buffersize,
-                              tempdir=tempdir, cache=cache)
+                 buffersize=None, tempdir=None, cache=True, prefilter=False):
+        self.left, self.right = _sortforjoin(left, right, lkey, rkey,
+                                             presorted, buffersize, tempdir,
+                                             cache, prefilter)
         self.lkey = lkey
         self.rkey = rkey
 
     def __iter__(self):
         return iterantijoin(self.left, self.right, self.lkey, self.rkey)
 
+    def resolveheader(self):
+        return header(self.left)
+
 
 def iterantijoin(left, right, lkey, rkey):
     lit = iter(left)
@@ -596,12 +644,12 @@ def iterantijoin(left, right, lkey, rkey):
     rkind = asindices(rhdr, rkey)
 
     # construct functions to extract key values from both tables
-    lgetk = comparable_itemgetter(*lkind)
-    rgetk = comparable_itemgetter(*rkind)
+    lgetk = operator.itemgetter(*lkind)
+    rgetk = operator.itemgetter(*rkind)
 
     # construct group iterators for both tables
-    lgit = itertools.groupby(lit, key=lgetk)
-    rgit = itertools.groupby(rit, key=rgetk)
+    lgit = _comparablegroupby(lit, lgetk)
+    rgit = _comparablegroupby(rit, rgetk)
     lrowgrp = []
 
     # loop until *either* of the iterators is exhausted
@@ -642,7 +690,7 @@ def iterantijoin(left, right, lkey, rkey):
 
 def lookupjoin(left, right, key=None, lkey=None, rkey=None, missing=None,
                presorted=False, buffersize=None, tempdir=None, cache=True,
-               lprefix=None, rprefix=None):
+               lprefix=None, rprefix=None, prefilter=False):
     """
     Perform a left join, but where the key is not unique in the right-hand
     table, arbitrarily choose the first row and ignore others. E.g.::
@@ -671,6 +719,10 @@ def lookupjoin(left, right, key=None, lkey=None, rkey=None, missing=None,
         |  3 | 'purple' |    4 | 'ellipse' | 'small' |
         +----+----------+------+-----------+---------+
 
+    If `prefilter` is True, rows of the right table whose key certainly doesn't
+    occur in the left table are dropped before the right table is sorted, as
+    for :func:`petl.transform.joins.antijoin`.
+
     See also :func:`petl.transform.joins.leftjoin`.
 
     """
@@ -679,7 +731,8 @@ def lookupjoin(left, right, key=None, lkey=None, rkey=None, missing=None,
     return LookupJoinView(left, right, lkey, rkey, presorted=presorted,
                           missing=missing, buffersize=buffersize,
                           tempdir=tempdir, cache=cache,
-                          lprefix=lprefix, rprefix=rprefix)
+                          lprefix=lprefix, rprefix=rprefix,
+                          prefilter=prefilter)
 
 
 Table.lookupjoin = lookupjoin
@@ -689,21 +742,20 @@ class LookupJoinView(Table):
 
     def __init__(self, left, right, lkey, rkey, presorted=False, missing=None,
                  buffersize=None, tempdir=None, cache=True,
-                 lprefix=None, rprefix=None):
-        if presorted:
-            self.left = left
-            self.right = right
-        else:
-            self.left = sort(left, lkey, buffersize=buffersize,
-                             tempdir=tempdir, cache=cache)
-            self.right = sort(right, rkey, buffersize=buffersize,
-                              tempdir=tempdir, cache=cache)
+                 lprefix=None, rprefix=None, prefilter=False):
+        self.left, self.right = _sortforjoin(left, right, lkey, rkey,
+                                             presorted, buffersize, tempdir,
+                                             cache, prefilter)
         self.lkey = lkey
         self.rkey = rkey
         self.missing = missing
         self.lprefix = lprefix
         self.rprefix = rprefix
 
+    def resolveheader(self):
+        return _resolvejoinheader(self.left, self.right, self.rkey,
+                                  self.lprefix, self.rprefix)
+
     def __iter__(self):
         return iterlookupjoin(self.left, self.right, self.lkey, self.rkey,
                               missing=self.missing, lprefix=self.lprefix,
@@ -733,15 +785,7 @@ def iterlookupjoin(left, right, lkey, rkey, missing=None, lprefix=None,
     rgetv = rowgetter(*rvind)
 
     # determine the output fields
-    if lprefix is None:
-        outhdr = list(lhdr)
-    else:
-        outhdr = [(text_type(lprefix) + text_type(f)) for f in lhdr]
-    if rprefix is None:
-        outhdr.extend(rgetv(rhdr))
-    else:
-        outhdr.extend([(text_type(rprefix) + text_type(f)) for f in rgetv(rhdr)])
-    yield tuple(outhdr)
+    yield joinheader(lhdr, rhdr, rvind, lprefix, rprefix)
 
     # define a function to join two groups of rows
     def joinrows(_lrowgrp, _rrowgrp):
@@ -761,12 +805,13 @@ def iterlookupjoin(left, right, lkey, rkey, missing=None, lprefix=None,
                 yield tuple(outrow)
 
     # construct group iterators for both tables
-    lgit = itertools.groupby(lit, key=lgetk)
-    rgit = itertools.groupby(rit, key=rgetk)
+    lgit = _comparablegroupby(lit, lgetk)
+    rgit = _comparablegroupby(rit, rgetk)
     lrowgrp = []
 
     # loop until *either* of the iterators is exhausted
-    lkval, rkval = None, None  # initialise here to handle empty tables
+    # initialise here to handle empty tables
+    lkval, rkval = Comparable(None), Comparable(None)
     try:
 
         # pick off initial row groups
@@ -803,6 +848,111 @@ def iterlookupjoin(left, right, lkey, rkey, missing=None, lprefix=None,
             yield tuple(row)
 
 
+def _sortforjoin(left, right, lkey, rkey, presorted, buffersize, tempdir,
+                 cache, prefilter):
+    # sort both tables, filtering the right table by the keys of the left
+    # table first if asked to
+    if not presorted:
+        left = sort(left, lkey, buffersize=buffersize, tempdir=tempdir,
+                    cache=cache)
+    if prefilter:
+        right = PrefilterView(right, rkey, left, lkey)
+    if not presorted:
+        right = sort(right, rkey, buffersize=buffersize, tempdir=tempdir,
+                     cache=cache)
+    return left, right
+
+
+class _BloomFilter(object):
+    """A compact set of keys which may claim to contain keys that were never
+    added, but never denies containing a key that was added. With the default
+    of 12 bits per key the false positive rate is 1-2% once `capacity`
+    keys have been added.
+
+    All the bits for a key are kept in the same 32-bit word (a so called
+    blocked Bloom filter), so adding or testing a key takes one hash and one
+    lookup, at the price of a somewhat higher false positive rate.
+
+    N.B., keys are hashed with the builtin :func:`hash`, which isn't stable
+    across processes for strings, so a filter is only good for the process
+    it was built in.
+
+    """
+
+    def __init__(self, capacity, bitsperkey=12):
+        self.nwords = max(capacity * bitsperkey // 32, 1)
+        self.words = array('I', [0]) * self.nwords
+
+    def _locate(self, key):
+        # hash a tuple rather than the key itself, as integers hash to
+        # themselves
+        h = hash((key,))
+        mask = (1 << (h & 31) | 1 << (h >> 5 & 31) | 1 << (h >> 10 & 31) |
+                1 << (h >> 15 & 31))
+        return (h >> 20) % self.nwords, mask
+
+    def add(self, key):
+        i, mask = self._locate(key)
+        self.words[i] |= mask
+
+    def __contains__(self, key):
+        i, mask = self._locate(key)
+        return self.words[i] & mask == mask
+
+
+# largest number of right rows for which prefilter uses an exact set of the
+# key values rather than a Bloom filter
+_prefilter_maxexact = 100000
+
+
+def _keyfilter(table, key):
+    # two passes over the table, so the filter can be sized without holding
+    # on to the keys
+    it = iter(table)
+    hdr = next(it)
+    getkey = operator.itemgetter(*asindices(hdr, key))
+    n = sum(1 for _ in it)
+    it = iter(table)
+    next(it)
+    if n <= _prefilter_maxexact:
+        return set(getkey(row) for row in it)
+    bloom = _BloomFilter(n)
+    for row in it:
+        bloom.add(getkey(row))
+    return bloom
+
+
+class PrefilterView(Table):
+
+    def __init__(self, source, key, other, okey):
+        self.source = source
+        self.key = key
+        self.other = other
+        self.okey = okey
+
+    @property
+    def sortorder(self):
+        # dropping rows does not change the order of the rest
+        return getattr(self.source, 'sortorder', None)
+
+    def __iter__(self):
+        return iterprefilter(self.source, self.key, self.other, self.okey)
+
+    def resolveheader(self):
+        return header(self.source)
+
+
+def iterprefilter(source, key, other, okey):
+    bloom = _keyfilter(other, okey)
+    it = iter(source)
+    hdr = next(it)
+    yield tuple(hdr)
+    getkey = operator.itemgetter(*asindices(hdr, key))
+    for row in it:
+        if getkey(row) in bloom:
+            yield tuple(row)
+
+
 def unjoin(table, value, key=None, autoincrement=(1, 1), presorted=False,
            buffersize=None, tempdir=None, cache=True):
     """
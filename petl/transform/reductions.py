@@ -2,22 +2,36 @@ from __future__ import absolute_import, print_function, division
 
 
 import itertools
+import logging
+import multiprocessing
 import operator
-from collections import OrderedDict
+import sys
+from collections import OrderedDict, deque
 from petl.compat import next, string_types, reduce, text_type
 
 
 from petl.errors import ArgumentError
-from petl.util.base import Table, iterpeek, rowgroupby
+from petl.comparison import Comparable
+from petl.util.base import Table, iterpeek, rowgroupby, asindices, Record
 from petl.util.base import values
 from petl.util.counting import nrows
-from petl.transform.sorts import sort, mergesort
+from petl.transform.sorts import sort, mergesort, _hashpartition, \
+    _iterchunk, _getspillformat, _parsebytes, _rowsize, _spillbatchsize
 from petl.transform.basics import cut
 from petl.transform.dedup import distinct
+from petl.transform.accumulators import Accumulator, Count, List, Set, \
+    _CallableAccumulator, _asaccumulator
+import petl.config as config
+
+
+logger = logging.getLogger(__name__)
+warning = logger.warning
+debug = logger.debug
 
 
 def rowreduce(table, key, reducer, header=None, presorted=False,
-              buffersize=None, tempdir=None, cache=True):
+              buffersize=None, tempdir=None, cache=True, method='sort',
+              buffermem=None):
     """
     Group rows under the given key then apply `reducer` to produce a single
     output row for each input group of rows. E.g.::
@@ -51,14 +65,19 @@ def rowreduce(table, key, reducer, header=None, presorted=False,
     recursively to values within a group, rather it is applied once to each row 
     group as a whole.
     
+    See :func:`petl.transform.reductions.aggregate` for the `method` and
+    `buffermem` arguments.
+
     See also :func:`petl.transform.reductions.aggregate` and
     :func:`petl.transform.reductions.fold`.
     
     """
 
+    _checkmethod(method)
     return RowReduceView(table, key, reducer, header=header,
                          presorted=presorted, 
-                         buffersize=buffersize, tempdir=tempdir, cache=cache)
+                         buffersize=buffersize, tempdir=tempdir, cache=cache,
+                         method=method, buffermem=buffermem)
 
 
 Table.rowreduce = rowreduce
@@ -67,8 +86,9 @@ Table.rowreduce = rowreduce
 class RowReduceView(Table):
     
     def __init__(self, source, key, reducer, header=None,
-                 presorted=False, buffersize=None, tempdir=None, cache=True):
-        if presorted:
+                 presorted=False, buffersize=None, tempdir=None, cache=True,
+                 method='sort', buffermem=None):
+        if presorted or method == 'hash':
             self.source = source
         else:
             self.source = sort(source, key, buffersize=buffersize, 
@@ -76,22 +96,28 @@ class RowReduceView(Table):
         self.key = key
         self.header = header
         self.reducer = reducer
+        self.method = method
+        self.buffermem = _parsebytes(buffermem)
+        self.tempdir = tempdir
 
     def __iter__(self):
-        return iterrowreduce(self.source, self.key, self.reducer, self.header)
+        return iterrowreduce(self.source, self.key, self.reducer, self.header,
+                             self.method, self.buffermem, self.tempdir)
 
     
-def iterrowreduce(source, key, reducer, header):
+def iterrowreduce(source, key, reducer, header, method='sort', buffermem=None,
+                  tempdir=None):
     if header is None:
         # output header from source
         header, source = iterpeek(source)
     yield tuple(header)
-    for key, rows in rowgroupby(source, key):
+    for key, rows in _groupby(source, key, None, method, buffermem, tempdir):
         yield tuple(reducer(key, rows))
         
 
 def aggregate(table, key, aggregation=None, value=None, presorted=False,
-              buffersize=None, tempdir=None, cache=True, field='value'):
+              buffersize=None, tempdir=None, cache=True, field='value',
+              method='sort', buffermem=None, workers=None):
     """Apply aggregation functions.
     E.g.::
 
@@ -214,18 +240,59 @@ def aggregate(table, key, aggregation=None, value=None, presorted=False,
 
     If `key` is None, sorting is not necessary.
 
+    If `method` is ``'hash'``, the data are not sorted, instead rows are
+    gathered into groups in a hash table in a single pass, which is usually
+    quicker when there are not too many groups. Groups come out in the order
+    their keys are first seen rather than sorted by key. E.g.::
+
+        >>> etl.aggregate(table1, 'baz', sum, 'bar', method='hash')
+        +-------+-------+
+        | baz   | value |
+        +=======+=======+
+        | True  |     9 |
+        +-------+-------+
+        | False |    18 |
+        +-------+-------+
+
+    The hash table is kept in memory unless `buffermem` is given, as a number
+    of bytes or a string like ``'512MB'``. If the hash table looks to need
+    more memory than that, rows are split into partitions by a hash of the
+    key and written to temporary files (in `tempdir`, if given), then each
+    partition is aggregated separately. In that case groups come out
+    partition by partition.
+
+    The aggregation can be spread over a pool of worker processes by setting
+    the `workers` argument to the number of processes to use. Rows are then
+    read in chunks of `buffersize` rows (`petl.config.sort_buffersize` by
+    default, or 10000 if that is `None`) and each chunk is aggregated by a
+    worker into partial results for its groups, which are combined as the
+    chunks come back, so the data are not sorted and `buffermem` and `cache`
+    are not applied. This needs aggregation functions whose partial results
+    can be combined, i.e., the builtins :func:`len`, :func:`sum`, :func:`min`,
+    :func:`max`, :func:`list` and :func:`set`, or any of the accumulators in
+    :mod:`petl.transform.accumulators`, and source fields given by name; other
+    functions raise an :class:`petl.errors.ArgumentError`. Rows need to be
+    picklable. The output is the same as without workers, with groups sorted
+    by key unless `method` is ``'hash'``, except that floating point results
+    may be rounded differently. If `workers` is `None`, the value of
+    `petl.config.aggregate_workers` will be used, which is `None` by default,
+    meaning the aggregation runs in the calling process.
+
     """
 
+    _checkmethod(method)
     if callable(aggregation):
         return SimpleAggregateView(table, key, aggregation=aggregation, 
                                    value=value, presorted=presorted, 
                                    buffersize=buffersize, tempdir=tempdir, 
-                                   cache=cache, field=field)
+                                   cache=cache, field=field, method=method,
+                                   buffermem=buffermem, workers=workers)
     elif aggregation is None or isinstance(aggregation, (list, tuple, dict)):
         # ignore value arg
         return MultiAggregateView(table, key, aggregation=aggregation,  
                                   presorted=presorted, buffersize=buffersize, 
-                                  tempdir=tempdir, cache=cache)
+                                  tempdir=tempdir, cache=cache, method=method,
+                                  buffermem=buffermem, workers=workers)
     else:
         raise ArgumentError('expected aggregation is callable, list, tuple, dict '
                         'or None')
@@ -238,8 +305,12 @@ class SimpleAggregateView(Table):
     
     def __init__(self, table, key, aggregation=list, value=None, 
                  presorted=False, buffersize=None, tempdir=None,
-                 cache=True, field='value'):
-        if presorted or key is None:
+                 cache=True, field='value', method='sort', buffermem=None,
+                 workers=None):
+        if workers is None:
+            workers = config.aggregate_workers
+        if presorted or key is None or method == 'hash' \
+                or (workers is not None and workers > 1):
             self.table = table
         else:
             self.table = sort(table, key, buffersize=buffersize, 
@@ -248,13 +319,33 @@ class SimpleAggregateView(Table):
         self.aggregation = aggregation
         self.value = value
         self.field = field
+        self.method = method
+        self.buffermem = _parsebytes(buffermem)
+        self.tempdir = tempdir
+        self.workers = workers
+        self.buffersize = buffersize
         
     def __iter__(self):
         return itersimpleaggregate(self.table, self.key, self.aggregation, 
-                                   self.value, self.field)
-
-
-def itersimpleaggregate(table, key, aggregation, value, field):
+                                   self.value, self.field, self.method,
+                                   self.buffermem, self.tempdir, self.workers,
+                                   self.buffersize)
+
+
+def itersimpleaggregate(table, key, aggregation, value, field, method='sort',
+                        buffermem=None, tempdir=None, workers=None,
+                        buffersize=None):
+
+    if (workers is not None and workers > 1) \
+            or (key is not None and isinstance(aggregation, Accumulator)):
+        # accumulators are updated as rows come, rather than being given all
+        # the values of a group
+        aggregation = OrderedDict([(field, (value, aggregation))])
+        for row in itermultiaggregate(table, key, aggregation, method,
+                                      buffermem, tempdir, workers,
+                                      buffersize):
+            yield row
+        return
 
     # special case counting
     if aggregation == len and key is not None:
@@ -273,7 +364,7 @@ def itersimpleaggregate(table, key, aggregation, value, field):
 
     # generate data
     if isinstance(key, (list, tuple)):
-        for k, grp in rowgroupby(table, key, value):
+        for k, grp in _groupby(table, key, value, method, buffermem, tempdir):
             yield tuple(k) + (aggregation(grp),)
     elif key is None:
         # special case counting
@@ -282,20 +373,29 @@ def itersimpleaggregate(table, key, aggregation, value, field):
         else:
             yield aggregation(values(table, value)),
     else:
-        for k, grp in rowgroupby(table, key, value):
+        for k, grp in _groupby(table, key, value, method, buffermem, tempdir):
             yield k, aggregation(grp)
 
 
 class MultiAggregateView(Table):
     
     def __init__(self, source, key, aggregation=None, presorted=False, 
-                 buffersize=None, tempdir=None, cache=True):
-        if presorted or key is None:
+                 buffersize=None, tempdir=None, cache=True, method='sort',
+                 buffermem=None, workers=None):
+        if workers is None:
+            workers = config.aggregate_workers
+        if presorted or key is None or method == 'hash' \
+                or (workers is not None and workers > 1):
             self.source = source
         else:
             self.source = sort(source, key, buffersize=buffersize, 
                                tempdir=tempdir, cache=cache)
         self.key = key
+        self.method = method
+        self.buffermem = _parsebytes(buffermem)
+        self.tempdir = tempdir
+        self.workers = workers
+        self.buffersize = buffersize
         if aggregation is None:
             self.aggregation = OrderedDict()
         elif isinstance(aggregation, (list, tuple)):
@@ -311,18 +411,20 @@ class MultiAggregateView(Table):
             )
 
     def __iter__(self):
-        return itermultiaggregate(self.source, self.key, self.aggregation)
+        return itermultiaggregate(self.source, self.key, self.aggregation,
+                                  self.method, self.buffermem, self.tempdir,
+                                  self.workers, self.buffersize)
     
     def __setitem__(self, key, value):
         self.aggregation[key] = value
 
     
-def itermultiaggregate(source, key, aggregation):
+def itermultiaggregate(source, key, aggregation, method='sort', buffermem=None,
+                       tempdir=None, workers=None, buffersize=None):
     aggregation = OrderedDict(aggregation.items())  # take a copy
     it = iter(source)
     hdr = next(it)
-    # push back header to ensure we iterate only once
-    it = itertools.chain([hdr], it)
+    flds = list(map(text_type, hdr))
 
     # normalise aggregators
     for outfld in aggregation:
@@ -340,6 +442,39 @@ def itermultiaggregate(source, key, aggregation):
         else:
             raise ArgumentError('invalid aggregation: %r, %r' % (outfld, agg))
 
+    # resolve source fields and accumulators once, rather than for each group
+    srcidxs = []
+    accumulators = []
+    records = False
+    for outfld in aggregation:
+        srcfld, aggfun = aggregation[outfld]
+        acc = _asaccumulator(aggfun)
+        if workers is not None and workers > 1 \
+                and isinstance(acc, _CallableAccumulator):
+            raise ArgumentError(
+                'aggregation %r for field %r cannot be combined across worker '
+                'processes, use an accumulator from '
+                'petl.transform.accumulators instead' % (aggfun, outfld)
+            )
+        if srcfld is None:
+            srcidxs.append(None)  # aggregate whole rows, as records
+            # no need to make records just to count them
+            records = records or not isinstance(acc, Count)
+        elif callable(srcfld):
+            if workers is not None and workers > 1:
+                raise ArgumentError(
+                    'source field for %r is a function, which cannot be '
+                    'sent to worker processes, add a field with the values '
+                    'to aggregate instead' % outfld
+                )
+            srcidxs.append(srcfld)  # a function of the row, as a record
+        elif isinstance(srcfld, (list, tuple)):
+            srcidxs.append(tuple(hdr.index(f) for f in srcfld))
+        else:
+            srcidxs.append(hdr.index(srcfld))
+        accumulators.append(acc)
+    aggregator = _MultiAggregator(srcidxs, accumulators, flds, records)
+
     # determine output header
     if isinstance(key, (list, tuple)):
         outhdr = list(key)
@@ -354,13 +489,30 @@ def itermultiaggregate(source, key, aggregation):
     yield tuple(outhdr)
 
     if key is None:
-        grouped = rowgroupby(it, lambda x: None)
+        getkey = _nokey
     else:
-        grouped = rowgroupby(it, key)
+        getkey = _getkeyfn(hdr, flds, key)
+    if workers is not None and workers > 1:
+        grouped = _iterparallelaggregate(it, hdr, key, getkey, aggregator,
+                                         method, workers, buffersize)
+    elif key is None or method != 'hash':
+        grouped = ((k, aggregator.aggregate(rows))
+                   for k, rows in itertools.groupby(it, key=getkey))
+    else:
+        # one state per group rather than the rows of each group, unless
+        # some of the aggregations need all the values
+        if any(isinstance(acc, (List, Set, _CallableAccumulator))
+               for acc in accumulators):
+            weigh = aggregator.weigh
+        else:
+            weigh = None
+        grouped = _iterhashgroups(((False, getkey(row), row) for row in it),
+                                  aggregator.start, aggregator.add, weigh,
+                                  buffermem, tempdir)
+        grouped = ((k, aggregator.finalize(states)) for k, states in grouped)
 
     # generate data
-    for k, rows in grouped:
-        rows = list(rows)  # may need to iterate over these more than once
+    for k, aggvals in grouped:
         # handle compound key
         if isinstance(key, (list, tuple)):
             outrow = list(k)
@@ -368,26 +520,182 @@ def itermultiaggregate(source, key, aggregation):
             outrow = []
         else:
             outrow = [k]
-        for outfld in aggregation:
-            srcfld, aggfun = aggregation[outfld]
-            if srcfld is None:
-                aggval = aggfun(rows)
-                outrow.append(aggval)
-            elif isinstance(srcfld, (list, tuple)):
-                idxs = [hdr.index(f) for f in srcfld]
-                valgetter = operator.itemgetter(*idxs)
-                vals = (valgetter(row) for row in rows)
-                aggval = aggfun(vals)
-                outrow.append(aggval)
-            else:
-                idx = hdr.index(srcfld)
-                # try using generator comprehension
-                vals = (row[idx] for row in rows)
-                aggval = aggfun(vals)
-                outrow.append(aggval)
+        outrow.extend(aggvals)
         yield tuple(outrow)
 
 
+class _MultiAggregator(object):
+    # updates the accumulators for all output fields from each row, where
+    # srcidxs holds the index or indices of the source field(s) for each
+    # output field, a function of the row, or None to aggregate whole rows
+
+    def __init__(self, srcidxs, accumulators, flds, records):
+        self.srcidxs = srcidxs
+        self.accumulators = accumulators
+        self.flds = flds
+        self.records = records
+        self.getters = getters = [self._getter(idx) for idx in srcidxs]
+        self.updaters = [(i, getvalue, acc.update) for i, (getvalue, acc)
+                         in enumerate(zip(getters, accumulators))]
+
+    def _getter(self, idx):
+        if idx is None:
+            return None
+        elif callable(idx):
+            flds = self.flds
+            return lambda row: idx(Record(row, flds))
+        elif isinstance(idx, tuple):
+            return operator.itemgetter(*idx)
+        else:
+            return operator.itemgetter(idx)
+
+    def __reduce__(self):
+        # N.B., itemgetters can't be pickled on all versions of Python, so
+        # send the field indices to worker processes instead
+        return _MultiAggregator, (self.srcidxs, self.accumulators, self.flds,
+                                  self.records)
+
+    def aggregate(self, rows):
+        return self.finalize(self.accumulate(rows))
+
+    def accumulate(self, rows):
+        # accumulate a group of rows, a block at a time, so the accumulators
+        # can work through lists of values
+        getters = self.getters
+        accumulators = self.accumulators
+        states = [acc.init() for acc in accumulators]
+        while True:
+            block = list(itertools.islice(rows, _aggregate_blocksize))
+            if not block:
+                break
+            if self.records:
+                rowvals = [Record(row, self.flds) for row in block]
+            else:
+                rowvals = block
+            for i, getvalue in enumerate(getters):
+                if getvalue is None:
+                    vals = rowvals
+                else:
+                    vals = list(map(getvalue, block))
+                states[i] = accumulators[i].extend(states[i], vals)
+        return states
+
+    def start(self, row):
+        return self.add([acc.init() for acc in self.accumulators], row)
+
+    def add(self, states, row):
+        if self.records:
+            rec = Record(row, self.flds)
+        else:
+            rec = row
+        for i, getvalue, update in self.updaters:
+            if getvalue is None:
+                states[i] = update(states[i], rec)
+            else:
+                states[i] = update(states[i], getvalue(row))
+        return states
+
+    def merge(self, states, others):
+        return [acc.merge(state, other)
+                for acc, state, other in zip(self.accumulators, states,
+                                             others)]
+
+    def finalize(self, states):
+        return [acc.finalize(state)
+                for acc, state in zip(self.accumulators, states)]
+
+    def weigh(self, states):
+        return max(len(state) if isinstance(state, (list, set)) else 1
+                   for state in states)
+
+
+# number of rows of a group handed to the accumulators at a time
+_aggregate_blocksize = 1000
+
+
+def _iterparallelaggregate(it, hdr, key, getkey, aggregator, method, workers,
+                           buffersize):
+    # Rows are read in chunks and handed over to a pool of worker processes,
+    # each of which aggregates a chunk into partial states for the groups
+    # it contains. Partial states are merged in the order the chunks were
+    # read, so the results are the same as aggregating serially.
+    if callable(key):
+        # work out keys here, as key functions may not be picklable
+        keyidxs = None
+    elif key is None:
+        keyidxs = ()
+    else:
+        keyidxs = tuple(asindices(hdr, key))
+    if buffersize is None:
+        buffersize = _spillbatchsize(config.sort_buffersize)
+    groups = dict()
+    order = []
+
+    def merge(partial):
+        for k, states in partial:
+            if k in groups:
+                groups[k] = aggregator.merge(groups[k], states)
+            else:
+                groups[k] = states
+                order.append(k)
+
+    debug('aggregating chunks with %s worker processes', workers)
+    pending = deque()
+    pool = multiprocessing.Pool(processes=workers)
+    try:
+        while True:
+            rows = list(itertools.islice(it, buffersize))
+            if not rows:
+                break
+            if keyidxs is None:
+                keys = list(map(getkey, rows))
+            else:
+                keys = None
+
+            # don't let more chunks pile up in memory than there are workers
+            # to aggregate them
+            if len(pending) >= workers:
+                merge(pending.popleft().get())
+
+            pending.append(pool.apply_async(
+                _aggregatechunk, (rows, keys, keyidxs, aggregator)
+            ))
+
+        while pending:
+            merge(pending.popleft().get())
+
+        pool.close()
+
+    except BaseException:
+        pool.terminate()
+        raise
+
+    finally:
+        pool.join()
+
+    if method == 'sort':
+        order.sort(key=Comparable)
+    for k in order:
+        yield k, aggregator.finalize(groups[k])
+
+
+def _aggregatechunk(rows, keys, keyidxs, aggregator):
+    # N.B., this is called in a worker process, and returns the partial states
+    # for the groups in a chunk of rows, in the order they are first seen
+    if keys is None and keyidxs:
+        keys = map(operator.itemgetter(*keyidxs), rows)
+    elif keys is None:
+        keys = map(_nokey, rows)
+    groups = OrderedDict()
+    for k, row in zip(keys, rows):
+        if k in groups:
+            groups[k].append(row)
+        else:
+            groups[k] = [row]
+    return [(k, aggregator.accumulate(iter(grp)))
+            for k, grp in groups.items()]
+
+
 def groupcountdistinctvalues(table, key, value):
     """Group by the `key` field then count the number of distinct values in the
     `value` field."""
@@ -661,7 +969,7 @@ class Conflict(frozenset):
 
 
 def fold(table, key, f, value=None, presorted=False, buffersize=None,
-         tempdir=None, cache=True):
+         tempdir=None, cache=True, method='sort', buffermem=None):
     """
     Reduce rows recursively via the Python standard :func:`reduce` function.
     E.g.::
@@ -684,13 +992,20 @@ def fold(table, key, f, value=None, presorted=False, buffersize=None,
         |   2 |    12 |
         +-----+-------+
 
+    With ``method='hash'`` each group is reduced as its rows arrive, so only
+    the running value for each group is held in memory; see
+    :func:`petl.transform.reductions.aggregate` for this and the `buffermem`
+    argument.
+
     See also :func:`petl.transform.reductions.aggregate`,
     :func:`petl.transform.reductions.rowreduce`.
 
     """
 
+    _checkmethod(method)
     return FoldView(table, key, f, value=value, presorted=presorted,
-                    buffersize=buffersize, tempdir=tempdir, cache=cache)
+                    buffersize=buffersize, tempdir=tempdir, cache=cache,
+                    method=method, buffermem=buffermem)
 
 
 Table.fold = fold
@@ -699,8 +1014,9 @@ Table.fold = fold
 class FoldView(Table):
 
     def __init__(self, table, key, f, value=None, presorted=False,
-                 buffersize=None, tempdir=None, cache=True):
-        if presorted:
+                 buffersize=None, tempdir=None, cache=True, method='sort',
+                 buffermem=None):
+        if presorted or method == 'hash':
             self.table = table
         else:
             self.table = sort(table, key, buffersize=buffersize,
@@ -708,12 +1024,167 @@ class FoldView(Table):
         self.key = key
         self.f = f
         self.value = value
+        self.method = method
+        self.buffermem = _parsebytes(buffermem)
+        self.tempdir = tempdir
 
     def __iter__(self):
-        return iterfold(self.table, self.key, self.f, self.value)
+        return iterfold(self.table, self.key, self.f, self.value, self.method,
+                        self.buffermem, self.tempdir)
 
 
-def iterfold(table, key, f, value):
+def iterfold(table, key, f, value, method='sort', buffermem=None,
+             tempdir=None):
     yield ('key', 'value')
-    for k, grp in rowgroupby(table, key, value):
-        yield k, reduce(f, grp)
+    if method == 'hash':
+        for k, v in _hashrowgroupby(table, key, value, reducer=f,
+                                    buffermem=buffermem, tempdir=tempdir):
+            yield k, v
+    else:
+        for k, grp in rowgroupby(table, key, value):
+            yield k, reduce(f, grp)
+
+
+def _checkmethod(method):
+    if method not in ('sort', 'hash'):
+        raise ArgumentError("expected method is 'sort' or 'hash', found %r"
+                            % (method,))
+
+
+def _groupby(table, key, value, method, buffermem, tempdir):
+    if method == 'hash':
+        return _hashrowgroupby(table, key, value, buffermem=buffermem,
+                               tempdir=tempdir)
+    return rowgroupby(table, key, value)
+
+
+def _hashrowgroupby(table, key, value=None, reducer=None, buffermem=None,
+                    tempdir=None):
+    # like rowgroupby, but groups rows via a hash table rather than relying on
+    # the table being sorted, yielding (key, list of rows or values) pairs in
+    # order of first appearance, or (key, reduced value) pairs if reducer is
+    # given
+    it = iter(table)
+    hdr = next(it)
+    flds = list(map(text_type, hdr))
+
+    getkey = _getkeyfn(hdr, flds, key)
+    if value is None:
+        if reducer is None:
+            getitem = tuple  # made into records on the way out
+        else:
+            getitem = lambda row: Record(row, flds)
+    elif callable(value):
+        getitem = lambda row: value(Record(row, flds))
+    else:
+        getitem = operator.itemgetter(*asindices(hdr, value))
+
+    records = ((False, getkey(row), getitem(row)) for row in it)
+    if reducer is not None:
+        return _iterhashgroups(records, _first, reducer, None, buffermem,
+                               tempdir)
+    groups = _iterhashgroups(records, _startlist, _appendlist, len,
+                             buffermem, tempdir)
+    if value is None:
+        groups = ((k, [Record(row, flds) for row in rows])
+                  for k, rows in groups)
+    return groups
+
+
+def _getkeyfn(hdr, flds, key):
+    # as rowgroupby, callable keys are given records
+    if callable(key):
+        return lambda row: key(Record(row, flds))
+    return operator.itemgetter(*asindices(hdr, key))
+
+
+def _nokey(row):
+    return None
+
+
+def _first(item):
+    return item
+
+
+def _startlist(item):
+    return [item]
+
+
+def _appendlist(items, item):
+    items.append(item)
+    return items
+
+
+def _itemsize(item, getsizeof=sys.getsizeof):
+    if isinstance(item, tuple):
+        return _rowsize(item)
+    return getsizeof(item)
+
+
+# number of partitions the rows are split into when the hash table doesn't
+# fit in buffermem, and how many times a partition which still doesn't fit is
+# split again
+_aggregate_partitions = 32
+_aggregate_maxdepth = 3
+
+
+def _iterhashgroups(records, start, add, weigh, buffermem, tempdir,
+                    depth=0):
+    # Records are (False, key, item) for input items, or (True, key, state)
+    # for groups carried over from a hash table which didn't fit, which
+    # always come before any items with the same key. The state of a group
+    # is start(item) for its first item, then add(state, item) for each
+    # following item. The memory needed is taken to grow with the number of
+    # groups, or if weigh is given with the number of items, where weigh(state)
+    # is the number of items held by a carried over state.
+    records = iter(records)
+    groups = OrderedDict()
+    units = nsampled = sampled = 0
+    full = False
+    for n, (carried, k, x) in enumerate(records):
+        if carried:
+            groups[k] = x
+            units += weigh(x) if weigh else 1
+            continue
+        if k in groups:
+            groups[k] = add(groups[k], x)
+            if weigh:
+                units += 1
+        else:
+            groups[k] = start(x)
+            units += 1
+        if buffermem is not None and (n < 100 or n % 100 == 0):
+            nsampled += 1
+            sampled += _itemsize(x)
+            if sampled * units // nsampled >= buffermem:
+                full = True
+                break
+
+    if full and depth >= _aggregate_maxdepth:
+        # most likely one very big group, no way to split it
+        warning('hash aggregation partition does not fit in buffermem')
+        for k, state in _iterhashgroups(
+                itertools.chain(((True, k, s) for k, s in groups.items()),
+                                records),
+                start, add, weigh, None, tempdir):
+            yield k, state
+        return
+
+    if not full:
+        for k, state in groups.items():
+            yield k, state
+        return
+
+    debug('hash aggregation does not fit in buffermem, partitioning')
+    spillformat = _getspillformat(None)
+    carried = ((True, k, s) for k, s in groups.items())
+    parts = _hashpartition(itertools.chain(carried, records),
+                           operator.itemgetter(1), _aggregate_partitions,
+                           depth, config.sort_buffersize, tempdir,
+                           spillformat)
+    groups = carried = None
+    for part in parts:
+        for k, state in _iterhashgroups(_iterchunk(part.name, spillformat),
+                                        start, add, weigh, buffermem,
+                                        tempdir, depth + 1):
+            yield k, state
@@ -7,7 +7,7 @@ from petl.comparison import Comparable
 
 
 from petl.errors import ArgumentError
-from petl.util.base import asindices, expr, Table, values, Record
+from petl.util.base import asindices, expr, Table, values, Record, header
 
 
 def select(table, *args, **kwargs):
@@ -91,6 +91,14 @@ class RowSelectView(Table):
         self.missing = missing
         self.complement = complement
 
+    @property
+    def sortorder(self):
+        # selecting rows does not change their order
+        return getattr(self.source, 'sortorder', None)
+
+    def resolveheader(self):
+        return header(self.source)
+
     def __iter__(self):
         return iterrowselect(self.source, self.where, self.missing,
                              self.complement)
@@ -105,6 +113,14 @@ class FieldSelectView(Table):
         self.complement = complement
         self.missing = missing
 
+    @property
+    def sortorder(self):
+        # selecting rows does not change their order
+        return getattr(self.source, 'sortorder', None)
+
+    def resolveheader(self):
+        return header(self.source)
+
     def __iter__(self):
         return iterfieldselect(self.source, self.field, self.where,
                                self.complement, self.missing)
@@ -418,6 +434,9 @@ class SelectUsingContextView(Table):
     def __iter__(self):
         return iterselectusingcontext(self.table, self.query)
 
+    def resolveheader(self):
+        return header(self.table)
+
 
 def iterselectusingcontext(table, query):
     it = iter(table)
@@ -2,18 +2,31 @@ from __future__ import absolute_import, print_function, division
 
 
 import os
+import re
+import sys
 import heapq
+import bisect
+import hashlib
+import multiprocessing
+import shutil
+import struct
+import tempfile
+import zlib
+from array import array
+from collections import deque
 from tempfile import NamedTemporaryFile
 import itertools
 import logging
-from collections import namedtuple
 import operator
-from petl.compat import pickle, next, text_type
+from petl.compat import pickle, next, text_type, string_types, izip
 
 
 import petl.config as config
-from petl.comparison import comparable_itemgetter
-from petl.util.base import Table, asindices
+from petl.errors import ArgumentError
+from petl.comparison import comparable_itemgetter, columntypes, \
+    sortable_itemgetter, isnative
+from petl.util.base import Table, asindices, SortOrder, sortkeytuple, \
+    issortedby, header
 
 
 logger = logging.getLogger(__name__)
@@ -23,7 +36,8 @@ debug = logger.debug
 
 
 def sort(table, key=None, reverse=False, buffersize=None, tempdir=None,
-         cache=True):
+         cache=True, workers=None, spill_format=None, buffermem=None,
+         persist=None):
     """
     Sort the table. Field names or indices (from zero) can be used to specify
     the key. E.g.::
@@ -90,7 +104,14 @@ def sort(table, key=None, reverse=False, buffersize=None, tempdir=None,
     If the number of rows in the table is less than `buffersize`, the table
     will be sorted in memory. Otherwise, the table is sorted in chunks of
     no more than `buffersize` rows, each chunk is written to a temporary file,
-    and then a merge sort is performed on the temporary files.
+    and then a merge sort is performed on the temporary files. However, if
+    the values of the key found in the first chunk can be compared natively
+    (e.g., they are all numbers, or all strings, possibly with `None`), the
+    rows are instead distributed into temporary files by ranges of key
+    values chosen from the first chunk, and each file is sorted in memory in
+    turn, which avoids the cost of merging. Should values of other types
+    turn up later on, the table is sorted in chunks after all, and so the
+    output is the same either way.
 
     If `buffersize` is `None`, the value of
     `petl.config.sort_buffersize` will be used. By default this is
@@ -102,144 +123,493 @@ def sort(table, key=None, reverse=False, buffersize=None, tempdir=None,
     If `petl.config.sort_buffersize` is set to `None`, this forces
     all sorting to be done entirely in memory.
 
+    Alternatively, the sort buffer can be limited by memory rather than by
+    number of rows via the `buffermem` argument, which can be a number of
+    bytes or a string like ``'512MB'`` or ``'2GB'``. The size of rows is
+    estimated from a sample of the rows as they are read, and a chunk is
+    written to a temporary file once the estimated size of the rows in the
+    buffer reaches the budget. When `buffermem` is given the
+    `petl.config.sort_buffersize` setting is not used, although an explicit
+    `buffersize` argument still caps the number of rows in each chunk. If
+    `buffermem` is `None`, the value of `petl.config.sort_buffermem` will be
+    used, which is `None` by default. As with the `spill_format` argument
+    below, all other transformations that sort their input use this setting,
+    so e.g. setting ``petl.config.sort_buffermem = '512MB'`` will limit the
+    sort buffer of every join, aggregation, etc.
+
     By default the results of the sort will be cached, and so a second pass over
     the sorted table will yield rows from the cache and will not repeat the
     sort operation. To turn off caching, set the `cache` argument to `False`.
 
+    When the table is sorted in chunks, the chunks can be sorted and written
+    to temporary files by a pool of worker processes while the source table
+    continues to be read, by setting the `workers` argument to the number of
+    processes to use. If `workers` is `None`, the value of
+    `petl.config.sort_workers` will be used. By default this is `None`, which
+    means all chunks are sorted in the calling process. The output is the
+    same whichever way the chunks are sorted, however the rows need to be
+    picklable to be sent to the worker processes.
+
+    The `spill_format` argument controls how rows are written to the
+    temporary chunk files. It can be one of the following strings:
+
+    * ``'batch'`` - rows are pickled in batches, one frame per batch
+    * ``'zlib'`` - as ``'batch'`` but each frame is compressed with zlib
+    * ``'columns'`` - each batch is stored column by column, with columns
+      found to contain only `int` or only `float` values packed as arrays
+    * ``'pickle'`` - each row is pickled individually
+
+    Alternatively a :class:`petl.transform.sorts.SpillFormat` instance (or
+    any object with compatible `dump` and `load` methods) can be given. If
+    `spill_format` is `None`, the value of `petl.config.sort_spill_format`
+    will be used, which is ``'batch'`` by default. N.B., all other
+    transformations that sort their input (e.g., :func:`petl.transform.joins.join`,
+    :func:`petl.transform.dedup.distinct`) use this setting too.
+
+    If the table is already known to be sorted by the given key, because it
+    is the output of :func:`petl.transform.sorts.sort` or
+    :func:`petl.transform.sorts.mergesort` passed through transformations that
+    do not change the order of rows (e.g., :func:`petl.transform.basics.cut`,
+    :func:`petl.transform.selects.select` or
+    :func:`petl.transform.conversions.convert` on fields other than the
+    key), the table is returned unchanged. Because all transformations with
+    a `presorted` argument (e.g., :func:`petl.transform.joins.join`,
+    :func:`petl.transform.dedup.distinct`,
+    :func:`petl.transform.reductions.aggregate`) sort their inputs with this
+    function, they will skip redundant sorts automatically.
+
+    The sorted chunks can also be kept in a persistent cache directory, given
+    via the `persist` argument, so that sorting the same unchanged file again
+    from another process (e.g., in the next run of a nightly batch job) reads
+    the sorted chunks back instead of sorting again. This only works when
+    `table` is read directly from a local file (e.g., via
+    :func:`petl.io.csv.fromcsv`), in which case the cache entry is keyed on
+    the path, size and modification time of the file, the options used to
+    read it, and the sort key and direction. Otherwise the table is sorted as
+    usual. If `persist` is `None`, the value of `petl.config.sort_persist`
+    will be used, which is `None` by default. The total size of the cache
+    directory is kept under `petl.config.sort_persist_maxsize` (``'10GB'`` by
+    default) by deleting the least recently used entries. Several processes
+    can safely use the same cache directory at the same time.
+
     """
 
+    if issortedby(table, key, reverse):
+        debug('table is already sorted by %r, not sorting again', key)
+        return table
+
     return SortView(table, key=key, reverse=reverse, buffersize=buffersize,
-                    tempdir=tempdir, cache=cache)
+                    tempdir=tempdir, cache=cache, workers=workers,
+                    spill_format=spill_format, buffermem=buffermem,
+                    persist=persist)
 
 
 Table.sort = sort
 
 
-def _iterchunk(fn):
-    # reopen so iterators from file cache are independent
-    debug('iterchunk, opening %s' % fn)
-    with open(fn, 'rb') as f:
+class SpillFormat(object):
+    """Serializer for the temporary chunk files written when a table is too
+    big to be sorted in memory. Rows are written in frames of up to
+    `batchsize` rows, so a frame can be written and read back with a single
+    call to :func:`pickle.dumps` and :func:`pickle.loads`.
+
+    If `compress` is `True`, each frame is compressed with :mod:`zlib` (an
+    integer from 1 to 9 can be given instead to choose the compression
+    level).
+
+    If `columns` is `True`, the rows in each frame are transposed into
+    columns, and any column where all values are `int` or all values are
+    `float` is packed into an :class:`array.array` rather than pickled value
+    by value. Frames where rows have different lengths are written row by
+    row as usual, so this is safe to use with any table.
+
+    """
+
+    _header = struct.Struct('<BI')
+    _flag_compressed = 1
+    _flag_columns = 2
+
+    def __init__(self, batchsize=1000, compress=False, columns=False):
+        self.batchsize = batchsize
+        self.compress = compress
+        self.columns = columns
+
+    def __repr__(self):
+        return 'SpillFormat(batchsize=%r, compress=%r, columns=%r)' % (
+            self.batchsize, self.compress, self.columns
+        )
+
+    def dump(self, rows, f):
+        it = iter(rows)
+        batch = list(itertools.islice(it, self.batchsize))
+        while batch:
+            self._dumpframe(batch, f)
+            batch = list(itertools.islice(it, self.batchsize))
+
+    def load(self, f):
+        header = self._header
+        while True:
+            buf = f.read(header.size)
+            if not buf:
+                break
+            flags, n = header.unpack(buf)
+            payload = f.read(n)
+            if flags & self._flag_compressed:
+                payload = zlib.decompress(payload)
+            obj = pickle.loads(payload)
+            if flags & self._flag_columns:
+                rows = izip(*[_unpackcolumn(c) for c in obj])
+            else:
+                rows = obj
+            for row in rows:
+                yield row
+
+    def _dumpframe(self, batch, f):
+        flags = 0
+        obj = batch
+        if self.columns:
+            n = len(batch[0])
+            if n and all(len(row) == n for row in batch):
+                obj = [_packcolumn(c) for c in izip(*batch)]
+                flags |= self._flag_columns
+        payload = pickle.dumps(obj, protocol=-1)
+        if self.compress:
+            level = 6 if self.compress is True else self.compress
+            payload = zlib.compress(payload, level)
+            flags |= self._flag_compressed
+        f.write(self._header.pack(flags, len(payload)))
+        f.write(payload)
+
+
+class _PickleSpillFormat(object):
+    # one pickle per row, how chunk files were written in earlier versions
+
+    def __repr__(self):
+        return "'pickle'"
+
+    def dump(self, rows, f):
+        for row in rows:
+            pickle.dump(row, f, protocol=-1)
+
+    def load(self, f):
         try:
             while True:
                 yield pickle.load(f)
         except EOFError:
             pass
-    debug('end of iterchunk, closed %s' % fn)
 
 
-class _Keyed(namedtuple('Keyed', ['key', 'obj'])):
-    #  Override default behavior of namedtuple comparisons, only keys need to be compared for heapmerge
-    def __eq__(self, other):
-        return self.key == other.key
+try:
+    array('q')
+except ValueError:
+    # no 64-bit integer arrays on this platform, leave ints as objects
+    _packed_types = {float: 'd'}
+else:
+    _packed_types = {int: 'q', float: 'd'}
+
+
+def _packcolumn(values):
+    t = type(values[0])
+    typecode = _packed_types.get(t)
+    if typecode is not None and all(type(v) is t for v in values):
+        try:
+            a = array(typecode, values)
+        except OverflowError:
+            pass
+        else:
+            tobytes = getattr(a, 'tobytes', None) or a.tostring
+            return typecode, tobytes()
+    return None, values
 
-    def __lt__(self, other):
-        return self.key < other.key
 
-    def __le__(self, other):
-        return self.key <= other.key
+def _unpackcolumn(column):
+    typecode, values = column
+    if typecode is None:
+        return values
+    a = array(typecode)
+    frombytes = getattr(a, 'frombytes', None) or a.fromstring
+    frombytes(values)
+    return a.tolist()
 
-    def __ne__(self, other):
-        return self.key != other.key
 
-    def __gt__(self, other):
-        return self.key > other.key
+_spill_formats = {
+    'batch': SpillFormat(),
+    'zlib': SpillFormat(compress=True),
+    'columns': SpillFormat(columns=True),
+    'pickle': _PickleSpillFormat(),
+}
 
-    def __ge__(self, other):
-        return self.key >= other.key
 
+def _getspillformat(spill_format):
+    if spill_format is None:
+        spill_format = config.sort_spill_format
+    if isinstance(spill_format, string_types):
+        try:
+            return _spill_formats[spill_format]
+        except KeyError:
+            raise ArgumentError('unknown spill format: %r' % spill_format)
+    return spill_format
 
-def _heapqmergesorted(key=None, *iterables):
-    """Return a single iterator over the given iterables, sorted by the
-    given `key` function, assuming the input iterables are already sorted by
-    the same function. (I.e., the merge part of a general merge sort.) Uses
-    :func:`heapq.merge` for the underlying implementation."""
 
-    if key is None:
-        keyed_iterables = iterables
-        for element in heapq.merge(*keyed_iterables):
-            yield element
-    else:
-        keyed_iterables = [(_Keyed(key(obj), obj) for obj in iterable)
-                           for iterable in iterables]
-        for element in heapq.merge(*keyed_iterables):
-            yield element.obj
+_units = {'': 1, 'k': 1024, 'm': 1024**2, 'g': 1024**3, 't': 1024**4}
+
+
+def _parsebytes(value):
+    # parse a memory size given as a number of bytes or a string like '512MB'
+    if value is None or isinstance(value, (int, float)):
+        return value
+    m = re.match(r'^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*$', value, re.I)
+    if m is None:
+        raise ArgumentError('invalid memory size: %r' % value)
+    return int(float(m.group(1)) * _units[m.group(2).lower()])
+
+
+def _rowsize(row, getsizeof=sys.getsizeof):
+    # rough estimate of the memory taken up by a row and its values
+    return getsizeof(row) + sum(getsizeof(v) for v in row)
+
+
+def _writechunk(rows, tempdir, spillformat):
+    with NamedTemporaryFile(dir=tempdir, delete=False, mode='wb') as f:
+        # N.B., we **don't** want the file to be deleted on close, but we
+        # **do** want the file to be deleted when the sort view is garbage
+        # collected, or when the program exits, which is taken care of by
+        # wrapping the file name in a _NamedTempFileDeleteOnGC
+        debug('created temporary chunk file %s' % f.name)
+        spillformat.dump(rows, f)
+        f.flush()
+    return f.name
+
+
+def _sortchunk(rows, indices, reverse, tempdir, spillformat):
+    # N.B., this may be called in a worker process, so the key function is
+    # built here as it cannot be pickled
+    types = columntypes(rows, *indices)
+    getkey = sortable_itemgetter(types, *indices)
+    rows.sort(key=getkey, reverse=reverse)
+    return _writechunk(rows, tempdir, spillformat), types
+
+
+def _uniontypes(a, b):
+    if a is None:
+        return b
+    return [x | y for x, y in zip(a, b)]
+
+
+def _withnone(types):
+    # key values may turn out to be None in rows not seen yet
+    return [t | set([type(None)]) for t in types]
+
+
+def _splitters(keys, n):
+    # choose up to n - 1 distinct keys which split the sorted keys into n
+    # ranges of roughly equal size
+    keys = sorted(keys)
+    splitters = []
+    for i in range(1, n):
+        k = keys[len(keys) * i // n]
+        if not splitters or splitters[-1] < k:
+            splitters.append(k)
+    return splitters
 
 
-def _shortlistmergesorted(key=None, reverse=False, *iterables):
+# smallest sort buffer worth choosing key ranges from, and the number of
+# rows in the buffer per key range
+_partition_minrows = 1000
+_partition_sample = 100
+
+
+def _iterparts(parts, spillformat):
+    # N.B., holds a reference to the temporary files while reading them
+    for f, _ in parts:
+        for row in _iterchunk(f.name, spillformat):
+            yield row
+
+
+def _iterruns(chunkiters, runsizes, key, reverse):
+    # concatenate runs of sorted chunks, merging the chunks within each run
+    if runsizes is None:
+        runsizes = [len(chunkiters)]
+    i = 0
+    for n in runsizes:
+        if n == 1:
+            rows = chunkiters[i]
+        else:
+            rows = _mergesorted(key, reverse, *chunkiters[i:i + n])
+        for row in rows:
+            yield row
+        i += n
+
+
+def _iterchunk(fn, spillformat):
+    # reopen so iterators from file cache are independent
+    debug('iterchunk, opening %s' % fn)
+    with open(fn, 'rb') as f:
+        for row in spillformat.load(f):
+            yield row
+    debug('end of iterchunk, closed %s' % fn)
+
+
+def _spillbatchsize(limit):
+    # number of rows to buffer between writes to temporary files, where
+    # limit is usually petl.config.sort_buffersize, which may be None to
+    # mean sorting in memory; that doesn't say how to batch rows which are
+    # being written out anyway, so use a fixed number instead
+    if limit is None:
+        return _spill_batchsize
+    return limit
+
+
+_spill_batchsize = 10000
+
+
+def _hashpartition(rows, getkey, n, salt, limit, tempdir, spillformat):
+    # write rows to n temporary files by a hash of their keys, buffering up
+    # to limit rows in memory, returns the files
+    limit = _spillbatchsize(limit)
+    parts = []
+    files = []
+    try:
+        for _ in range(n):
+            f = NamedTemporaryFile(dir=tempdir, delete=False, mode='wb')
+            files.append(f)
+            parts.append(_NamedTempFileDeleteOnGC(f.name))
+        buckets = [[] for _ in files]
+        nbuffered = 0
+        for row in rows:
+            buckets[hash((salt, getkey(row))) % n].append(row)
+            nbuffered += 1
+            if nbuffered >= limit:
+                for f, bucket in zip(files, buckets):
+                    spillformat.dump(bucket, f)
+                    del bucket[:]
+                nbuffered = 0
+        for f, bucket in zip(files, buckets):
+            spillformat.dump(bucket, f)
+    finally:
+        for f in files:
+            f.close()
+    return parts
+
+
+def _mergesorted(key=None, reverse=False, *iterables):
     """Return a single iterator over the given iterables, sorted by the
     given `key` function, assuming the input iterables are already sorted by
-    the same function. (I.e., the merge part of a general merge sort.) Uses
-    :func:`min` (or :func:`max` if ``reverse=True``) for the underlying
-    implementation."""
+    the same function. (I.e., the merge part of a general merge sort.)
 
-    if reverse:
-        op = max
-    else:
-        op = min
-    if key is not None:
-        opkwargs = {'key': key}
-    else:
-        opkwargs = dict()
-    # populate initial shortlist
-    # (remember some iterables might be empty)
-    iterators = list()
-    shortlist = list()
-    for iterable in iterables:
-        it = iter(iterable)
-        try:
-            first = next(it)
-            iterators.append(it)
-            shortlist.append(first)
-        except StopIteration:
-            pass
-    # do the mergesort
-    while iterators:
-        nxt = op(shortlist, **opkwargs)
-        yield nxt
-        nextidx = shortlist.index(nxt)
-        try:
-            shortlist[nextidx] = next(iterators[nextidx])
-        except StopIteration:
-            del shortlist[nextidx]
-            del iterators[nextidx]
+    Uses a tournament (loser) tree, so keys are computed once per item and
+    each item output costs no more than one comparison per level of the tree,
+    i.e., about log2(k) comparisons for k iterables. Items with equal keys
+    are output in the order of the iterables they come from, so the merge is
+    stable in either direction. Only ``<`` is used to compare keys."""
 
+    iterators = [iter(iterable) for iterable in iterables]
+    k = len(iterators)
+    keys = [None] * k
+    items = [None] * k
+    live = [True] * k
 
-def _mergesorted(key=None, reverse=False, *iterables):
-    # N.B., I've used heapq for normal merge sort and shortlist merge sort for
-    # reverse merge sort because I've assumed that heapq.merge is faster and
-    # so is preferable but it doesn't support reverse sorting so the shortlist
-    # merge sort has to be used for reverse sorting. Some casual profiling
-    # suggests there isn't much between the two in terms of speed, but might be
-    # worth profiling more carefully
+    def advance(i):
+        try:
+            item = next(iterators[i])
+        except StopIteration:
+            live[i] = False
+            items[i] = keys[i] = None
+        else:
+            items[i] = item
+            keys[i] = item if key is None else key(item)
 
+    # does the current item from iterable i go before the current item from
+    # iterable j? N.B., ties go to the lower index, which is worked out with
+    # a single comparison depending on which index is lower
     if reverse:
-        return _shortlistmergesorted(key, True, *iterables)
+        def beats(i, j):
+            if not live[j]:
+                return True
+            if not live[i]:
+                return False
+            if i < j:
+                return not keys[i] < keys[j]
+            return keys[j] < keys[i]
     else:
-        return _heapqmergesorted(key, *iterables)
+        def beats(i, j):
+            if not live[j]:
+                return True
+            if not live[i]:
+                return False
+            if i < j:
+                return not keys[j] < keys[i]
+            return keys[i] < keys[j]
+
+    for i in range(k):
+        advance(i)
+
+    # build the tree, internal nodes 1 to k-1 hold the loser of the match
+    # played at that node, and nodes k to 2k-1 are the leaves, one for each
+    # iterable
+    losers = [0] * k
+    winners = list(range(k)) * 2
+    for node in range(k - 1, 0, -1):
+        a, b = winners[2 * node], winners[2 * node + 1]
+        if beats(a, b):
+            winners[node], losers[node] = a, b
+        else:
+            winners[node], losers[node] = b, a
+    w = winners[1] if k > 1 else 0
+
+    while k and live[w]:
+        yield items[w]
+        advance(w)
+        # replay the matches on the path from the winner's leaf to the root
+        node = (w + k) >> 1
+        while node:
+            other = losers[node]
+            if beats(other, w):
+                losers[node], w = w, other
+            node >>= 1
 
 
 class SortView(Table):
     def __init__(self, source, key=None, reverse=False, buffersize=None,
-                 tempdir=None, cache=True):
+                 tempdir=None, cache=True, workers=None, spill_format=None,
+                 buffermem=None, persist=None):
         self.source = source
         self.key = key
         self.reverse = reverse
-        if buffersize is None:
+        self.sortorder = SortOrder(sortkeytuple(key), reverse)
+        if persist is None:
+            persist = config.sort_persist
+        self.persist = persist
+        if buffermem is None:
+            self.buffermem = _parsebytes(config.sort_buffermem)
+        else:
+            self.buffermem = _parsebytes(buffermem)
+        if buffersize is None and self.buffermem is None:
             self.buffersize = config.sort_buffersize
         else:
             self.buffersize = buffersize
         self.tempdir = tempdir
         self.cache = cache
+        if workers is None:
+            self.workers = config.sort_workers
+        else:
+            self.workers = workers
+        self.spillformat = _getspillformat(spill_format)
         self._hdrcache = None
         self._memcache = None
         self._filecache = None
+        self._runsizes = None
         self._getkey = None
 
+    def resolveheader(self):
+        return header(self.source)
+
     def clearcache(self):
         debug('clear cache')
         self._hdrcache = None
         self._memcache = None
         self._filecache = None
+        self._runsizes = None
         self._getkey = None
 
     def __iter__(self):
@@ -266,8 +636,9 @@ class SortView(Table):
         filenames = list(map(operator.attrgetter('name'), filecache))
         debug('iterate from file cache: %r', filenames)
         yield tuple(self._hdrcache)
-        chunkiters = [_iterchunk(fn) for fn in filenames]
-        rows = _mergesorted(self._getkey, self.reverse, *chunkiters)
+        chunkiters = [_iterchunk(fn, self.spillformat) for fn in filenames]
+        rows = _iterruns(chunkiters, self._runsizes, self._getkey,
+                         self.reverse)
         try:
             for row in rows:
                 yield tuple(row)
@@ -284,6 +655,22 @@ class SortView(Table):
     def _iternocache(self, source, key, reverse):
         debug('iterate without cache')
         self.clearcache()
+
+        # look for the sorted chunks in the persistent cache
+        store = digest = None
+        if self.persist is not None:
+            fingerprint = _fingerprint(source)
+            if fingerprint is None:
+                debug('source cannot be fingerprinted, not persisting')
+            else:
+                store = _PersistentSortCache(self.persist)
+                digest = store.digest(fingerprint, key, reverse)
+                rows = store.iterentry(digest)
+                if rows is not None:
+                    for row in rows:
+                        yield row
+                    return
+
         it = iter(source)
 
         hdr = next(it)
@@ -293,21 +680,26 @@ class SortView(Table):
             # convert field selection into field indices
             indices = asindices(hdr, key)
         else:
-            indices = range(len(hdr))
-        # now use field indices to construct a _getkey function
-        # TODO check if this raises an exception on short rows
-        getkey = comparable_itemgetter(*indices)
-
-        # TODO support native comparison
+            indices = list(range(len(hdr)))
 
         # initialise the first chunk
-        rows = list(itertools.islice(it, 0, self.buffersize))
-        rows.sort(key=getkey, reverse=reverse)
+        rows, full = self._readchunk(it)
 
         # have we exhausted the source iterator?
-        if self.buffersize is None or len(rows) < self.buffersize:
+        if not full:
             # yes, table fits within sort buffer
 
+            # now use field indices to construct a _getkey function, which
+            # compares values natively if the types of the key values allow
+            # TODO check if this raises an exception on short rows
+            types = columntypes(rows, *indices)
+            getkey = sortable_itemgetter(types, *indices)
+            rows.sort(key=getkey, reverse=reverse)
+
+            if store is not None:
+                store.save(digest, hdr, indices, types, self.spillformat,
+                           reverse, rows=rows)
+
             if self.cache:
                 debug('caching mem')
                 self._hdrcache = hdr
@@ -321,28 +713,42 @@ class SortView(Table):
         else:
             # no, table is too big, need to sort in chunks
 
-            chunkfiles = []
-
-            while rows:
-
-                # dump the chunk
-                with NamedTemporaryFile(dir=self.tempdir, delete=False,
-                                        mode='wb') as f:
-                    # N.B., we **don't** want the file to be deleted on close,
-                    # but we **do** want the file to be deleted when self
-                    # is garbage collected, or when the program exits. When
-                    # all references to the wrapper are gone, the file should
-                    # get deleted.
-                    wrapper = _NamedTempFileDeleteOnGC(f.name)
-                    debug('created temporary chunk file %s' % f.name)
-                    for row in rows:
-                        pickle.dump(row, f, protocol=-1)
-                    f.flush()
-                    chunkfiles.append(wrapper)
-
-                # grab the next chunk
-                rows = list(itertools.islice(it, 0, self.buffersize))
-                rows.sort(key=getkey, reverse=reverse)
+            # if key values can be compared natively, distribute the rows
+            # into files by ranges of key values, which can then be sorted
+            # one by one in memory, rather than merging sorted chunks
+            types = columntypes(rows, *indices)
+            if (self.workers is None or self.workers <= 1) \
+                    and len(rows) >= _partition_minrows \
+                    and all(isnative(t) for t in types):
+                limit = len(rows)
+                parts, types, it = self._partition(rows, it, indices, types)
+                rows = None
+                if parts is not None:
+                    for row in self._iterpartitions(hdr, parts, indices,
+                                                    types, limit, reverse,
+                                                    store, digest):
+                        yield row
+                    return
+                # key values which cannot be compared natively turned up,
+                # sort all rows read so far in chunks after all
+                rows, _ = self._readchunk(it)
+
+            if self.workers is not None and self.workers > 1:
+                chunkfiles, types = self._spillparallel(rows, it, indices,
+                                                        reverse)
+            else:
+                chunkfiles, types = self._spill(rows, it, indices, reverse)
+
+            # each chunk was sorted with a key function suited to the types
+            # of key values in that chunk, the merge needs a key function
+            # suited to the types found in all chunks
+            getkey = sortable_itemgetter(types, *indices)
+
+            chunkfiles = self._mergechunks(chunkfiles, getkey, reverse)
+
+            if store is not None:
+                store.save(digest, hdr, indices, types, self.spillformat,
+                           reverse, filenames=[f.name for f in chunkfiles])
 
             if self.cache:
                 debug('caching files')
@@ -350,10 +756,231 @@ class SortView(Table):
                 self._filecache = chunkfiles
                 self._getkey = getkey
 
-            chunkiters = [_iterchunk(f.name) for f in chunkfiles]
+            chunkiters = [_iterchunk(f.name, self.spillformat)
+                          for f in chunkfiles]
             for row in _mergesorted(getkey, reverse, *chunkiters):
                 yield tuple(row)
 
+    def _partition(self, rows, it, indices, types):
+        # distribute the rows into files by ranges of key values chosen from
+        # the first chunk, returns the files with their numbers of rows and
+        # the types of key values found, or None and an iterator over all
+        # rows if key values turn up which cannot be compared natively
+        getkey = sortable_itemgetter(_withnone(types), *indices)
+        nparts = len(rows) // _partition_sample
+        fanin = config.sort_merge_fanin
+        if fanin is not None:
+            nparts = min(nparts, max(2, fanin))
+        splitters = _splitters(map(getkey, rows), nparts)
+        debug('distributing rows into %s key ranges', len(splitters) + 1)
+        parts = []
+        files = []
+        try:
+            for _ in range(len(splitters) + 1):
+                f = NamedTemporaryFile(dir=self.tempdir, delete=False,
+                                       mode='wb')
+                files.append(f)
+                parts.append([_NamedTempFileDeleteOnGC(f.name), 0])
+            chunktypes = types
+            while rows:
+                types = _uniontypes(types, chunktypes)
+                if not all(isnative(t) for t in types):
+                    break
+                buckets = [[] for _ in files]
+                for row in rows:
+                    buckets[bisect.bisect_right(splitters,
+                                                getkey(row))].append(row)
+                for part, f, bucket in izip(parts, files, buckets):
+                    if bucket:
+                        self.spillformat.dump(bucket, f)
+                        part[1] += len(bucket)
+                rows, _ = self._readchunk(it)
+                chunktypes = columntypes(rows, *indices)
+        finally:
+            for f in files:
+                f.close()
+        if rows:
+            return None, None, itertools.chain(
+                _iterparts(parts, self.spillformat), rows, it
+            )
+        return parts, types, None
+
+    def _iterpartitions(self, hdr, parts, indices, types, limit, reverse,
+                        store, digest):
+        # sort the files of rows by key range one by one, keeping the sorted
+        # rows in new chunk files if they need to be cached
+        getkey = sortable_itemgetter(_withnone(types), *indices)
+        keep = self.cache or store is not None
+        chunkfiles = []
+        runsizes = []
+        if reverse:
+            parts = parts[::-1]
+        for f, n in parts:
+            if n == 0:
+                continue
+            if n <= limit:
+                rows = list(_iterchunk(f.name, self.spillformat))
+                rows.sort(key=getkey, reverse=reverse)
+                if keep:
+                    chunkfiles.append(_NamedTempFileDeleteOnGC(
+                        _writechunk(rows, self.tempdir, self.spillformat)
+                    ))
+                    runsizes.append(1)
+            else:
+                # too many rows in this key range to sort in memory
+                debug('sorting %s rows in key range in chunks', n)
+                it = _iterchunk(f.name, self.spillformat)
+                rows, _ = self._readchunk(it)
+                runfiles, _ = self._spill(rows, it, indices, reverse)
+                runfiles = self._mergechunks(runfiles, getkey, reverse)
+                if keep:
+                    chunkfiles.extend(runfiles)
+                    runsizes.append(len(runfiles))
+                rows = _mergesorted(getkey, reverse,
+                                    *[_iterchunk(r.name, self.spillformat)
+                                      for r in runfiles])
+            for row in rows:
+                yield tuple(row)
+
+        if store is not None:
+            store.save(digest, hdr, indices, types, self.spillformat,
+                       reverse, filenames=[c.name for c in chunkfiles],
+                       runsizes=runsizes)
+
+        if self.cache:
+            debug('caching files')
+            self._hdrcache = hdr
+            self._filecache = chunkfiles
+            self._runsizes = runsizes
+            self._getkey = getkey
+
+    def _readchunk(self, it):
+        # read rows into the sort buffer, returning the rows and a flag
+        # which is true if the buffer filled up before the source ran out
+        buffersize = self.buffersize
+        if self.buffermem is None:
+            rows = list(itertools.islice(it, 0, buffersize))
+            return rows, buffersize is not None and len(rows) >= buffersize
+
+        # memory budget, estimate the size of every row until the estimate
+        # settles down a bit, then only every n-th row
+        buffermem = self.buffermem
+        rows = []
+        nsampled = sampled = 0
+        for row in it:
+            rows.append(row)
+            n = len(rows)
+            if n <= 100 or n % 100 == 0:
+                nsampled += 1
+                sampled += _rowsize(row)
+                if sampled * n // nsampled >= buffermem:
+                    return rows, True
+            if buffersize is not None and n >= buffersize:
+                return rows, True
+        return rows, False
+
+    def _mergechunks(self, chunkfiles, getkey, reverse):
+        # merge groups of chunk files into bigger chunk files until there are
+        # few enough to merge in one go without running out of file handles
+        fanin = config.sort_merge_fanin
+        if fanin is not None:
+            fanin = max(2, fanin)
+        while fanin is not None and len(chunkfiles) > fanin:
+            debug('merging %s chunk files in groups of %s',
+                  len(chunkfiles), fanin)
+            merged = []
+            for i in range(0, len(chunkfiles), fanin):
+                group = chunkfiles[i:i + fanin]
+                if len(group) == 1:
+                    merged.append(group[0])
+                    continue
+                chunkiters = [_iterchunk(f.name, self.spillformat)
+                              for f in group]
+                rows = _mergesorted(getkey, reverse, *chunkiters)
+                merged.append(_NamedTempFileDeleteOnGC(
+                    _writechunk(rows, self.tempdir, self.spillformat)
+                ))
+            # N.B., the smaller chunk files get deleted once their wrappers
+            # are garbage collected
+            chunkfiles = merged
+        return chunkfiles
+
+    def _spill(self, rows, it, indices, reverse):
+        chunkfiles = []
+        types = None
+
+        while rows:
+
+            # sort and dump the chunk
+            fn, chunktypes = _sortchunk(rows, indices, reverse, self.tempdir,
+                                        self.spillformat)
+            chunkfiles.append(_NamedTempFileDeleteOnGC(fn))
+            types = _uniontypes(types, chunktypes)
+
+            # grab the next chunk
+            rows, _ = self._readchunk(it)
+
+        return chunkfiles, types
+
+    def _spillparallel(self, rows, it, indices, reverse):
+        debug('sorting chunks with %s worker processes', self.workers)
+        chunkfiles = []
+        # N.B., chunk files must be kept in the order the chunks were read
+        # from the source, so that the merge breaks ties in the same way as
+        # when sorting serially
+        pending = deque()
+        types = None
+        pool = multiprocessing.Pool(processes=self.workers)
+        try:
+
+            while rows:
+
+                # don't let more chunks pile up in memory than there are
+                # workers to sort them
+                if len(pending) >= self.workers:
+                    fn, chunktypes = pending.popleft().get()
+                    chunkfiles.append(_NamedTempFileDeleteOnGC(fn))
+                    types = _uniontypes(types, chunktypes)
+
+                # hand the chunk over to a worker
+                pending.append(pool.apply_async(
+                    _sortchunk,
+                    (rows, indices, reverse, self.tempdir, self.spillformat)
+                ))
+
+                # grab the next chunk while the workers are busy
+                rows, _ = self._readchunk(it)
+
+            while pending:
+                fn, chunktypes = pending.popleft().get()
+                chunkfiles.append(_NamedTempFileDeleteOnGC(fn))
+                types = _uniontypes(types, chunktypes)
+
+            pool.close()
+
+        except BaseException:
+            # let the chunks already handed over finish, and delete their
+            # files, which nothing else knows about
+            try:
+                pool.close()
+                for result in pending:
+                    try:
+                        fn, _ = result.get()
+                    except Exception:
+                        continue
+                    try:
+                        os.remove(fn)
+                    except OSError:
+                        pass
+            finally:
+                pool.terminate()
+            raise
+
+        finally:
+            pool.join()
+
+        return chunkfiles, types
+
 
 class _NamedTempFileDeleteOnGC(object):
 
@@ -381,6 +1008,175 @@ class _NamedTempFileDeleteOnGC(object):
         return self.name
 
 
+def _fingerprint(table):
+    # identify a table read directly from a local file, by the file's path,
+    # size and modification time, and the options the file is read with
+    source = getattr(table, 'source', None)
+    filename = getattr(source, 'filename', None)
+    if not isinstance(filename, string_types):
+        return None
+    try:
+        st = os.stat(filename)
+    except (OSError, IOError):
+        return None
+    options = [(k, v) for k, v in sorted(vars(table).items())
+               if k != 'source']
+    sourceoptions = [(k, v) for k, v in sorted(vars(source).items())
+                     if k != 'filename']
+    fingerprint = repr((type(table).__module__, type(table).__name__, options,
+                        type(source).__name__, sourceoptions,
+                        os.path.abspath(filename), st.st_size, st.st_mtime))
+    if ' at 0x' in fingerprint:
+        # options include functions or other objects without a stable repr
+        return None
+    return fingerprint
+
+
+class _PersistentSortCache(object):
+    # A directory of sorted chunk files which outlives the process. Each
+    # entry is a sub-directory named after a digest of the source fingerprint
+    # and the sort key, holding the chunk files and a manifest. Entries are
+    # written to a temporary directory and then renamed into place, so other
+    # processes only ever see complete entries, and whoever renames first
+    # wins if two processes sort the same source at the same time. The
+    # manifest's modification time records when the entry was last used.
+
+    manifest = 'manifest'
+
+    def __init__(self, path, maxsize=None):
+        self.path = path
+        if maxsize is None:
+            maxsize = config.sort_persist_maxsize
+        self.maxsize = _parsebytes(maxsize)
+
+    def digest(self, fingerprint, key, reverse):
+        s = repr((fingerprint, key, bool(reverse)))
+        return hashlib.sha1(s.encode('utf-8')).hexdigest()
+
+    def iterentry(self, digest):
+        # open everything up front, so an entry evicted by another process
+        # after the manifest has been read just counts as a miss
+        entrydir = os.path.join(self.path, digest)
+        files = []
+        try:
+            with open(os.path.join(entrydir, self.manifest), 'rb') as f:
+                manifest = pickle.load(f)
+            for name in manifest['chunks']:
+                files.append(open(os.path.join(entrydir, name), 'rb'))
+            os.utime(os.path.join(entrydir, self.manifest), None)
+        except Exception as e:
+            for f in files:
+                f.close()
+            if not isinstance(e, (IOError, OSError)):
+                warning('ignoring unreadable sort cache entry %s: %s',
+                        entrydir, e)
+            return None
+        debug('found sorted chunks in persistent cache %s', entrydir)
+        return self._iterfiles(manifest, files)
+
+    def _iterfiles(self, manifest, files):
+        try:
+            yield tuple(manifest['header'])
+            types = manifest['types']
+            indices = manifest['indices']
+            if types is None:
+                getkey = comparable_itemgetter(*indices)
+            else:
+                getkey = sortable_itemgetter(types, *indices)
+            spillformat = manifest['spillformat']
+            chunkiters = [spillformat.load(f) for f in files]
+            for row in _iterruns(chunkiters, manifest.get('runsizes'), getkey,
+                                 manifest['reverse']):
+                yield tuple(row)
+        finally:
+            for f in files:
+                f.close()
+
+    def save(self, digest, hdr, indices, types, spillformat, reverse=False,
+             rows=None, filenames=None, runsizes=None):
+        entrydir = os.path.join(self.path, digest)
+        if os.path.exists(entrydir):
+            return
+        try:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+        except OSError:
+            # may have been created by another process meanwhile
+            if not os.path.isdir(self.path):
+                raise
+        tmpdir = tempfile.mkdtemp(prefix='.tmp', dir=self.path)
+        try:
+            chunks = []
+            if rows is not None:
+                chunks.append('0')
+                with open(os.path.join(tmpdir, '0'), 'wb') as f:
+                    spillformat.dump(rows, f)
+            for i, fn in enumerate(filenames or []):
+                name = text_type(i)
+                chunks.append(name)
+                try:
+                    os.link(fn, os.path.join(tmpdir, name))
+                except (OSError, AttributeError):
+                    # different file system, or no hard links
+                    shutil.copyfile(fn, os.path.join(tmpdir, name))
+            try:
+                pickle.dumps(types, protocol=-1)
+            except Exception:
+                types = None
+            manifest = dict(header=tuple(hdr), indices=list(indices),
+                            types=types, spillformat=spillformat,
+                            reverse=reverse, chunks=chunks,
+                            runsizes=runsizes)
+            with open(os.path.join(tmpdir, self.manifest), 'wb') as f:
+                pickle.dump(manifest, f, protocol=-1)
+            os.rename(tmpdir, entrydir)
+            debug('saved sorted chunks to persistent cache %s', entrydir)
+        except OSError:
+            # most likely another process saved the same entry first
+            debug('could not save to persistent cache %s', entrydir)
+        finally:
+            if os.path.exists(tmpdir):
+                shutil.rmtree(tmpdir, ignore_errors=True)
+        self.evict(keep=digest)
+
+    def evict(self, keep=None):
+        # delete least recently used entries until the cache fits in maxsize
+        if self.maxsize is None:
+            return
+        entries = []
+        total = 0
+        for name in os.listdir(self.path):
+            if name.startswith('.'):
+                # entry being written or deleted
+                continue
+            entrydir = os.path.join(self.path, name)
+            try:
+                used = os.stat(os.path.join(entrydir, self.manifest)).st_mtime
+                size = sum(os.path.getsize(os.path.join(entrydir, fn))
+                           for fn in os.listdir(entrydir))
+            except (OSError, IOError):
+                # not an entry, or deleted meanwhile
+                continue
+            entries.append((used, name, size))
+            total += size
+        entries.sort()
+        for used, name, size in entries:
+            if total <= self.maxsize:
+                break
+            if name == keep:
+                continue
+            # rename first so nobody picks up a half-deleted entry
+            entrydir = os.path.join(self.path, name)
+            trash = os.path.join(self.path, '.del%s.%s' % (name, os.getpid()))
+            try:
+                os.rename(entrydir, trash)
+            except OSError:
+                continue
+            debug('evicting %s from persistent sort cache', entrydir)
+            shutil.rmtree(trash, ignore_errors=True)
+            total -= size
+
+
 def mergesort(*tables, **kwargs):
     """
     Combine multiple input tables into one sorted output table. E.g.::
@@ -446,6 +1242,12 @@ def mergesort(*tables, **kwargs):
     buffersize : int, optional
         Limit the number of rows in memory per input table when inputs are not
         presorted
+    buffermem : int or string, optional
+        Limit the memory used by the sort buffer per input table when inputs
+        are not presorted, e.g., ``'512MB'``
+    spill_format : string or SpillFormat, optional
+        Format of the temporary chunk files written when inputs are not
+        presorted, see :func:`petl.transform.sorts.sort`
 
     """
 
@@ -458,23 +1260,30 @@ Table.mergesort = mergesort
 class MergeSortView(Table):
     def __init__(self, tables, key=None, reverse=False, presorted=False,
                  missing=None, header=None, buffersize=None, tempdir=None,
-                 cache=True):
+                 cache=True, spill_format=None, buffermem=None):
         self.key = key
         if presorted:
             self.tables = tables
         else:
             self.tables = [sort(t, key=key, reverse=reverse,
                                 buffersize=buffersize, tempdir=tempdir,
-                                cache=cache)
+                                cache=cache, spill_format=spill_format,
+                                buffermem=buffermem)
                            for t in tables]
         self.missing = missing
         self.header = header
         self.reverse = reverse
+        self.sortorder = SortOrder(sortkeytuple(key), reverse)
 
     def __iter__(self):
         return itermergesort(self.tables, self.key, self.header, self.missing,
                              self.reverse)
 
+    def resolveheader(self):
+        return next(itermergesort([[header(t)] for t in self.tables],
+                                  self.key, self.header, self.missing,
+                                  self.reverse))
+
 
 def itermergesort(sources, key, header, missing, reverse):
     # first need to standardise headers of all input tables
@@ -528,10 +1337,87 @@ def itermergesort(sources, key, header, missing, reverse):
         getkey = comparable_itemgetter(*indices)
 
     # OK, do the merge sort
-    for row in _shortlistmergesorted(getkey, reverse, *sits):
+    for row in _mergesorted(getkey, reverse, *sits):
         yield row
 
 
+def topk(table, key=None, n=5, reverse=False):
+    """
+    Select the first `n` data rows of the table when sorted by the given key,
+    i.e., the same rows as ``head(sort(table, key, reverse=reverse), n)``, but
+    in a single pass over the table and holding no more than `n` rows in
+    memory at a time. E.g.::
+
+        >>> import petl as etl
+        >>> table1 = [['foo', 'bar'],
+        ...           ['C', 2],
+        ...           ['A', 9],
+        ...           ['A', 6],
+        ...           ['F', 1],
+        ...           ['D', 10]]
+        >>> table2 = etl.topk(table1, 'bar', 3, reverse=True)
+        >>> table2
+        +-----+-----+
+        | foo | bar |
+        +=====+=====+
+        | 'D' |  10 |
+        +-----+-----+
+        | 'A' |   9 |
+        +-----+-----+
+        | 'A' |   6 |
+        +-----+-----+
+
+    Rows with equal keys are returned in the order they appear in the input
+    table, as for :func:`petl.transform.sorts.sort`. Unlike
+    :func:`petl.transform.sorts.sort`, nothing is cached, so each iteration
+    over the result will make another pass over the input table.
+
+    """
+
+    return TopKView(table, key=key, n=n, reverse=reverse)
+
+
+Table.topk = topk
+
+
+class TopKView(Table):
+
+    def __init__(self, source, key=None, n=5, reverse=False):
+        self.source = source
+        self.key = key
+        self.n = n
+        self.reverse = reverse
+        self.sortorder = SortOrder(sortkeytuple(key), reverse)
+
+    def __iter__(self):
+        return itertopk(self.source, self.key, self.n, self.reverse)
+
+    def resolveheader(self):
+        return header(self.source)
+
+
+def itertopk(source, key, n, reverse):
+    it = iter(source)
+    hdr = next(it)
+    yield tuple(hdr)
+
+    if key is not None:
+        indices = asindices(hdr, key)
+    else:
+        indices = range(len(hdr))
+    getkey = comparable_itemgetter(*indices)
+
+    # N.B., heapq.nsmallest and heapq.nlargest keep a heap of no more than n
+    # rows and are equivalent to sorted(...)[:n], including the order of
+    # rows with equal keys
+    if reverse:
+        rows = heapq.nlargest(n, it, key=getkey)
+    else:
+        rows = heapq.nsmallest(n, it, key=getkey)
+    for row in rows:
+        yield tuple(row)
+
+
 def issorted(table, key=None, reverse=False, strict=False):
     """
     Return True if the table is ordered (i.e., sorted) by the given key. E.g.::
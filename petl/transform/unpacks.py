@@ -6,7 +6,7 @@ from petl.compat import next, text_type
 
 
 from petl.errors import ArgumentError
-from petl.util.base import Table
+from petl.util.base import Table, derivedheader
 
 
 def unpack(table, field, newfields=None, include_original=False, missing=None):
@@ -60,6 +60,11 @@ class UnpackView(Table):
         return iterunpack(self.source, self.field, self.newfields,
                           self.include_original, self.missing)
 
+    def resolveheader(self):
+        return derivedheader(iterunpack, self.source, self.field,
+                             self.newfields, self.include_original,
+                             self.missing)
+
 
 def iterunpack(source, field, newfields, include_original, missing):
     it = iter(source)
@@ -159,6 +164,14 @@ class UnpackDictView(Table):
                               self.includeoriginal, self.samplesize,
                               self.missing)
 
+    def resolveheader(self):
+        if not self.keys:
+            # keys are found by sampling the data
+            return None
+        return derivedheader(iterunpackdict, self.table, self.field,
+                             self.keys, self.includeoriginal, self.samplesize,
+                             self.missing)
+
 
 def iterunpackdict(table, field, keys, includeoriginal, samplesize, missing):
 
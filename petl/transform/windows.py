@@ -0,0 +1,639 @@
+from __future__ import absolute_import, print_function, division
+
+
+import copy
+import itertools
+import operator
+from collections import deque
+
+
+from petl.compat import next, text_type, izip
+from petl.errors import ArgumentError
+from petl.util.base import Table, asindices, Record
+from petl.transform.sorts import sort
+from petl.transform.accumulators import Sum, _asaccumulator
+
+
+def rolling(table, field, value, size, aggregation=sum, key=None, order=None,
+            reverse=False, presorted=False, buffersize=None, tempdir=None,
+            cache=True):
+    """
+    Add a field with an aggregation of the values of the current row and the
+    rows before it, over a moving window (frame) of `size` rows. E.g.::
+
+        >>> import petl as etl
+        >>> table1 = [['foo', 'day', 'bar'],
+        ...           ['a', 1, 3],
+        ...           ['b', 1, 2],
+        ...           ['a', 2, 7],
+        ...           ['b', 2, 1],
+        ...           ['a', 3, 4],
+        ...           ['b', 3, 9],
+        ...           ['a', 4, 2]]
+        >>> table2 = etl.rolling(table1, 'total', 'bar', 2, key='foo',
+        ...                      order='day')
+        >>> table2.lookall()
+        +-----+-----+-----+-------+
+        | foo | day | bar | total |
+        +=====+=====+=====+=======+
+        | 'a' |   1 |   3 |     3 |
+        +-----+-----+-----+-------+
+        | 'a' |   2 |   7 |    10 |
+        +-----+-----+-----+-------+
+        | 'a' |   3 |   4 |    11 |
+        +-----+-----+-----+-------+
+        | 'a' |   4 |   2 |     6 |
+        +-----+-----+-----+-------+
+        | 'b' |   1 |   2 |     2 |
+        +-----+-----+-----+-------+
+        | 'b' |   2 |   1 |     3 |
+        +-----+-----+-----+-------+
+        | 'b' |   3 |   9 |    10 |
+        +-----+-----+-----+-------+
+
+        >>> from petl.transform.accumulators import Mean
+        >>> table3 = etl.rolling(table1, 'mean', 'bar', 3, Mean(), order='day',
+        ...                      key='foo')
+        >>> table3.lookall()
+        +-----+-----+-----+-------------------+
+        | foo | day | bar | mean              |
+        +=====+=====+=====+===================+
+        | 'a' |   1 |   3 |               3.0 |
+        +-----+-----+-----+-------------------+
+        | 'a' |   2 |   7 |               5.0 |
+        +-----+-----+-----+-------------------+
+        | 'a' |   3 |   4 | 4.666666666666667 |
+        +-----+-----+-----+-------------------+
+        | 'a' |   4 |   2 | 4.333333333333333 |
+        +-----+-----+-----+-------------------+
+        | 'b' |   1 |   2 |               2.0 |
+        +-----+-----+-----+-------------------+
+        | 'b' |   2 |   1 |               1.5 |
+        +-----+-----+-----+-------------------+
+        | 'b' |   3 |   9 |               4.0 |
+        +-----+-----+-----+-------------------+
+
+    The `aggregation` function is called with a list of the values in the
+    frame, which holds fewer than `size` values for the first rows of each
+    partition. The values in the frame are kept in a bounded
+    :class:`collections.deque`, so memory use depends on `size` and not on
+    the number of rows in a partition.
+
+    The `value` may be a field name, a list or tuple of field names, or a
+    function of the row (as a :class:`petl.util.base.Record`). All the window
+    functions in this module take the following arguments:
+
+    * `key` - field or fields to partition the rows by; the window function
+      starts over with each distinct key, and if `key` is `None` the whole
+      table is one partition
+    * `order` - field or fields to order the rows by within each partition;
+      if `None` rows are kept in their original order within each partition
+    * `reverse` - if `True`, order rows by descending `key` and `order`
+
+    Unless `presorted` is `True`, the table is sorted by `key` then `order`,
+    see :func:`petl.transform.sorts.sort` for the `buffersize`, `tempdir` and
+    `cache` arguments. If `presorted` is `True`, or both `key` and `order` are
+    `None`, the rows are taken as they come, and a new partition starts each
+    time the key changes.
+
+    """
+
+    if size < 1:
+        raise ArgumentError('size must be at least 1, found %r' % size)
+    return WindowView(table, field, _Rolling(value, size, aggregation), key=key,
+                      order=order, reverse=reverse, presorted=presorted,
+                      buffersize=buffersize, tempdir=tempdir, cache=cache)
+
+
+Table.rolling = rolling
+
+
+def cumulative(table, field, value, aggregation=sum, key=None, order=None,
+               reverse=False, presorted=False, buffersize=None, tempdir=None,
+               cache=True):
+    """
+    Add a field with a running aggregation of the values of the current row
+    and all rows before it in the same partition. E.g.::
+
+        >>> import petl as etl
+        >>> table1 = [['foo', 'day', 'bar'],
+        ...           ['a', 1, 3],
+        ...           ['b', 1, 2],
+        ...           ['a', 2, 7],
+        ...           ['b', 2, 1],
+        ...           ['a', 3, 4]]
+        >>> table2 = etl.cumulative(table1, 'highest', 'bar', max, key='foo',
+        ...                         order='day')
+        >>> table2.lookall()
+        +-----+-----+-----+---------+
+        | foo | day | bar | highest |
+        +=====+=====+=====+=========+
+        | 'a' |   1 |   3 |       3 |
+        +-----+-----+-----+---------+
+        | 'a' |   2 |   7 |       7 |
+        +-----+-----+-----+---------+
+        | 'a' |   3 |   4 |       7 |
+        +-----+-----+-----+---------+
+        | 'b' |   1 |   2 |       2 |
+        +-----+-----+-----+---------+
+        | 'b' |   2 |   1 |       2 |
+        +-----+-----+-----+---------+
+
+    The `aggregation` may be one of the builtins :func:`len`, :func:`sum`,
+    :func:`min`, :func:`max`, :func:`list` or :func:`set`, or an accumulator
+    from :mod:`petl.transform.accumulators`, which are updated a row at a
+    time. Any other function is called with the list of all values so far.
+
+    See :func:`petl.transform.windows.rolling` for the other arguments.
+
+    """
+
+    return WindowView(table, field, _Cumulative(value, aggregation), key=key,
+                      order=order, reverse=reverse, presorted=presorted,
+                      buffersize=buffersize, tempdir=tempdir, cache=cache)
+
+
+Table.cumulative = cumulative
+
+
+def cumsum(table, field, value, key=None, order=None, reverse=False,
+           presorted=False, buffersize=None, tempdir=None, cache=True):
+    """
+    Add a field with the running total of `value`. E.g.::
+
+        >>> import petl as etl
+        >>> table1 = [['foo', 'day', 'bar'],
+        ...           ['a', 1, 3],
+        ...           ['b', 1, 2],
+        ...           ['a', 2, 7],
+        ...           ['b', 2, 1],
+        ...           ['a', 3, 4]]
+        >>> table2 = etl.cumsum(table1, 'total', 'bar', key='foo', order='day')
+        >>> table2.lookall()
+        +-----+-----+-----+-------+
+        | foo | day | bar | total |
+        +=====+=====+=====+=======+
+        | 'a' |   1 |   3 |     3 |
+        +-----+-----+-----+-------+
+        | 'a' |   2 |   7 |    10 |
+        +-----+-----+-----+-------+
+        | 'a' |   3 |   4 |    14 |
+        +-----+-----+-----+-------+
+        | 'b' |   1 |   2 |     2 |
+        +-----+-----+-----+-------+
+        | 'b' |   2 |   1 |     3 |
+        +-----+-----+-----+-------+
+
+    See :func:`petl.transform.windows.rolling` for the other arguments.
+
+    """
+
+    return cumulative(table, field, value, Sum(), key=key, order=order,
+                      reverse=reverse, presorted=presorted,
+                      buffersize=buffersize, tempdir=tempdir, cache=cache)
+
+
+Table.cumsum = cumsum
+
+
+def lag(table, field, value, offset=1, default=None, key=None, order=None,
+        reverse=False, presorted=False, buffersize=None, tempdir=None,
+        cache=True):
+    """
+    Add a field with the value from `offset` rows before the current row in
+    the same partition, or `default` if there is no such row. E.g.::
+
+        >>> import petl as etl
+        >>> table1 = [['foo', 'day', 'bar'],
+        ...           ['a', 1, 3],
+        ...           ['b', 1, 2],
+        ...           ['a', 2, 7],
+        ...           ['b', 2, 1],
+        ...           ['a', 3, 4]]
+        >>> table2 = etl.lag(table1, 'prev', 'bar', key='foo', order='day')
+        >>> table2.lookall()
+        +-----+-----+-----+------+
+        | foo | day | bar | prev |
+        +=====+=====+=====+======+
+        | 'a' |   1 |   3 | None |
+        +-----+-----+-----+------+
+        | 'a' |   2 |   7 |    3 |
+        +-----+-----+-----+------+
+        | 'a' |   3 |   4 |    7 |
+        +-----+-----+-----+------+
+        | 'b' |   1 |   2 | None |
+        +-----+-----+-----+------+
+        | 'b' |   2 |   1 |    2 |
+        +-----+-----+-----+------+
+
+    See :func:`petl.transform.windows.rolling` for the other arguments.
+
+    """
+
+    if offset < 1:
+        raise ArgumentError('offset must be at least 1, found %r' % offset)
+    return WindowView(table, field, _Lag(value, offset, default), key=key,
+                      order=order, reverse=reverse, presorted=presorted,
+                      buffersize=buffersize, tempdir=tempdir, cache=cache)
+
+
+Table.lag = lag
+
+
+def lead(table, field, value, offset=1, default=None, key=None, order=None,
+         reverse=False, presorted=False, buffersize=None, tempdir=None,
+         cache=True):
+    """
+    Add a field with the value from `offset` rows after the current row in
+    the same partition, or `default` if there is no such row. E.g.::
+
+        >>> import petl as etl
+        >>> table1 = [['foo', 'day', 'bar'],
+        ...           ['a', 1, 3],
+        ...           ['b', 1, 2],
+        ...           ['a', 2, 7],
+        ...           ['b', 2, 1],
+        ...           ['a', 3, 4]]
+        >>> table2 = etl.lead(table1, 'next', 'bar', key='foo', order='day')
+        >>> table2.lookall()
+        +-----+-----+-----+------+
+        | foo | day | bar | next |
+        +=====+=====+=====+======+
+        | 'a' |   1 |   3 |    7 |
+        +-----+-----+-----+------+
+        | 'a' |   2 |   7 |    4 |
+        +-----+-----+-----+------+
+        | 'a' |   3 |   4 | None |
+        +-----+-----+-----+------+
+        | 'b' |   1 |   2 |    1 |
+        +-----+-----+-----+------+
+        | 'b' |   2 |   1 | None |
+        +-----+-----+-----+------+
+
+    Only the `offset` rows following the current row are held in memory.
+
+    See :func:`petl.transform.windows.rolling` for the other arguments.
+
+    """
+
+    if offset < 1:
+        raise ArgumentError('offset must be at least 1, found %r' % offset)
+    return WindowView(table, field, _Lead(value, offset, default), key=key,
+                      order=order, reverse=reverse, presorted=presorted,
+                      buffersize=buffersize, tempdir=tempdir, cache=cache)
+
+
+Table.lead = lead
+
+
+def rownumber(table, field='rownumber', key=None, order=None, reverse=False,
+              presorted=False, buffersize=None, tempdir=None, cache=True):
+    """
+    Add a field numbering the rows of each partition, starting from 1. E.g.::
+
+        >>> import petl as etl
+        >>> table1 = [['foo', 'bar'],
+        ...           ['a', 3],
+        ...           ['b', 2],
+        ...           ['a', 7],
+        ...           ['a', 4]]
+        >>> table2 = etl.rownumber(table1, key='foo', order='bar',
+        ...                        reverse=True)
+        >>> table2.lookall()
+        +-----+-----+-----------+
+        | foo | bar | rownumber |
+        +=====+=====+===========+
+        | 'b' |   2 |         1 |
+        +-----+-----+-----------+
+        | 'a' |   7 |         1 |
+        +-----+-----+-----------+
+        | 'a' |   4 |         2 |
+        +-----+-----+-----------+
+        | 'a' |   3 |         3 |
+        +-----+-----+-----------+
+
+    See :func:`petl.transform.windows.rolling` for the other arguments.
+
+    """
+
+    return WindowView(table, field, _RowNumber(), key=key, order=order,
+                      reverse=reverse, presorted=presorted,
+                      buffersize=buffersize, tempdir=tempdir, cache=cache)
+
+
+Table.rownumber = rownumber
+
+
+def rank(table, field='rank', key=None, order=None, dense=False,
+         reverse=False, presorted=False, buffersize=None, tempdir=None,
+         cache=True):
+    """
+    Add a field ranking the rows of each partition by `order`. Rows with the
+    same `order` values have the same rank. E.g.::
+
+        >>> import petl as etl
+        >>> table1 = [['foo', 'bar'],
+        ...           ['a', 3],
+        ...           ['b', 2],
+        ...           ['a', 7],
+        ...           ['a', 3],
+        ...           ['a', 1]]
+        >>> table2 = etl.rank(table1, order='bar', key='foo')
+        >>> table2.lookall()
+        +-----+-----+------+
+        | foo | bar | rank |
+        +=====+=====+======+
+        | 'a' |   1 |    1 |
+        +-----+-----+------+
+        | 'a' |   3 |    2 |
+        +-----+-----+------+
+        | 'a' |   3 |    2 |
+        +-----+-----+------+
+        | 'a' |   7 |    4 |
+        +-----+-----+------+
+        | 'b' |   2 |    1 |
+        +-----+-----+------+
+
+        >>> table3 = etl.rank(table1, order='bar', key='foo', dense=True)
+        >>> table3.values('rank')
+        rank: 1, 2, 2, 3, 1
+
+    If `dense` is `True` ranks follow on from each other after ties, rather
+    than leaving gaps.
+
+    See :func:`petl.transform.windows.rolling` for the other arguments.
+
+    """
+
+    if order is None:
+        raise ArgumentError('rank needs an order')
+    return WindowView(table, field, _Rank(order, dense), key=key, order=order,
+                      reverse=reverse, presorted=presorted,
+                      buffersize=buffersize, tempdir=tempdir, cache=cache)
+
+
+Table.rank = rank
+
+
+def ntile(table, field, n, key=None, order=None, reverse=False,
+          presorted=False, buffersize=None, tempdir=None, cache=True):
+    """
+    Add a field dividing the rows of each partition into `n` buckets of as
+    near equal size as possible, numbered from 1. E.g.::
+
+        >>> import petl as etl
+        >>> table1 = [['foo', 'bar'],
+        ...           ['a', 3],
+        ...           ['b', 2],
+        ...           ['a', 7],
+        ...           ['a', 4],
+        ...           ['a', 1],
+        ...           ['a', 9]]
+        >>> table2 = etl.ntile(table1, 'half', 2, key='foo', order='bar')
+        >>> table2.lookall()
+        +-----+-----+------+
+        | foo | bar | half |
+        +=====+=====+======+
+        | 'a' |   1 |    1 |
+        +-----+-----+------+
+        | 'a' |   3 |    1 |
+        +-----+-----+------+
+        | 'a' |   4 |    1 |
+        +-----+-----+------+
+        | 'a' |   7 |    2 |
+        +-----+-----+------+
+        | 'a' |   9 |    2 |
+        +-----+-----+------+
+        | 'b' |   2 |    1 |
+        +-----+-----+------+
+
+    As in SQL, when the rows don't divide equally the first buckets get one
+    row more than the others. The size of each partition is needed up front,
+    so the (sorted) table is read twice, first to count the rows of each
+    partition.
+
+    See :func:`petl.transform.windows.rolling` for the other arguments.
+
+    """
+
+    if n < 1:
+        raise ArgumentError('n must be at least 1, found %r' % n)
+    return WindowView(table, field, _Ntile(n), key=key, order=order,
+                      reverse=reverse, presorted=presorted,
+                      buffersize=buffersize, tempdir=tempdir, cache=cache)
+
+
+Table.ntile = ntile
+
+
+class WindowView(Table):
+
+    def __init__(self, source, field, window, key=None, order=None,
+                 reverse=False, presorted=False, buffersize=None,
+                 tempdir=None, cache=True):
+        sortkey = _fieldlist(key) + _fieldlist(order)
+        if presorted or not sortkey:
+            self.source = source
+        else:
+            self.source = sort(source, sortkey, reverse=reverse,
+                               buffersize=buffersize, tempdir=tempdir,
+                               cache=cache)
+        self.field = field
+        self.window = window
+        self.key = key
+
+    def __iter__(self):
+        return iterwindow(self.source, self.field, self.window, self.key)
+
+
+def _fieldlist(fields):
+    if fields is None:
+        return []
+    elif isinstance(fields, (list, tuple)):
+        return list(fields)
+    else:
+        return [fields]
+
+
+def iterwindow(source, field, window, key):
+    it = iter(source)
+    hdr = next(it)
+    flds = list(map(text_type, hdr))
+    yield tuple(hdr) + (field,)
+
+    apply = window.bind(hdr, flds, source, key)
+    if key is None:
+        partitions = [it]
+    else:
+        getkey = operator.itemgetter(*asindices(hdr, key))
+        partitions = (rows for _, rows in itertools.groupby(it, key=getkey))
+    for rows in partitions:
+        for row, v in apply(rows):
+            yield tuple(row) + (v,)
+
+
+# Each window function is an object whose bind() method resolves fields
+# against the header and returns a function, which is called with the rows
+# of each partition in turn and generates (row, value) pairs.
+
+
+def _getvaluefn(hdr, flds, value):
+    if callable(value):
+        return lambda row: value(Record(row, flds))
+    return operator.itemgetter(*asindices(hdr, value))
+
+
+class _Rolling(object):
+
+    def __init__(self, value, size, aggregation):
+        self.value = value
+        self.size = size
+        self.aggregation = aggregation
+
+    def bind(self, hdr, flds, source, key):
+        getvalue = _getvaluefn(hdr, flds, self.value)
+        size = self.size
+        aggregation = self.aggregation
+
+        def apply(rows):
+            frame = deque(maxlen=size)
+            for row in rows:
+                frame.append(getvalue(row))
+                yield row, aggregation(list(frame))
+
+        return apply
+
+
+class _Cumulative(object):
+
+    def __init__(self, value, aggregation):
+        self.value = value
+        self.accumulator = _asaccumulator(aggregation)
+
+    def bind(self, hdr, flds, source, key):
+        getvalue = _getvaluefn(hdr, flds, self.value)
+        acc = self.accumulator
+
+        def apply(rows):
+            state = acc.init()
+            for row in rows:
+                state = acc.update(state, getvalue(row))
+                v = acc.finalize(state)
+                if v is state:
+                    # don't hand out a state which is updated in place
+                    v = copy.copy(v)
+                yield row, v
+
+        return apply
+
+
+class _Lag(object):
+
+    def __init__(self, value, offset, default):
+        self.value = value
+        self.offset = offset
+        self.default = default
+
+    def bind(self, hdr, flds, source, key):
+        getvalue = _getvaluefn(hdr, flds, self.value)
+        offset = self.offset
+        default = self.default
+
+        def apply(rows):
+            previous = deque(maxlen=offset)
+            for row in rows:
+                if len(previous) == offset:
+                    yield row, previous[0]
+                else:
+                    yield row, default
+                previous.append(getvalue(row))
+
+        return apply
+
+
+class _Lead(object):
+
+    def __init__(self, value, offset, default):
+        self.value = value
+        self.offset = offset
+        self.default = default
+
+    def bind(self, hdr, flds, source, key):
+        getvalue = _getvaluefn(hdr, flds, self.value)
+        offset = self.offset
+        default = self.default
+
+        def apply(rows):
+            # hold back rows until the row `offset` after has been seen
+            pending = deque()
+            for row in rows:
+                if len(pending) == offset:
+                    yield pending.popleft(), getvalue(row)
+                pending.append(row)
+            for row in pending:
+                yield row, default
+
+        return apply
+
+
+class _RowNumber(object):
+
+    def bind(self, hdr, flds, source, key):
+
+        def apply(rows):
+            return izip(rows, itertools.count(1))
+
+        return apply
+
+
+class _Rank(object):
+
+    def __init__(self, order, dense):
+        self.order = order
+        self.dense = dense
+
+    def bind(self, hdr, flds, source, key):
+        getorder = operator.itemgetter(*asindices(hdr, self.order))
+        dense = self.dense
+
+        def apply(rows):
+            r = 0
+            previous = None
+            for i, row in enumerate(rows, 1):
+                o = getorder(row)
+                if i == 1 or o != previous:
+                    r = r + 1 if dense else i
+                    previous = o
+                yield row, r
+
+        return apply
+
+
+class _Ntile(object):
+
+    def __init__(self, n):
+        self.n = n
+
+    def bind(self, hdr, flds, source, key):
+        n = self.n
+        # count the rows of each partition, in the order they will come
+        it = iter(source)
+        next(it)
+        if key is None:
+            counts = iter([sum(1 for _ in it)])
+        else:
+            getkey = operator.itemgetter(*asindices(hdr, key))
+            counts = iter([sum(1 for _ in rows)
+                           for _, rows in itertools.groupby(it, key=getkey)])
+
+        def apply(rows):
+            # the first r buckets have one row more than the others
+            q, r = divmod(next(counts), n)
+            big = r * (q + 1)
+            for i, row in enumerate(rows):
+                if i < big:
+                    yield row, i // (q + 1) + 1
+                else:
+                    yield row, r + (i - big) // q + 1
+
+        return apply
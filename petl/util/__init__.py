@@ -5,7 +5,7 @@ from petl.util.base import Table, Record, values, header, data, \
     fieldnames, records, dicts, namedtuples, expr, rowgroupby, empty, wrap
 
 from petl.util.lookups import lookup, lookupone, dictlookup, dictlookupone, \
-    recordlookup, recordlookupone
+    recordlookup, recordlookupone, DiskLookup
 
 from petl.util.parsers import dateparser, timeparser, datetimeparser, \
     numparser, boolparser
@@ -16,14 +16,15 @@ from petl.util.random import randomtable, dummytable
 
 from petl.util.counting import parsecounter, parsecounts, typecounter, \
     typecounts, valuecount, valuecounter, valuecounts, stringpatterncounter, \
-    stringpatterns, rowlengths, nrows
+    stringpatterns, rowlengths, nrows, HyperLogLog, approxdistinct, \
+    approxcountdistinct, approxvaluecounts
 
 from petl.util.materialise import listoflists, listoftuples, tupleoflists, \
     tupleoftuples, columns, facetcolumns
 
 from petl.util.timing import progress, log_progress, clock
 
-from petl.util.statistics import limits, stats
+from petl.util.statistics import limits, stats, quantiles, QuantileSketch
 
 from petl.util.misc import typeset, diffheaders, diffvalues, nthword, strjoin, \
     coalesce
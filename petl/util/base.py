@@ -165,6 +165,20 @@ class IterContainer(object):
 
 class Table(IterContainer):
 
+    # key and direction the rows of this table are known to be sorted by, if
+    # any, see SortOrder and issortedby()
+    sortorder = None
+
+    def resolveheader(self):
+        """Return the header row of this table if it can be determined
+        without iterating over the table, e.g., from the arguments of the
+        view and/or the headers of its source tables, otherwise `None`. Used
+        by :func:`header`, views should override this where iterating is
+        expensive or would do work on the data rows that isn't needed to
+        find the header."""
+
+        return None
+
     def __getitem__(self, item):
         if isinstance(item, string_types):
             return ValuesView(self, item)
@@ -172,6 +186,38 @@ class Table(IterContainer):
             return super(Table, self).__getitem__(item)
 
 
+SortOrder = namedtuple('SortOrder', ('key', 'reverse'))
+SortOrder.__doc__ = """The order rows of a table are known to be sorted in.
+The `key` is a tuple of field names and/or indices as passed to
+:func:`petl.transform.sorts.sort`, or `None` if rows are sorted by all fields
+(i.e., a lexical sort)."""
+
+
+def sortkeytuple(key):
+    """Normalise a sort key into a tuple of fields, or `None`."""
+
+    if key is None:
+        return None
+    if isinstance(key, (list, tuple)):
+        return tuple(key)
+    return key,
+
+
+def issortedby(table, key=None, reverse=False):
+    """Return `True` if the given table is known to be sorted by the given
+    key, i.e., sorting it again would not change the order of the rows. This
+    is the case if the table has a `sortorder` in the same direction and
+    whose key starts with the given key. No data are read from the table."""
+
+    order = getattr(table, 'sortorder', None)
+    if order is None or bool(order.reverse) != bool(reverse):
+        return False
+    key = sortkeytuple(key)
+    if key is None or order.key is None:
+        return key == order.key
+    return order.key[:len(key)] == key
+
+
 def values(table, *field, **kwargs):
     """
     Return a container supporting iteration over values in a given field or
@@ -275,6 +321,9 @@ class TableWrapper(Table):
     def __iter__(self):
         return iter(self.inner)
 
+    def resolveheader(self):
+        return header(self.inner)
+
 
 wrap = TableWrapper
 
@@ -330,8 +379,18 @@ def header(table):
     Note that the header row will always be returned as a tuple, regardless
     of what the underlying data are.
 
+    Views which can work out their header without iterating over their data
+    (by implementing a `resolveheader()` method) do so, e.g., the header of a
+    table sorted by :func:`petl.transform.sorts.sort` is the header of the
+    source table, and the table isn't sorted to find it.
+
     """
 
+    resolve = getattr(table, 'resolveheader', None)
+    if resolve is not None:
+        hdr = resolve()
+        if hdr is not None:
+            return tuple(hdr)
     it = iter(table)
     return tuple(next(it))
 
@@ -339,6 +398,15 @@ def header(table):
 Table.header = header
 
 
+def derivedheader(iterfunc, source, *args, **kwargs):
+    """Return the header row yielded by ``iterfunc(source, *args,
+    **kwargs)``, without iterating over the data rows of `source`. Only
+    suitable for iterator functions which yield their header row before
+    reading any data rows from their source."""
+
+    return tuple(next(iterfunc([header(source)], *args, **kwargs)))
+
+
 def fieldnames(table):
     """
     Return the string values of the header row. If the header row
@@ -554,6 +622,10 @@ class Record(tuple):
         self.flds = flds
         self.missing = missing
 
+    def __reduce__(self):
+        # so records can be stored in persistent lookups
+        return Record, (tuple(self), self.flds, self.missing)
+
     def __getitem__(self, f):
         if isinstance(f, int):
             idx = f
@@ -701,30 +773,24 @@ def rowgroupby(table, key, value=None):
     # determine key function
     if callable(key):
         getkey = key
-        native_key = True
     else:
+        # N.B., groups are only told apart by equality, which is the same for
+        # plain values as for values wrapped in Comparable, so there is no
+        # need to wrap key values here
         kindices = asindices(hdr, key)
-        getkey = comparable_itemgetter(*kindices)
-        native_key = False
+        getkey = operator.itemgetter(*kindices)
 
     git = groupby(it, key=getkey)
     if value is None:
-        if native_key:
-            return git
-        else:
-            return ((k.inner, vals) for (k, vals) in git)
+        return git
     else:
         if callable(value):
             getval = value
         else:
             vindices = asindices(hdr, value)
             getval = operator.itemgetter(*vindices)
-        if native_key:
-            return ((k, (getval(v) for v in vals))
-                    for (k, vals) in git)
-        else:
-            return ((k.inner, (getval(v) for v in vals))
-                    for (k, vals) in git)
+        return ((k, (getval(v) for v in vals))
+                for (k, vals) in git)
 
 
 Table.rowgroupby = rowgroupby
@@ -771,3 +837,6 @@ class EmptyTable(Table):
     def __iter__(self):
         # empty header row
         yield tuple()
+
+    def resolveheader(self):
+        return tuple()
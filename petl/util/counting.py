@@ -1,10 +1,14 @@
 from __future__ import absolute_import, print_function, division
 
 
+import hashlib
+import math
+import struct
 from collections import Counter
-from petl.compat import string_types, maketrans
+from petl.compat import string_types, maketrans, text_type, binary_type
 
 
+from petl.errors import ArgumentError
 from petl.util.base import values, Table, data, wrap
 
 
@@ -162,6 +166,126 @@ class ValueCountsView(Table):
                 yield (c[0], c[1], float(c[1])/total)
 
 
+def approxvaluecounts(table, *field, **kwargs):
+    """
+    Find the most common values for the given field in one pass, keeping
+    count of at most `k` values (1000 by default) at any time, so memory use
+    is bounded however many distinct values there are. Returns a table like
+    :func:`petl.util.counting.valuecounts`, with an additional `error` field.
+    E.g.::
+
+        >>> import petl as etl
+        >>> table = [['foo', 'bar'],
+        ...          ['a', 1],
+        ...          ['b', 2],
+        ...          ['a', 3],
+        ...          ['c', 4],
+        ...          ['a', 5],
+        ...          ['d', 6]]
+        >>> etl.approxvaluecounts(table, 'foo', k=2)
+        +-----+-------+-----------+-------+
+        | foo | count | frequency | error |
+        +=====+=======+===========+=======+
+        | 'a' |     3 |       0.5 |     0 |
+        +-----+-------+-----------+-------+
+        | 'd' |     3 |       0.5 |     2 |
+        +-----+-------+-----------+-------+
+
+    Counts are upper bounds, the true count of each value is at least `count`
+    minus `error`. Any value which occurs in more than 1/`k` of the rows is
+    guaranteed to be included. The counting uses the Space-Saving algorithm
+    (Metwally et al., "Efficient computation of frequent and top-k elements
+    in data streams"). Frequencies are relative to the total number of rows.
+
+    If rows are short, the value of the keyword argument `missing` is
+    counted. Multiple fields can be given as positional arguments, in which
+    case they are treated as a compound key.
+
+    """
+
+    return ApproxValueCountsView(table, field, **kwargs)
+
+
+Table.approxvaluecounts = approxvaluecounts
+
+
+class ApproxValueCountsView(Table):
+
+    def __init__(self, table, field, k=1000, missing=None):
+        if k < 1:
+            raise ArgumentError('k must be at least 1, found %r' % k)
+        self.table = table
+        self.field = field
+        self.k = k
+        self.missing = missing
+
+    def __iter__(self):
+
+        # construct output header
+        yield tuple(self.field) + ('count', 'frequency', 'error')
+
+        # count values
+        counts, total = _spacesaving(
+            values(self.table, self.field, missing=self.missing), self.k
+        )
+
+        if len(self.field) > 1:
+            for v, n, e in counts:
+                yield tuple(v) + (n, float(n)/total, e)
+        else:
+            for v, n, e in counts:
+                yield (v, n, float(n)/total, e)
+
+
+def _spacesaving(vals, k):
+    # keep count of at most k values, when a value comes along which isn't
+    # counted and there is no room, it replaces the value which has had the
+    # lowest count for longest, and inherits that count, which becomes its
+    # error, returns a list of (value, count, error) with the highest counts
+    # first, and the number of values seen
+    counts = dict()  # value -> count
+    errors = dict()  # value -> error
+    buckets = dict()  # count -> values with that count, as dict keys
+    mincount = 0
+    total = 0
+    for v in vals:
+        total += 1
+        c = counts.get(v)
+        if c is None:
+            if len(counts) < k:
+                c = 0
+                errors[v] = 0
+                mincount = 0
+            else:
+                # evict a value with the lowest count
+                bucket = buckets[mincount]
+                old = next(iter(bucket))
+                del bucket[old]
+                if not bucket:
+                    del buckets[mincount]
+                del counts[old]
+                del errors[old]
+                c = mincount
+                errors[v] = c
+        else:
+            bucket = buckets[c]
+            del bucket[v]
+            if not bucket:
+                del buckets[c]
+        c += 1
+        counts[v] = c
+        bucket = buckets.get(c)
+        if bucket is None:
+            buckets[c] = {v: None}
+        else:
+            bucket[v] = None
+        if c - 1 == mincount and mincount not in buckets:
+            mincount = c
+    output = [(v, n, errors[v]) for v, n in counts.items()]
+    output.sort(key=lambda item: (-item[1], item[2]))
+    return output, total
+
+
 def parsecounter(table, field, parsers=(('int', int), ('float', float))):
     """
     Count the number of `str` or `unicode` values under the given fields that
@@ -467,3 +591,163 @@ def rowlengths(table):
 
 
 Table.rowlengths = rowlengths
+
+
+def _stablehash(value, unpack=struct.Struct('<Q').unpack):
+    # a 64-bit hash of the value which is the same in every process, unlike
+    # the builtin hash() of strings, so sketches built in different processes
+    # can be merged
+    if isinstance(value, text_type):
+        value = value.encode('utf-8')
+    elif not isinstance(value, binary_type):
+        value = repr(value).encode('utf-8')
+    return unpack(hashlib.md5(value).digest()[:8])[0]
+
+
+class HyperLogLog(object):
+    """
+    A sketch of a set of values, from which the number of distinct values can
+    be estimated within a relative standard error of about `error`, using a
+    fixed amount of memory (2**14 bytes for the default error of 0.01).
+    E.g.::
+
+        >>> import petl as etl
+        >>> sketch = etl.HyperLogLog(range(10000))
+        >>> sketch.update(range(5000, 15000))
+        >>> sketch.estimate()
+        15022
+
+    Sketches with the same `error` can be merged, e.g., sketches built over
+    separate parts of a table, giving exactly the estimate a single sketch
+    over all the values would give::
+
+        >>> other = etl.HyperLogLog(range(10000, 20000))
+        >>> sketch.merge(other)
+        >>> sketch.estimate()
+        19962
+
+    Values are hashed via their `repr()` (strings via their UTF-8 encoding),
+    so values which compare equal but look different, like ``1`` and
+    ``1.0``, are counted as different values. The hash doesn't depend on the
+    process, so sketches can be built in worker processes and pickled.
+
+    See also :func:`petl.util.counting.approxdistinct`.
+
+    """
+
+    def __init__(self, values=None, error=0.01):
+        # number of registers needed for the standard error 1.04/sqrt(m)
+        p = int(math.ceil(math.log((1.04 / error) ** 2, 2)))
+        self.error = error
+        self.p = min(max(p, 4), 18)
+        self.registers = bytearray(1 << self.p)
+        if values is not None:
+            self.update(values)
+
+    def add(self, value):
+        """Add a value to the sketch."""
+
+        h = _stablehash(value)
+        p = self.p
+        # the first p bits choose the register, which keeps the highest
+        # position of the first 1 bit in the rest
+        q = 64 - p
+        i = h >> q
+        rank = q - (h & ((1 << q) - 1)).bit_length() + 1
+        if rank > self.registers[i]:
+            self.registers[i] = rank
+
+    def update(self, values):
+        """Add all of the given values to the sketch."""
+
+        for v in values:
+            self.add(v)
+
+    def merge(self, other):
+        """Merge another sketch into this one."""
+
+        if other.p != self.p:
+            raise ArgumentError('cannot merge sketches with different errors')
+        registers = self.registers
+        for i, r in enumerate(other.registers):
+            if r > registers[i]:
+                registers[i] = r
+
+    def estimate(self):
+        """Return the estimated number of distinct values."""
+
+        m = len(self.registers)
+        if m == 16:
+            alpha = 0.673
+        elif m == 32:
+            alpha = 0.697
+        elif m == 64:
+            alpha = 0.709
+        else:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        e = alpha * m * m / sum(math.ldexp(1., -r) for r in self.registers)
+        zeros = self.registers.count(0)
+        if e <= 2.5 * m and zeros:
+            # few values, linear counting is more accurate
+            e = m * math.log(m / zeros)
+        return int(round(e))
+
+
+def approxdistinct(table, *field, **kwargs):
+    """
+    Estimate the number of distinct values for the given field, within a
+    relative standard error of about `error` (0.01 by default), without
+    holding the values in memory. E.g.::
+
+        >>> import petl as etl
+        >>> table = [['foo', 'bar']] + [[i % 3, i] for i in range(10000)]
+        >>> etl.approxdistinct(table, 'foo')
+        3
+        >>> etl.approxdistinct(table, 'bar')
+        10030
+
+    If multiple fields are given, these are treated as a compound key. If
+    rows are short, the value of the keyword argument `missing` is counted.
+
+    See also :class:`petl.util.counting.HyperLogLog`, which this function uses
+    to sketch the values, and :func:`petl.util.counting.approxcountdistinct`,
+    for use with :func:`petl.transform.reductions.aggregate`.
+
+    """
+
+    missing = kwargs.get('missing', None)
+    error = kwargs.get('error', 0.01)
+    sketch = HyperLogLog(values(table, field, missing=missing), error=error)
+    return sketch.estimate()
+
+
+Table.approxdistinct = approxdistinct
+
+
+def approxcountdistinct(values, error=0.01):
+    """
+    Estimate the number of distinct values in the given iterable, for use as
+    an aggregation function with :func:`petl.transform.reductions.aggregate`.
+    E.g.::
+
+        >>> import petl as etl
+        >>> table = [['foo', 'bar'],
+        ...          ['a', 1],
+        ...          ['a', 2],
+        ...          ['a', 1],
+        ...          ['b', 3]]
+        >>> etl.aggregate(table, 'foo', etl.approxcountdistinct, 'bar')
+        +-----+-------+
+        | foo | value |
+        +=====+=======+
+        | 'a' |     2 |
+        +-----+-------+
+        | 'b' |     1 |
+        +-----+-------+
+
+    To keep the sketches themselves, e.g., to merge them later, use
+    :class:`petl.util.counting.HyperLogLog` as the aggregation function.
+
+    """
+
+    return HyperLogLog(values, error=error).estimate()
@@ -1,11 +1,17 @@
 from __future__ import absolute_import, print_function, division
 
 
+import os
 import operator
-from petl.compat import text_type
+import tempfile
+from io import BytesIO
+from array import array
+from collections import OrderedDict
+from petl.compat import text_type, pickle, Mapping, MutableMapping, PY2, \
+    intern
 
 
-from petl.errors import DuplicateKeyError
+from petl.errors import DuplicateKeyError, ArgumentError
 from petl.util.base import Table, asindices, asdict, Record, rowgetter
 
 
@@ -32,7 +38,7 @@ def _setup_lookup(table, key, value):
     return it, getkey, getvalue
 
 
-def lookup(table, key, value=None, dictionary=None):
+def lookup(table, key, value=None, dictionary=None, compact=False):
     """
     Load a dictionary with data from the given table. E.g.::
 
@@ -79,8 +85,25 @@ def lookup(table, key, value=None, dictionary=None):
         >>> lkp['b']
         [2, 3]
 
+    If `compact` is True, a read-only
+    :class:`petl.util.lookups.CompactLookup` is returned instead of a
+    dictionary, which holds values column by column rather than as one tuple
+    per row, and so needs much less memory for big tables. Each lookup is
+    slower than with a dictionary though. E.g.::
+
+        >>> lkp = etl.lookup(table1, 'foo', 'bar', compact=True)
+        >>> lkp['b']
+        [2, 3]
+        >>> len(lkp)
+        2
+
     """
 
+    if compact:
+        if dictionary is not None:
+            raise ArgumentError('dictionary cannot be given if compact=True')
+        return CompactLookup(table, key, value)
+
     if dictionary is None:
         dictionary = dict()
 
@@ -105,7 +128,8 @@ def lookup(table, key, value=None, dictionary=None):
 Table.lookup = lookup
 
 
-def lookupone(table, key, value=None, dictionary=None, strict=False):
+def lookupone(table, key, value=None, dictionary=None, strict=False,
+              compact=False):
     """
     Load a dictionary with data from the given table, assuming there is
     at most one value for each key. E.g.::
@@ -156,8 +180,20 @@ def lookupone(table, key, value=None, dictionary=None, strict=False):
         >>> lkp['b']
         2
 
+    As for :func:`petl.util.lookups.lookup`, pass ``compact=True`` to get a
+    memory-efficient read-only mapping rather than a dictionary. E.g.::
+
+        >>> lkp = etl.lookupone(table2, ('foo', 'bar'), compact=True)
+        >>> lkp[('b', 3)]
+        ('b', 3, True)
+
     """
 
+    if compact:
+        if dictionary is not None:
+            raise ArgumentError('dictionary cannot be given if compact=True')
+        return CompactLookup(table, key, value, unique=True, strict=strict)
+
     if dictionary is None:
         dictionary = dict()
 
@@ -379,3 +415,388 @@ def recordlookupone(table, key, dictionary=None, strict=False):
 
 
 Table.recordlookupone = recordlookupone
+
+
+# marks a key known not to be in a DiskLookup
+_absent = object()
+
+
+if PY2:
+    _blob = buffer
+else:
+    _blob = bytes
+
+
+class DiskLookup(MutableMapping):
+    """
+    Dictionary-like object storing its items in an SQLite database file
+    rather than in memory, for use as the `dictionary` argument to any of
+    the lookup functions, or to :func:`petl.transform.hashjoins.hashlookupjoin`,
+    when there are too many keys to hold in a Python dictionary. E.g.::
+
+        >>> import petl as etl
+        >>> table1 = [['foo', 'bar'],
+        ...           ['a', 1],
+        ...           ['b', 2],
+        ...           ['b', 3]]
+        >>> lkp = etl.lookup(table1, 'foo', 'bar', etl.DiskLookup())
+        >>> lkp['a']
+        [1]
+        >>> lkp['b']
+        [2, 3]
+        >>> len(lkp)
+        2
+        >>> lkp.close()
+
+    If `path` is None the database is written to a temporary file (in
+    `tempdir`, if given) which is deleted when the lookup is closed or
+    garbage collected, otherwise items are kept in the given file and can
+    be read back by opening a new `DiskLookup` on the same path.
+
+    Keys and values are pickled, and keys are matched by their pickled
+    form, so e.g. ``1`` and ``1.0`` are different keys. New items are
+    buffered and written to the database `batchsize` at a time, and up to
+    `cachesize` recently read items are kept in memory.
+
+    """
+
+    def __init__(self, path=None, cachesize=10000, batchsize=10000,
+                 tempdir=None):
+        import sqlite3
+        if path is None:
+            fd, path = tempfile.mkstemp(suffix='.sqlite', dir=tempdir)
+            os.close(fd)
+            self._temporary = True
+        else:
+            self._temporary = False
+        self.path = path
+        self.cachesize = cachesize
+        self.batchsize = batchsize
+        self._connection = sqlite3.connect(path)
+        if self._temporary:
+            # nothing to recover if the process dies, so don't pay for it
+            self._connection.execute('PRAGMA synchronous = OFF')
+            self._connection.execute('PRAGMA journal_mode = OFF')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS lookup '
+                                 '(k BLOB PRIMARY KEY, v BLOB) WITHOUT ROWID')
+        self._connection.commit()
+        self._pending = dict()
+        self._cache = OrderedDict()
+
+    def _dumps(self, obj):
+        # fixed protocol so files written under one Python can be read
+        # under another
+        return pickle.dumps(obj, protocol=2)
+
+    def _dumpkey(self, key):
+        # N.B., without the memo, so that equal keys pickle the same whether
+        # or not they share objects, e.g., ('ab', 'ab') pickles the second
+        # string as a reference to the first if they are the same object
+        f = BytesIO()
+        pickler = pickle.Pickler(f, protocol=2)
+        pickler.fast = True
+        pickler.dump(key)
+        return f.getvalue()
+
+    def flush(self):
+        """Write any buffered items to the database."""
+        if self._pending:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO lookup (k, v) VALUES (?, ?)',
+                ((_blob(k), _blob(self._dumps(v)))
+                 for k, v in self._pending.items())
+            )
+            self._connection.commit()
+            self._pending.clear()
+
+    sync = flush
+
+    def _remember(self, k, v):
+        cache = self._cache
+        cache[k] = v
+        if len(cache) > self.cachesize:
+            cache.popitem(last=False)
+
+    def __getitem__(self, key):
+        k = self._dumpkey(key)
+        if k in self._pending:
+            return self._pending[k]
+        cache = self._cache
+        if k in cache:
+            v = cache.pop(k)
+            cache[k] = v  # most recently used
+            if v is _absent:
+                raise KeyError(key)
+            return v
+        row = self._connection.execute(
+            'SELECT v FROM lookup WHERE k = ?', (_blob(k),)
+        ).fetchone()
+        if row is None:
+            # remember misses too, joins probe for lots of absent keys
+            self._remember(k, _absent)
+            raise KeyError(key)
+        v = pickle.loads(bytes(row[0]))
+        self._remember(k, v)
+        return v
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __setitem__(self, key, value):
+        k = self._dumpkey(key)
+        self._pending[k] = value
+        self._cache.pop(k, None)
+        if len(self._pending) >= self.batchsize:
+            self.flush()
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        k = self._dumpkey(key)
+        self._pending.pop(k, None)
+        self._cache.pop(k, None)
+        self._connection.execute('DELETE FROM lookup WHERE k = ?',
+                                 (_blob(k),))
+        self._connection.commit()
+
+    def __iter__(self):
+        self.flush()
+        cursor = self._connection.execute('SELECT k FROM lookup')
+        for row in cursor:
+            yield pickle.loads(bytes(row[0]))
+
+    def __len__(self):
+        self.flush()
+        return self._connection.execute(
+            'SELECT COUNT(*) FROM lookup'
+        ).fetchone()[0]
+
+    def clear(self):
+        self._pending.clear()
+        self._cache.clear()
+        self._connection.execute('DELETE FROM lookup')
+        self._connection.commit()
+
+    def close(self):
+        """Write any buffered items and close the database. If the database
+        is in a temporary file, the file is deleted."""
+        if self._connection is None:
+            return
+        if self._temporary:
+            self._pending.clear()
+        else:
+            self.flush()
+        self._connection.close()
+        self._connection = None
+        self._cache.clear()
+        if self._temporary:
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.path)
+
+
+
+try:
+    array('q')
+    _inttypecode = 'q'
+except ValueError:
+    # no long long arrays on Python 2
+    _inttypecode = 'l'
+
+
+_arraytypecodes = {int: _inttypecode, float: 'd'}
+
+
+_mask64 = (1 << 64) - 1
+
+
+class _CompactColumn(object):
+    # values of one field, kept in a typed array for as long as they are all
+    # ints or all floats, otherwise in a list with strings interned
+
+    def __init__(self):
+        self.data = None
+        self.type = None
+
+    def append(self, value):
+        # returns True if the values had to be moved to a new container
+        moved = False
+        t = type(value)
+        if t is not self.type:
+            if self.data is None and t in _arraytypecodes:
+                self.data = array(_arraytypecodes[t])
+                self.type = t
+                moved = True
+            elif self.data is None:
+                self.data = []
+                moved = True
+            elif self.type is not None:
+                self.data = list(self.data)
+                self.type = None
+                moved = True
+        if self.type is None:
+            if t is str:
+                value = intern(value)
+            self.data.append(value)
+        else:
+            try:
+                self.data.append(value)
+            except OverflowError:
+                self.data = list(self.data)
+                self.type = None
+                self.data.append(value)
+                moved = True
+        return moved
+
+
+class CompactLookup(Mapping):
+    """
+    Read-only mapping returned by :func:`petl.util.lookups.lookup` and
+    :func:`petl.util.lookups.lookupone` when called with ``compact=True``.
+
+    The fields needed for keys and values are held column by column, in
+    typed arrays where a column is all ints or all floats, and keys are
+    found via an open addressing hash table of row offsets held in an
+    array, so there is no Python object per row. Values are made into
+    tuples when they are looked up.
+
+    """
+
+    def __init__(self, table, key, value=None, unique=False, strict=False):
+
+        it = iter(table)
+        hdr = next(it)
+        keyindices = asindices(hdr, key)
+        assert len(keyindices) > 0, 'no key selected'
+        if value is None:
+            # default value is complete row
+            valueindices = list(range(len(hdr)))
+            self._valuetuple = True
+        else:
+            valueindices = asindices(hdr, value)
+            assert len(valueindices) > 0, 'no value selected'
+            self._valuetuple = len(valueindices) > 1
+        getkey = operator.itemgetter(*keyindices)
+
+        # store each field needed only once, even if in both key and value
+        indices = sorted(set(keyindices) | set(valueindices))
+        position = dict((idx, n) for n, idx in enumerate(indices))
+        self._keycols = [position[idx] for idx in keyindices]
+        self._valuecols = [position[idx] for idx in valueindices]
+        columns = [_CompactColumn() for _ in indices]
+        self._data = [c.data for c in columns]
+
+        self.unique = unique
+        self._slots = array('i', [0]) * 8  # row offset + 1, or 0 if empty
+        self._hashes = array(_inttypecode)
+        # previous row offset with the same key, or -1
+        self._previous = None if unique else array('i')
+        self._nkeys = 0
+        self._nrows = 0
+
+        for row in it:
+            k = getkey(row)
+            h = hash(k)
+            i = self._find(k, h)
+            head = self._slots[i]
+            if head and unique:
+                if strict:
+                    raise DuplicateKeyError(k)
+                continue
+            moved = False
+            for c, idx in zip(columns, indices):
+                moved |= c.append(row[idx])
+            if moved:
+                self._data = [c.data for c in columns]
+            self._hashes.append(h)
+            if not unique:
+                self._previous.append(head - 1)
+            self._slots[i] = self._nrows + 1
+            self._nrows += 1
+            if not head:
+                self._nkeys += 1
+                if self._nkeys * 3 >= len(self._slots) * 2:
+                    self._resize()
+
+    def _find(self, key, h):
+        # index of the slot holding the key, or of the empty slot where it
+        # would go; probes in the same sequence as CPython's dict
+        slots = self._slots
+        hashes = self._hashes
+        mask = len(slots) - 1
+        perturb = h & _mask64
+        i = perturb & mask
+        while True:
+            off = slots[i]
+            if not off or (hashes[off - 1] == h and
+                           self._key(off - 1) == key):
+                return i
+            perturb >>= 5
+            i = (5 * i + perturb + 1) & mask
+
+    def _resize(self):
+        old = self._slots
+        self._slots = slots = array('i', [0]) * (len(old) * 2)
+        hashes = self._hashes
+        mask = len(slots) - 1
+        for off in old:
+            if off:
+                perturb = hashes[off - 1] & _mask64
+                i = perturb & mask
+                while slots[i]:
+                    perturb >>= 5
+                    i = (5 * i + perturb + 1) & mask
+                slots[i] = off
+
+    def _key(self, off):
+        data = self._data
+        if len(self._keycols) == 1:
+            return data[self._keycols[0]][off]
+        return tuple([data[c][off] for c in self._keycols])
+
+    def _value(self, off):
+        data = self._data
+        if self._valuetuple:
+            return tuple([data[c][off] for c in self._valuecols])
+        return data[self._valuecols[0]][off]
+
+    def __getitem__(self, key):
+        off = self._slots[self._find(key, hash(key))] - 1
+        if off < 0:
+            raise KeyError(key)
+        if self.unique:
+            return self._value(off)
+        offs = []
+        while off >= 0:
+            offs.append(off)
+            off = self._previous[off]
+        return [self._value(off) for off in reversed(offs)]
+
+    def __contains__(self, key):
+        return self._slots[self._find(key, hash(key))] > 0
+
+    def __iter__(self):
+        # in order of first appearance, as a dict would be
+        for off in range(self._nrows):
+            if self.unique or self._previous[off] < 0:
+                yield self._key(off)
+
+    def __len__(self):
+        return self._nkeys
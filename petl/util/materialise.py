@@ -7,7 +7,7 @@ from itertools import islice
 from petl.compat import izip_longest, text_type, next
 
 
-from petl.util.base import asindices, Table
+from petl.util.base import asindices, Table, header
 
 
 def listoflists(tbl):
@@ -144,6 +144,11 @@ class CacheView(Table):
         self.cache = list()
         self.cachecomplete = False
 
+    def resolveheader(self):
+        if self.cache:
+            return self.cache[0]
+        return header(self.inner)
+
     def __iter__(self):
 
         # serve whatever is in the cache first
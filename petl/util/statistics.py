@@ -1,6 +1,8 @@
 from __future__ import absolute_import, print_function, division
 
 
+import math
+import random
 from collections import namedtuple
 
 
@@ -96,3 +98,173 @@ def onlinestats(xi, n, mean=0, variance=0):
     mean = (((n - 1)*meanprv) + xi)/n
     variance = (((n - 1)*varianceprv) + ((xi - meanprv)*(xi - mean)))/n
     return mean, variance
+
+
+def quantiles(table, field, qs=(0.5, 0.95, 0.99), k=200):
+    """
+    Estimate quantiles of the values under the given field in one pass,
+    with bounded memory. E.g.::
+
+        >>> import petl as etl
+        >>> table = [['foo', 'bar']] + [['a', i] for i in range(1, 101)]
+        >>> etl.quantiles(table, 'bar', qs=[0.5, 0.95, 0.99])
+        [50.0, 95.0, 99.0]
+
+    Returns a list with an estimate for each of the quantiles `qs`, which are
+    values seen in the data. As with :func:`petl.util.statistics.stats`,
+    values are converted to `float`, and values which can't be are skipped.
+
+    The values are summarised by a :class:`QuantileSketch`, which holds
+    a few multiples of `k` values whatever the number of rows. Up to `k`
+    values the results are exact, beyond that the rank of each estimate is
+    typically within 1% of the rank asked for with the default `k` (e.g.,
+    the estimate of the median of a million values is usually between the
+    495,000th and 505,000th value). Larger `k` gives more accurate
+    estimates using more memory.
+    See also :class:`petl.transform.accumulators.Quantiles` to calculate
+    quantiles with :func:`petl.transform.reductions.aggregate`.
+
+    """
+
+    sketch = QuantileSketch(k)
+    for v in values(table, field):
+        try:
+            v = float(v)
+        except (ValueError, TypeError):
+            pass
+        else:
+            sketch.update(v)
+    return sketch.quantiles(qs)
+
+
+Table.quantiles = quantiles
+
+
+class QuantileSketch(object):
+    """
+    A streaming quantile sketch, after Karnin, Lang and Liberty, "Optimal
+    quantile approximation in streams" (KLL). E.g.::
+
+        >>> from petl.util.statistics import QuantileSketch
+        >>> sketch = QuantileSketch()
+        >>> sketch.extend(range(1000))
+        >>> other = QuantileSketch()
+        >>> other.extend(range(1000, 2000))
+        >>> sketch.merge(other)
+        >>> sketch.count
+        2000
+        >>> sketch.quantile(0.5)
+        995
+
+    Values are kept in a stack of compactors. When a compactor is full it is
+    sorted and every other value is passed up to the next, where each value
+    stands for twice as many values as in the one below, so memory grows
+    only with the logarithm of the number of values. Sketches of separate
+    parts of the data can be merged.
+
+    """
+
+    def __init__(self, k=200):
+        if k < 2:
+            raise ValueError('k must be at least 2, found %r' % k)
+        self.k = k
+        self.count = 0
+        self.compactors = []
+        self._size = 0
+        self._maxsize = 0
+        # N.B., seeded so results are repeatable
+        self._random = random.Random(k)
+        self._grow()
+
+    def _grow(self):
+        self.compactors.append([])
+        self._maxsize = sum(self._capacity(h)
+                            for h in range(len(self.compactors)))
+
+    def _capacity(self, h):
+        # compactors further below the top hold fewer values
+        depth = len(self.compactors) - h - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def update(self, value):
+        """Add a value."""
+        self.compactors[0].append(value)
+        self.count += 1
+        self._size += 1
+        if self._size >= self._maxsize:
+            self._compress()
+
+    def extend(self, values):
+        """Add an iterable of values."""
+        level0 = self.compactors[0]
+        n = len(level0)
+        level0.extend(values)
+        n = len(level0) - n
+        self.count += n
+        self._size += n
+        if self._size >= self._maxsize:
+            self._compress()
+
+    def merge(self, other):
+        """Add the values summarised by another sketch."""
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for mine, theirs in zip(self.compactors, other.compactors):
+            mine.extend(theirs)
+        self.count += other.count
+        self._size += other._size
+        if self._size >= self._maxsize:
+            self._compress()
+
+    def _compress(self):
+        while self._size >= self._maxsize:
+            for h, compactor in enumerate(self.compactors):
+                if len(compactor) >= self._capacity(h):
+                    if h + 1 == len(self.compactors):
+                        self._grow()
+                    compactor.sort()
+                    # keep back the largest value if there's an odd number
+                    if len(compactor) % 2:
+                        held = [compactor.pop()]
+                    else:
+                        held = []
+                    offset = 1 if self._random.random() < .5 else 0
+                    promoted = compactor[offset::2]
+                    self.compactors[h + 1].extend(promoted)
+                    self._size -= len(compactor) - len(promoted)
+                    compactor[:] = held
+
+    def quantile(self, q):
+        """Estimate the `q` quantile, or return `None` if there are no
+        values."""
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs):
+        """Estimate the quantiles `qs`, as a list."""
+        for q in qs:
+            if not 0 <= q <= 1:
+                raise ValueError('quantiles must be between 0 and 1, found %r'
+                                 % q)
+        weighted = sorted((v, 1 << h)
+                          for h, compactor in enumerate(self.compactors)
+                          for v in compactor)
+        if not weighted:
+            return [None for _ in qs]
+        total = sum(w for _, w in weighted)
+        # walk through the values in order, finding the first value whose
+        # cumulative weight reaches each quantile
+        order = sorted(range(len(qs)), key=lambda i: qs[i])
+        out = [None] * len(qs)
+        i = 0
+        cumulative = 0
+        for v, w in weighted:
+            cumulative += w
+            while i < len(order) and cumulative >= qs[order[i]] * total:
+                out[order[i]] = v
+                i += 1
+            if i == len(order):
+                break
+        while i < len(order):
+            out[order[i]] = weighted[-1][0]
+            i += 1
+        return out